@@ -0,0 +1,368 @@
+import csv
+import json
+import time
+import argparse
+import platform
+from dataclasses import asdict, dataclass
+from multiprocessing import Process, Queue
+from threading import Lock, Event
+import numpy as np
+from controller.socket import Socket
+from model.frame import Frame
+from pointcloud_client import PointcloudClient
+from utils.protocol import Codec, to_records
+from utils.transport import Transport
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_RATES = (10, 30, 100, 300, 1000)
+FRAMES_POOL_SIZE = 2  # Random frames sent in turn, the largest take 160 MB
+SATURATION_RATIO = 0.9  # Of the target rate, the higher rates are skipped below
+DRAIN_TIMEOUT = 5.0  # s waiting for the frames still in flight after a run
+CONNECTION_DELAY = 0.2  # s for the clients to be accepted before a run
+
+
+@dataclass
+class BenchmarkResult:
+    n_points: int
+    target_rate: float  # Frames per second and per stream, 0 for saturation
+    transport: str
+    codec: str
+    n_streams: int
+    duration: float  # s
+    n_sent_frames: int
+    n_received_frames: int
+    n_dropped_frames: int  # By the clients, and lost in the transport
+    frames_per_second: float
+    points_per_second: float
+    megabytes_per_second: float
+    latency_p50: float  # ms from the send call to the frame decoded
+    latency_p99: float
+    cpu_time: float  # s of the receiving process, socket thread included
+    cpu_usage: float  # % of a core
+    peak_rss: float | None  # MB, of the whole process without /proc
+
+
+# Consumer of the socket frames in place of the viewer: the frames are only
+# counted and released, their latency taken from the sender clock, which is
+# the same one on loopback
+class FrameSink:
+    def __init__(self):
+        self.lock: Lock = Lock()
+        self.latencies: list[float] = []
+        self.n_points: int = 0
+        self.expected_frames: int = None
+        self.received_event: Event = Event()
+
+    def reset(self):
+        with self.lock:
+            self.latencies = []
+            self.n_points = 0
+            self.expected_frames = None
+            self.received_event.clear()
+
+    def post_frame(self, frame: Frame):
+        latency = time.time() - frame.timestamp
+        frame.release()
+
+        with self.lock:
+            self.latencies.append(latency)
+            self.n_points += frame.n_points
+
+            if (
+                self.expected_frames is not None
+                and len(self.latencies) >= self.expected_frames
+            ):
+                self.received_event.set()
+
+    def wait_frames(self, n_frames: int, timeout: float):
+        with self.lock:
+            self.expected_frames = n_frames
+
+            if len(self.latencies) >= n_frames:
+                return
+
+        self.received_event.wait(timeout)
+
+
+def get_peak_rss() -> float | None:
+    # Peak resident memory since the last reset, in MB, Linux only
+    try:
+        with open("/proc/self/status") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+
+    except OSError:
+        pass
+
+    return None
+
+
+def reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs_file:
+            clear_refs_file.write("5")
+
+    except OSError:
+        pass  # The peak is the one of the whole process then
+
+
+def run_load(
+    port: int,
+    transport: Transport,
+    codec: Codec,
+    n_streams: int,
+    n_points: int,
+    rate: float,
+    duration: float,
+    results: Queue,
+):
+    # Clients of a run, in their own process so that only the receiving side
+    # is measured in the benchmark process
+    frames = [
+        to_records(
+            np.random.uniform(-1.0, 1.0, (n_points, 3)),
+            intensity=np.random.rand(n_points).astype(np.float32),
+        )
+        for _ in range(FRAMES_POOL_SIZE)
+    ]
+    clients = [
+        PointcloudClient("localhost", port, transport, codec, reconnect=False)
+        for _ in range(n_streams)
+    ]
+    period = 1 / rate if rate > 0 else 0.0
+    time.sleep(CONNECTION_DELAY)
+
+    start_time = time.perf_counter()
+    send_time = start_time
+    i = 0
+
+    while time.perf_counter() - start_time < duration:
+        # Streams fed in turn, blocked by the slowest when saturated
+        for client in clients:
+            client.send(frames[i % len(frames)])
+
+        i += 1
+        send_time += period
+        delay = send_time - time.perf_counter()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        else:
+            send_time = time.perf_counter()  # Late, the missed frames are skipped
+
+    for client in clients:
+        client.close()
+
+    stats = [client.get_stats() for client in clients]
+    results.put(
+        (
+            sum(client_stats.n_frames for client_stats in stats),
+            sum(client_stats.n_bytes for client_stats in stats),
+            sum(client_stats.n_dropped_frames for client_stats in stats),
+            time.perf_counter() - start_time,
+        )
+    )
+
+
+def run_benchmark(
+    sink: FrameSink,
+    port: int,
+    transport: Transport,
+    codec: Codec,
+    n_streams: int,
+    n_points: int,
+    rate: float,
+    duration: float,
+) -> BenchmarkResult:
+    sink.reset()
+    reset_peak_rss()
+    results = Queue()
+    load_process = Process(
+        target=run_load,
+        args=(port, transport, codec, n_streams, n_points, rate, duration, results),
+    )
+    cpu_start = time.process_time()
+    start_time = time.perf_counter()
+    load_process.start()
+    n_sent_frames, n_bytes, n_dropped_frames, elapsed = results.get()
+    load_process.join()
+
+    sink.wait_frames(n_sent_frames, DRAIN_TIMEOUT)
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - start_time
+
+    with sink.lock:
+        latencies = np.array(sink.latencies) * 1e3
+        n_received_frames = len(latencies)
+        n_points_received = sink.n_points
+
+    p50, p99 = np.percentile(latencies, (50, 99)) if n_received_frames else (0, 0)
+
+    return BenchmarkResult(
+        n_points,
+        rate,
+        str(transport),
+        str(codec),
+        n_streams,
+        elapsed,
+        n_sent_frames,
+        n_received_frames,
+        n_dropped_frames + n_sent_frames - n_received_frames,
+        n_received_frames / elapsed,
+        n_points_received / elapsed,
+        n_bytes / elapsed / 1e6,
+        float(p50),
+        float(p99),
+        cpu_time,
+        cpu_time / wall_time * 100,
+        get_peak_rss(),
+    )
+
+
+def write_results(path: str, results: list[BenchmarkResult]):
+    rows = [asdict(result) for result in results]
+
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        return
+
+    with open(path, "w") as json_file:
+        json.dump(
+            {
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "platform": platform.platform(),
+                "python": platform.python_version(),
+                "results": rows,
+            },
+            json_file,
+            indent=2,
+        )
+
+
+def main(
+    port: int = 8080,
+    sizes: list[int] = DEFAULT_SIZES,
+    rates: list[float] = DEFAULT_RATES,
+    duration: float = 3.0,
+    transport: Transport = Transport.TCP,
+    codec: Codec = Codec.NONE,
+    n_streams: int = 1,
+    output: str = None,
+):
+    # The socket runs headless: the frames go to the sink instead of the viewer
+    sink = FrameSink()
+    server = Socket()
+    server.frame_sink = sink.post_frame
+    server.start_socket(port, 0)
+    results = []
+
+    print("points     rate  frames/s  points/s   MB/s  p50 ms  p99 ms  cpu %  rss MB")
+
+    def run(n_points: int, rate: float) -> BenchmarkResult:
+        result = run_benchmark(
+            sink, port, transport, codec, n_streams, n_points, rate, duration
+        )
+        results.append(result)
+
+        peak_rss = "-" if result.peak_rss is None else f"{result.peak_rss:.0f}"
+        print(
+            f"{n_points:<9} {rate or 'max':>5} {result.frames_per_second:9.1f} "
+            f"{result.points_per_second:9.3g} {result.megabytes_per_second:6.0f} "
+            f"{result.latency_p50:7.2f} {result.latency_p99:7.2f} "
+            f"{result.cpu_usage:6.0f} {peak_rss:>7}"
+        )
+
+        return result
+
+    try:
+        for n_points in sizes:
+            # Rates increased until saturated, then as fast as possible
+            for rate in sorted(rates):
+                result = run(n_points, rate)
+
+                if result.frames_per_second < SATURATION_RATIO * rate * n_streams:
+                    break  # Saturated, the higher rates would not go faster
+
+            run(n_points, 0)
+
+    except KeyboardInterrupt:
+        print("Benchmark interrupted")
+
+    finally:
+        server.stop_socket()
+
+    if output is not None and results:
+        write_results(output, results)
+        print(f"Results written to: {output}")
+
+
+if __name__ == "__main__":
+    arg = argparse.ArgumentParser(
+        description="Headless benchmark of the socket ingest, on loopback"
+    )
+    arg.add_argument("-p", "--port", type=int, default=8080, help="Socket port")
+    arg.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Points per frame of the runs",
+    )
+    arg.add_argument(
+        "--rates",
+        type=float,
+        nargs="+",
+        default=DEFAULT_RATES,
+        help="Frames per second of the runs, followed by a run as fast as possible",
+    )
+    arg.add_argument(
+        "-d",
+        "--duration",
+        type=float,
+        default=3.0,
+        help="Duration of each run, in seconds",
+    )
+    arg.add_argument(
+        "--transport",
+        type=str.upper,
+        choices=[transport.name for transport in Transport],
+        default=Transport.TCP.name,
+        help="Transport of the frames",
+    )
+    arg.add_argument(
+        "--codec",
+        type=str.upper,
+        choices=[codec.name for codec in Codec],
+        default=Codec.NONE.name,
+        help="Payload compression codec",
+    )
+    arg.add_argument(
+        "-s",
+        "--streams",
+        type=int,
+        default=1,
+        help="Number of concurrent streams",
+    )
+    arg.add_argument(
+        "-o",
+        "--output",
+        help="Results file, CSV with a .csv extension and JSON otherwise",
+    )
+
+    args = arg.parse_args()
+    main(
+        args.port,
+        args.sizes,
+        args.rates,
+        args.duration,
+        Transport[args.transport],
+        Codec[args.codec],
+        args.streams,
+        args.output,
+    )
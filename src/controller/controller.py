@@ -1,13 +1,17 @@
 import os
 import yaml
-import pyvista as pv
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
 from PyQt5.QtCore import pyqtSignal, QObject
 from controller.pointcloud_service import PointcloudService
 from controller.filter_service import FilterService
 from model.pointcloud import Pointcloud
 from model.filter import Filter
+from model.frame import Frame
+from model.frame_mailbox import FrameMailbox
+from model.socket_stream import SocketStream
+from utils.delivery_mode import DeliveryMode
 from utils.log import Log
+from utils.pause_mode import PauseMode
 from utils.theme import Theme
 
 
@@ -18,25 +22,43 @@ class Controller(QObject):
     close_application_signal = pyqtSignal()
     change_theme_signal = pyqtSignal(Theme)
     show_hide_axes_signal = pyqtSignal()
+    update_drawn_points_signal = pyqtSignal(int, int)
 
     open_socket_window_signal = pyqtSignal()
     start_socket_signal = pyqtSignal(int, int)
-    update_socket_pointcloud_signal = pyqtSignal(pv.PolyData)
-    client_disconnected_signal = pyqtSignal()
-    pause_socket_signal = pyqtSignal()
+    socket_frames_available_signal = pyqtSignal()
+    update_socket_dropped_frames_signal = pyqtSignal(int)
+    add_socket_stream_signal = pyqtSignal(SocketStream)
+    delete_socket_stream_signal = pyqtSignal(SocketStream)
+    toggle_socket_stream_visibility_signal = pyqtSignal(SocketStream, bool)
+    update_socket_stream_signal = pyqtSignal(SocketStream)
+    pause_socket_signal = pyqtSignal(PauseMode)
     stop_socket_signal = pyqtSignal()
+    start_recording_signal = pyqtSignal(str)
+    stop_recording_signal = pyqtSignal()
+    update_recording_state_signal = pyqtSignal(bool)
+    start_replay_signal = pyqtSignal(str, float)
+    update_replay_state_signal = pyqtSignal(bool)
+    set_replay_speed_signal = pyqtSignal(float)
+    seek_replay_signal = pyqtSignal(int)
+    update_replay_position_signal = pyqtSignal(int, int)
+    stop_replay_signal = pyqtSignal()
 
     open_debug_window_signal = pyqtSignal()
 
     add_pointcloud_signal = pyqtSignal(Pointcloud)
     delete_pointcloud_signal = pyqtSignal(Pointcloud)
     toggle_pointcloud_visibility_signal = pyqtSignal(Pointcloud, bool)
+    update_pointcloud_signal = pyqtSignal(Pointcloud)
 
     add_filter_signal = pyqtSignal(Filter)
     delete_filter_signal = pyqtSignal(Filter)
     toggle_filter_visibility_signal = pyqtSignal(Filter, bool)
     edit_filter_signal = pyqtSignal(Filter)
     update_filter_signal = pyqtSignal(Filter)
+    color_by_filter_signal = pyqtSignal(bool)
+    set_point_budget_signal = pyqtSignal(int)
+    set_max_fps_signal = pyqtSignal(int)
 
     def __new__(cls):
         if not cls._instance:
@@ -57,6 +79,8 @@ class Controller(QObject):
 
         self.pointclouds_list: list[Pointcloud] = []
         self.filters_list: list[Filter] = []
+        self.frame_mailbox: FrameMailbox = FrameMailbox()
+        self.n_dropped_frames: int = 0
 
         self.theme: Theme = Theme.LIGHT_MODE
 
@@ -80,6 +104,9 @@ class Controller(QObject):
         self.show_hide_axes_signal.emit()
         self.notify(Log.INFO, "Axes visibility toggled")
 
+    def update_drawn_points(self, drawn_points: int, total_points: int):
+        self.update_drawn_points_signal.emit(drawn_points, total_points)
+
     # SOCKET
     def open_socket_window(self):
         self.open_socket_window_signal.emit()
@@ -87,25 +114,123 @@ class Controller(QObject):
     def start_socket(self, port: int, persistence: int):
         self.start_socket_signal.emit(port, persistence)
 
-    def update_socket_pointcloud(self, pointcloud: Pointcloud):
-        self.update_socket_pointcloud_signal.emit(pointcloud)
+    def post_socket_frame(self, frame: Frame):
+        # Called by the socket thread: a single notification is pending at a
+        # time, the viewer pulls all the frames received meanwhile
+        if self.frame_mailbox.put(frame):
+            self.socket_frames_available_signal.emit()
+
+    def take_socket_frames(self) -> list[Frame]:
+        frames = self.frame_mailbox.take_all()
+
+        if frames:
+            self.notify(
+                Log.DEBUG,
+                f"Pointclouds received from socket: {len(frames)} frames, {sum(frame.n_points for frame in frames)} points",
+            )
+
+        if self.frame_mailbox.n_dropped != self.n_dropped_frames:
+            self.n_dropped_frames = self.frame_mailbox.n_dropped
+            self.update_socket_dropped_frames_signal.emit(self.n_dropped_frames)
+
+        return frames
+
+    def set_socket_delivery_mode(self, mode: DeliveryMode):
+        self.frame_mailbox.mode = mode
+        self.notify(Log.DEBUG, f"Socket delivery mode changed to : {mode.value}")
+
+    def client_connected(self, stream: SocketStream):
+        self.add_socket_stream_signal.emit(stream)
+        self.notify(Log.INFO, f"Client connected on socket: {stream.name}")
+
+    def client_disconnected(self, stream: SocketStream):
+        self.delete_socket_stream_signal.emit(stream)
+        self.notify(Log.INFO, f"Client disconnected: {stream.name}")
+
+    def toggle_socket_stream_visibility(self, stream: SocketStream, is_visible: bool):
+        stream.is_visible = is_visible
+        self.toggle_socket_stream_visibility_signal.emit(stream, is_visible)
+
+        state = "shown" if is_visible else "hidden"
+        self.notify(Log.DEBUG, f"Toggle stream visibility: {state} ({stream.name})")
+
+    def set_socket_stream_persistence(self, stream: SocketStream, persistence: int):
+        stream.persistence = persistence
+        self.update_socket_stream_signal.emit(stream)
         self.notify(
-            Log.DEBUG,
-            f"Pointcloud received from socket: {len(pointcloud.points)} points",
+            Log.DEBUG, f"{stream.name} stream persistence changed to : {persistence}"
         )
 
-    def client_disconnected(self):
-        self.client_disconnected_signal.emit()
-        self.notify(Log.INFO, "Client disconnected")
+    def set_socket_stream_color(self, stream: SocketStream, color: str):
+        stream.color = color
+        self.update_socket_stream_signal.emit(stream)
+        self.notify(Log.DEBUG, f"{stream.name} stream color changed to : {color}")
 
-    def pause_socket(self):
-        self.pause_socket_signal.emit()
-        self.notify(Log.SUCCESS, "Pausing socket")
+    def set_socket_stream_voxel_size(self, stream: SocketStream, voxel_size: float):
+        # Applied by the socket thread from the next frame
+        stream.voxel_size = voxel_size
+        self.notify(
+            Log.DEBUG, f"{stream.name} stream voxel size changed to : {voxel_size}"
+        )
+
+    def pause_socket(self, mode: PauseMode = PauseMode.BLOCK):
+        self.pause_socket_signal.emit(mode)
+        self.notify(Log.SUCCESS, f"Pausing socket ({mode.value.lower()})")
 
     def stop_socket(self):
         self.stop_socket_signal.emit()
+        self.frame_mailbox.clear()
         self.notify(Log.SUCCESS, "Stopping socket")
 
+    def start_recording(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            caption="Record socket streams",
+            directory="",
+            filter="Frame logs (*.pcvlog);;All files (*)",
+        )
+
+        if not file_path:
+            self.notify(Log.INFO, "No file selected")
+            return
+
+        self.start_recording_signal.emit(file_path)
+
+    def stop_recording(self):
+        self.stop_recording_signal.emit()
+
+    def update_recording_state(self, is_recording: bool):
+        self.update_recording_state_signal.emit(is_recording)
+
+    def start_replay(self, speed: float):
+        file_path, _ = QFileDialog.getOpenFileName(
+            caption="Replay socket streams",
+            directory="",
+            filter="Frame logs (*.pcvlog);;All files (*)",
+        )
+
+        if not file_path:
+            self.notify(Log.INFO, "No file selected")
+            return
+
+        self.start_replay_signal.emit(file_path, speed)
+
+    def update_replay_state(self, is_replaying: bool):
+        self.update_replay_state_signal.emit(is_replaying)
+
+    def set_replay_speed(self, speed: float):
+        # 0 replays the frames as fast as possible
+        self.set_replay_speed_signal.emit(speed)
+        self.notify(Log.DEBUG, f"Replay speed changed to : {speed}")
+
+    def seek_replay(self, index: int):
+        self.seek_replay_signal.emit(index)
+
+    def update_replay_position(self, index: int, n_frames: int):
+        self.update_replay_position_signal.emit(index, n_frames)
+
+    def stop_replay(self):
+        self.stop_replay_signal.emit()
+
     # DEBUG
     def open_debug_window(self):
         self.open_debug_window_signal.emit()
@@ -138,21 +263,23 @@ class Controller(QObject):
             return
 
         try:
-            name, pointcloud_data = self.pointcloud_srv.get_pointcloud_data_from_path(
-                self.pointclouds_list, file_path
+            name, pointcloud_data, lods = (
+                self.pointcloud_srv.get_pointcloud_data_from_path(
+                    self.pointclouds_list, file_path
+                )
             )
         except ValueError as e:
             self.notify(Log.ERROR, f"Error: {str(e)}")
             return
 
-        pointcloud = Pointcloud(name, pointcloud_data)
+        pointcloud = Pointcloud(name, pointcloud_data, lods)
         self.pointclouds_list.append(pointcloud)
 
         self.add_pointcloud_signal.emit(pointcloud)
 
         self.notify(
             Log.SUCCESS,
-            f"Pointcloud loaded: {pointcloud.name} ({pointcloud.points.n_points} points)",
+            f"Pointcloud loaded: {pointcloud.name} ({pointcloud.points.n_points} points, {len(lods)} LOD levels)",
         )
 
     def delete_pointcloud(self, pointcloud_to_delete: Pointcloud):
@@ -188,6 +315,14 @@ class Controller(QObject):
             self.notify(Log.INFO, "Pointcloud name unchanged")
             return False
 
+    def set_pointcloud_importance(self, pointcloud: Pointcloud, importance: float):
+        pointcloud.importance = importance
+        self.update_pointcloud_signal.emit(pointcloud)
+        self.notify(
+            Log.DEBUG,
+            f"{pointcloud.name} pointcloud importance changed to: {importance}",
+        )
+
     def is_pointcloud_name_available(self, name: str):
         return all(pointcloud.name != name for pointcloud in self.pointclouds_list)
 
@@ -256,6 +391,29 @@ class Controller(QObject):
         self.update_filter_signal.emit(filter)
         self.notify(Log.DEBUG, f"{filter.name} filter color changed to : {color}")
 
+    def count_points_inside_filter(self, filter: Filter) -> int:
+        # Exact, the spatial index only scans the nodes crossing the box
+        return sum(
+            self.filter_srv.count_points_inside_filter(
+                pointcloud.points.points, filter, pointcloud.get_spatial_index()
+            )
+            for pointcloud in self.pointclouds_list
+        )
+
+    def toggle_color_by_filter(self, color_by_filter: bool):
+        self.color_by_filter_signal.emit(color_by_filter)
+
+        state = "enabled" if color_by_filter else "disabled"
+        self.notify(Log.INFO, f"Color points by filter {state}")
+
+    def set_point_budget(self, point_budget: int):
+        self.set_point_budget_signal.emit(point_budget)
+        self.notify(Log.INFO, f"Point budget set to {point_budget} points")
+
+    def set_max_fps(self, max_fps: int):
+        self.set_max_fps_signal.emit(max_fps)
+        self.notify(Log.INFO, f"Frame rate limited to {max_fps} fps")
+
     def import_filters_files(self):
         file_paths, _ = QFileDialog.getOpenFileNames(
             caption="Import filters",
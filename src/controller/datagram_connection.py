@@ -0,0 +1,179 @@
+import lzma
+import time
+import zlib
+from functools import partial
+from controller.controller import Controller
+from model.buffer_pool import BufferPool
+from model.frame import Frame, to_frame
+from model.socket_stream import SocketStream
+from utils.log import Log
+from utils.protocol import (
+    FRAGMENT_STRUCT,
+    FragmentHeader,
+    decode_fragment_header,
+    decode_frame,
+    is_newer_frame_id,
+)
+
+REASSEMBLY_TIMEOUT = 0.2  # s, incomplete frames are dropped after it
+MAX_PENDING_FRAMES = 2  # Frames reassembled at once, the oldest is dropped
+
+
+class PendingFrame:
+    def __init__(self, header: FragmentHeader, buffer: bytearray, deadline: float):
+        self.frame_id: int = header.frame_id
+        self.size: int = header.frame_size
+        self.buffer: bytearray = buffer
+        self.received: bytearray = bytearray(header.n_fragments)
+        self.n_missing: int = header.n_fragments
+        self.deadline: float = deadline
+
+
+# UDP source of the socket server, reassembling its frames from the fragments
+# in buffers of a pool. Frames older than the last complete one are stale and
+# ignored: a lost fragment costs its frame only, never the next ones.
+class DatagramConnection:
+    def __init__(
+        self, address: tuple[str, int], stream: SocketStream, n_buffers: int = 2
+    ):
+        self.controller: Controller = Controller()
+
+        self.address: tuple[str, int] = address
+        self.stream: SocketStream = stream
+        self.is_closed: bool = False
+        self.is_draining: bool = False
+        self.n_drained_frames: int = 0
+        self.n_incomplete_frames: int = 0
+
+        self.buffer_pool: BufferPool = BufferPool(n_buffers)
+        self.pending_frames: dict[int, PendingFrame] = {}
+        self.last_frame_id: int = None
+        self.last_receive_time: float = time.monotonic()
+
+    def receive(self, data: memoryview) -> Frame | None:
+        self.last_receive_time = time.monotonic()
+        self.stream.telemetry.add_bytes(len(data))
+
+        try:
+            header = decode_fragment_header(data)
+
+        except ValueError as error:
+            self.controller.notify(
+                Log.DEBUG, f"Invalid datagram from {self.stream.name}: {error}"
+            )
+            return None
+
+        if self.last_frame_id is not None and not is_newer_frame_id(
+            header.frame_id, self.last_frame_id
+        ):
+            return None
+
+        if self.is_draining:
+            # Not even reassembled, the frame ids are enough
+            self.last_frame_id = header.frame_id
+            self.n_drained_frames += 1
+            return None
+
+        pending_frame = self.pending_frames.get(header.frame_id)
+
+        if pending_frame is None:
+            pending_frame = self.start_frame(header)
+
+            if pending_frame is None:
+                return None
+
+        if (
+            header.frame_size != pending_frame.size
+            or header.n_fragments != len(pending_frame.received)
+            or pending_frame.received[header.index]
+        ):
+            return None
+
+        fragment = data[FRAGMENT_STRUCT.size :]
+        offset = header.offset
+        pending_frame.buffer[offset : offset + len(fragment)] = fragment
+        pending_frame.received[header.index] = 1
+        pending_frame.n_missing -= 1
+
+        if pending_frame.n_missing:
+            return None
+
+        decode_start = time.perf_counter()
+        frame = self.complete_frame(pending_frame)
+
+        if frame is not None:
+            decode_time = time.perf_counter() - decode_start
+            self.stream.telemetry.add_frame(frame.n_points, decode_time)
+
+        return frame
+
+    def start_frame(self, header: FragmentHeader) -> PendingFrame | None:
+        if len(self.pending_frames) >= MAX_PENDING_FRAMES:
+            self.drop_frame(next(iter(self.pending_frames.values())))
+
+        # None while the viewer holds all the buffers, the frame is lost then
+        buffer = self.buffer_pool.acquire(header.frame_size)
+
+        if buffer is None:
+            return None
+
+        pending_frame = PendingFrame(
+            header, buffer, time.monotonic() + REASSEMBLY_TIMEOUT
+        )
+        self.pending_frames[header.frame_id] = pending_frame
+
+        return pending_frame
+
+    def complete_frame(self, pending_frame: PendingFrame) -> Frame | None:
+        del self.pending_frames[pending_frame.frame_id]
+        self.last_frame_id = pending_frame.frame_id
+
+        # The older frames still incomplete are stale now
+        for other_frame in list(self.pending_frames.values()):
+            if is_newer_frame_id(self.last_frame_id, other_frame.frame_id):
+                self.drop_frame(other_frame)
+
+        try:
+            header, records, quantization = decode_frame(
+                memoryview(pending_frame.buffer)[: pending_frame.size]
+            )
+
+        except (ValueError, TypeError, zlib.error, lzma.LZMAError):
+            self.buffer_pool.release(pending_frame.buffer)
+            self.controller.notify(
+                Log.DEBUG,
+                f"Data received from {self.stream.name}, but wrong data format",
+            )
+            return None
+
+        # Decompressed frames are in their own records, their buffer is held all
+        # the same, so that the viewer throttles the sender
+        release_callback = partial(self.buffer_pool.release, pending_frame.buffer)
+
+        return to_frame(header, records, quantization, self.stream.id, release_callback)
+
+    def expire_frames(self, now: float):
+        for pending_frame in list(self.pending_frames.values()):
+            if pending_frame.deadline < now:
+                self.drop_frame(pending_frame)
+
+    def drop_frame(self, pending_frame: PendingFrame):
+        del self.pending_frames[pending_frame.frame_id]
+        self.buffer_pool.release(pending_frame.buffer)
+        self.n_incomplete_frames += 1
+        self.stream.telemetry.add_incomplete_frame()
+
+        n_fragments = len(pending_frame.received)
+        self.controller.notify(
+            Log.DEBUG,
+            f"Incomplete frame dropped from {self.stream.name}: {n_fragments - pending_frame.n_missing}/{n_fragments} fragments ({self.n_incomplete_frames} dropped)",
+        )
+
+    def close(self):
+        self.is_closed = True
+
+        for pending_frame in self.pending_frames.values():
+            self.buffer_pool.release(pending_frame.buffer)
+
+        self.pending_frames.clear()
+        self.buffer_pool.close()
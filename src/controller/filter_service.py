@@ -1,4 +1,7 @@
+import numpy as np
+import pyvista as pv
 from model.filter import Filter
+from model.spatial_index import SpatialIndex
 
 
 class FilterService:
@@ -15,3 +18,86 @@ class FilterService:
             count += 1
 
         return name
+
+    def get_inside_filter_mask(
+        self,
+        points: np.ndarray,
+        filter: Filter,
+        spatial_index: SpatialIndex = None,
+    ) -> np.ndarray:
+        if filter.is_box:
+            if spatial_index is not None:  # Only visit the overlapping nodes
+                return spatial_index.query_box_mask(filter.box.bounds)
+
+            return self.get_inside_bounds_mask(points, filter.box.bounds)
+
+        # Fallback for non-box shapes: surface inside/outside test
+        enclosed = pv.PolyData(points).select_enclosed_points(
+            filter.box, check_surface=False
+        )
+
+        return np.asarray(enclosed["SelectedPoints"]) == 1
+
+    def get_inside_filters_mask(
+        self,
+        points: np.ndarray,
+        filters: list[Filter],
+        spatial_index: SpatialIndex = None,
+        with_filter_indices: bool = False,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        masks = [
+            self.get_inside_filter_mask(points, filter, spatial_index)
+            for filter in filters
+        ]
+
+        return self.combine_filters_masks(len(points), masks, with_filter_indices)
+
+    def combine_filters_masks(
+        self,
+        n_points: int,
+        masks: list[np.ndarray],
+        with_filter_indices: bool = False,
+    ) -> tuple[np.ndarray, np.ndarray | None]:
+        # Union of the filters masks, with optionally the index of the first
+        # filter matching each point (-1 if none)
+        mask = np.zeros(n_points, dtype=bool)
+        filter_indices = None
+
+        if with_filter_indices:
+            filter_indices = np.full(n_points, -1, dtype=np.int16)
+
+        for i, inside in enumerate(masks):
+            if filter_indices is not None:
+                filter_indices[inside & ~mask] = i
+
+            mask |= inside
+
+        return mask, filter_indices
+
+    def get_inside_bounds_mask(
+        self,
+        points: np.ndarray,
+        bounds: tuple[float, float, float, float, float, float],
+    ) -> np.ndarray:
+        mask = np.ones(len(points), dtype=bool)
+        tmp = np.empty(len(points), dtype=bool)
+
+        for axis in range(3):
+            coords = points[:, axis]
+            np.greater_equal(coords, bounds[2 * axis], out=tmp)
+            mask &= tmp
+            np.less_equal(coords, bounds[2 * axis + 1], out=tmp)
+            mask &= tmp
+
+        return mask
+
+    def count_points_inside_filter(
+        self,
+        points: np.ndarray,
+        filter: Filter,
+        spatial_index: SpatialIndex = None,
+    ) -> int:
+        if filter.is_box and spatial_index is not None:
+            return spatial_index.count_in_box(filter.box.bounds)
+
+        return int(np.count_nonzero(self.get_inside_filter_mask(points, filter)))
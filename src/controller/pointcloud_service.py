@@ -2,6 +2,14 @@ import os
 import numpy as np
 import pyvista as pv
 from model.pointcloud import Pointcloud
+from utils.voxel import voxel_downsample_indices
+
+# Voxel grid resolution (along the diagonal) of the finest LOD level, each
+# coarser level halves it
+LOD_MAX_RESOLUTION = 1024
+LOD_MAX_LEVELS = 6
+LOD_MIN_POINTS = 10_000
+LOD_MIN_REDUCTION = 0.8
 
 
 class PointcloudService:
@@ -10,7 +18,7 @@ class PointcloudService:
 
     def get_pointcloud_data_from_path(
         self, pointcloud_list: list[Pointcloud], path: str
-    ) -> tuple[str, pv.PolyData]:
+    ) -> tuple[str, pv.PolyData, list[pv.PolyData]]:
         pointcloud_data = None
 
         if path.endswith((".ply", ".pcd", ".xyz")):
@@ -28,8 +36,59 @@ class PointcloudService:
                 )
 
         name = self.get_pointcloud_name_from_path(pointcloud_list, path)
+        lods = self.build_lod_pyramid(pointcloud_data)
+
+        return name, pointcloud_data, lods
+
+    def build_lod_pyramid(self, pointcloud_data: pv.PolyData) -> list[pv.PolyData]:
+        lods = [pointcloud_data]
+
+        if pointcloud_data.n_points <= LOD_MIN_POINTS:
+            return lods
+
+        diagonal = pointcloud_data.length
+        resolution = LOD_MAX_RESOLUTION
+
+        while len(lods) < LOD_MAX_LEVELS and resolution >= 1:
+            previous_lod = lods[-1]
+            indices = voxel_downsample_indices(
+                np.asarray(previous_lod.points), diagonal / resolution
+            )
+            resolution //= 2
+
+            if len(indices) > LOD_MIN_REDUCTION * previous_lod.n_points:
+                continue  # Voxels still finer than the point spacing
+
+            lods.append(self.extract_points(previous_lod, indices))
+
+            if len(indices) <= LOD_MIN_POINTS:
+                break
+
+        return lods
+
+    def get_subsample_indices(self, n_points: int, n_samples: int) -> np.ndarray:
+        # Evenly spaced, so the same subsample is drawn from a frame to another
+        if n_samples >= n_points:
+            return np.arange(n_points)
+
+        return np.linspace(0, n_points - 1, max(n_samples, 0)).astype(np.int64)
+
+    def extract_points(
+        self, pointcloud: pv.PolyData, selection: np.ndarray
+    ) -> pv.PolyData:
+        extracted = pv.PolyData(np.asarray(pointcloud.points)[selection])
+
+        for name in pointcloud.point_data.keys():
+            extracted.point_data[name] = np.asarray(pointcloud.point_data[name])[
+                selection
+            ]
+
+        active_scalars_name = pointcloud.point_data.active_scalars_name
+
+        if active_scalars_name is not None:
+            extracted.point_data.active_scalars_name = active_scalars_name
 
-        return name, pointcloud_data
+        return extracted
 
     def get_pointcloud_name_from_path(
         self, pointclouds_list: list[Pointcloud], path: str
@@ -0,0 +1,218 @@
+import lzma
+import time
+import zlib
+from threading import BoundedSemaphore, Thread, Event, Lock
+from controller.controller import Controller
+from controller.socket import RENDER_BUFFERS_COUNT, STREAM_COLORS, Socket
+from model.frame import to_frame, voxel_downsample_frame
+from model.frame_log import FrameLogReader
+from model.socket_stream import SocketStream
+from utils.log import Log
+
+POSITION_UPDATE_INTERVAL = 0.1  # s between two updates of the replay position
+TOKEN_WAIT_TIMEOUT = 0.1  # s between two checks of the replay stop
+
+
+# Replays a frame log recorded by the socket, through the same frames mailbox.
+# The replay is timed on the reception times, divided by the speed, and
+# restarts its timing on each seek or speed change.
+class Replay:
+    _instance = None
+
+    def __new__(cls):
+        if not cls._instance:
+            cls._instance = super(Replay, cls).__new__(cls)
+            cls._instance._initialized = False
+
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        super().__init__()
+        self._initialized = True
+
+        self.controller: Controller = Controller()
+        self.controller.start_replay_signal.connect(self.start_replay)
+        self.controller.set_replay_speed_signal.connect(self.set_replay_speed)
+        self.controller.seek_replay_signal.connect(self.seek_replay)
+        self.controller.stop_replay_signal.connect(self.stop_replay)
+        self.controller.stop_socket_signal.connect(self.stop_replay)
+
+        # Replayed streams share the ids of the socket streams
+        self.socket: Socket = Socket()
+        self.frame_log_reader: FrameLogReader = None
+        self.streams: dict[int, SocketStream] = {}  # By recorded stream id
+
+        self.speed: float = 1.0  # 0 for as fast as possible
+        self.position: int = 0  # Next frame replayed
+        self.reference_position: int = 0
+        self.reference_time: float = 0.0
+        self.lock: Lock = Lock()
+
+        # Frames the viewer may hold, as the receive buffers of the socket
+        # clients: the replay waits for the viewer to release one
+        self.frame_tokens: BoundedSemaphore = None
+
+        self.wake_event: Event = Event()
+        self.replay_thread: Thread = None
+        self.is_running: bool = False
+
+    def start_replay(self, path: str, speed: float):
+        self.stop_replay()
+
+        try:
+            self.frame_log_reader = FrameLogReader(path)
+
+        except (OSError, ValueError) as error:
+            self.controller.notify(Log.ERROR, f"Unable to replay {path}: {error}")
+            return
+
+        for recorded_id in self.frame_log_reader.stream_ids:
+            stream_id = next(self.socket.stream_ids)
+            stream = SocketStream(
+                stream_id,
+                f"Replay {recorded_id}",
+                0,
+                STREAM_COLORS[stream_id % len(STREAM_COLORS)],
+            )
+            self.streams[int(recorded_id)] = stream
+            self.controller.client_connected(stream)
+
+        mailbox_capacity = self.controller.frame_mailbox.stream_capacity or 0
+        self.frame_tokens = BoundedSemaphore(
+            (RENDER_BUFFERS_COUNT + mailbox_capacity) * len(self.streams)
+        )
+
+        self.speed = speed
+        self.seek_replay(0)
+        self.is_running = True
+        self.replay_thread = Thread(target=self.run_replay, daemon=True)
+        self.replay_thread.start()
+
+        self.controller.update_replay_state(True)
+        self.controller.notify(
+            Log.SUCCESS,
+            f"Replaying {self.frame_log_reader.n_frames} frames from: {path}",
+        )
+
+    def run_replay(self):
+        n_frames = self.frame_log_reader.n_frames
+        update_time = 0.0
+
+        while self.is_running:
+            self.wake_event.clear()
+
+            # Stopped just before the clear, its wake up was lost
+            if not self.is_running:
+                break
+
+            with self.lock:
+                position = self.position
+                delay = self.get_delay(position)
+
+            if position >= n_frames:
+                self.controller.update_replay_position(n_frames, n_frames)
+                self.wake_event.wait()  # Until a seek, or the replay stop
+                continue
+
+            # Woken up early by a seek or a speed change
+            if delay > 0 and self.wake_event.wait(delay):
+                continue
+
+            with self.lock:
+                if self.position != position:
+                    continue
+
+                self.position += 1
+
+            if not self.acquire_frame_token():
+                break
+
+            self.replay_frame(position)
+
+            if time.monotonic() - update_time > POSITION_UPDATE_INTERVAL:
+                update_time = time.monotonic()
+                self.controller.update_replay_position(position, n_frames)
+
+    def get_delay(self, position: int) -> float:
+        if not self.speed or position >= self.frame_log_reader.n_frames:
+            return 0.0
+
+        times = self.frame_log_reader.times
+        replay_time = (times[position] - times[self.reference_position]) / self.speed
+
+        return self.reference_time + replay_time - time.monotonic()
+
+    def acquire_frame_token(self) -> bool:
+        # False when the replay is stopped while waiting
+        while not self.frame_tokens.acquire(timeout=TOKEN_WAIT_TIMEOUT):
+            if not self.is_running:
+                return False
+
+        return True
+
+    def replay_frame(self, index: int):
+        decode_start = time.perf_counter()
+
+        try:
+            header, records, quantization = self.frame_log_reader.read_frame(index)
+
+        except (ValueError, TypeError, zlib.error, lzma.LZMAError):
+            self.frame_tokens.release()
+            self.controller.notify(Log.DEBUG, f"Invalid frame {index} in the replay")
+            return
+
+        stream = self.streams[self.frame_log_reader.get_stream_id(index)]
+
+        # Mapped from the log file, only the token is released with the frame
+        frame = to_frame(
+            header, records, quantization, stream.id, self.frame_tokens.release
+        )
+        frame = voxel_downsample_frame(frame, stream.voxel_size)
+        frame.receive_time = time.monotonic()
+        stream.telemetry.add_bytes(self.frame_log_reader.get_frame_size(index))
+        stream.telemetry.add_frame(frame.n_points, time.perf_counter() - decode_start)
+        self.controller.post_socket_frame(frame)
+
+    def set_replay_speed(self, speed: float):
+        with self.lock:
+            self.speed = speed
+            self.reference_position = self.position
+            self.reference_time = time.monotonic()
+
+        self.wake_event.set()
+
+    def seek_replay(self, index: int):
+        if self.frame_log_reader is None:
+            return
+
+        # Constant time, from the fixed size entries of the index
+        with self.lock:
+            last_position = max(self.frame_log_reader.n_frames - 1, 0)
+            self.position = min(max(index, 0), last_position)
+            self.reference_position = self.position
+            self.reference_time = time.monotonic()
+
+        self.wake_event.set()
+
+    def stop_replay(self):
+        if self.frame_log_reader is None:
+            return
+
+        self.is_running = False
+        self.wake_event.set()
+
+        if self.replay_thread is not None:
+            self.replay_thread.join()
+            self.replay_thread = None
+
+        for stream in self.streams.values():
+            self.controller.client_disconnected(stream)
+
+        self.streams.clear()
+        self.frame_log_reader.close()
+        self.frame_log_reader = None
+        self.controller.update_replay_state(False)
+        self.controller.notify(Log.SUCCESS, "Replay stopped")
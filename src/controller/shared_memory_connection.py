@@ -0,0 +1,241 @@
+import lzma
+import mmap
+import os
+import socket
+import sys
+import time
+import zlib
+from functools import partial
+from multiprocessing import shared_memory
+from threading import Lock
+from typing import Callable
+from controller.controller import Controller
+from model.frame import Frame, to_frame
+from model.socket_stream import SocketStream
+from utils.log import Log
+from utils.protocol import (
+    RELEASE_STRUCT,
+    SHARED_MEMORY_MAGIC,
+    SHARED_MEMORY_STRUCT,
+    SLOT_STRUCT,
+    decode_frame,
+    decode_shared_memory_hello,
+)
+
+
+# Existing POSIX shared memory, mapped without registering it in the resource
+# tracker. Unregistering it after attaching is not enough: a producer forked
+# from the viewer shares its tracker, and has unregistered it already.
+class MappedSharedMemory:
+    def __init__(self, name: str):
+        import _posixshmem  # POSIX only
+
+        fd = _posixshmem.shm_open("/" + name, os.O_RDWR, mode=0o600)
+
+        try:
+            self.size: int = os.fstat(fd).st_size
+            self._mmap: mmap.mmap = mmap.mmap(fd, self.size)
+
+        finally:
+            os.close(fd)
+
+        self.buf: memoryview = memoryview(self._mmap)
+
+    def close(self):
+        self.buf.release()
+        self._mmap.close()
+
+
+def open_shared_memory(name: str) -> shared_memory.SharedMemory | MappedSharedMemory:
+    # Owned by the producer: not to be tracked, nor unlinked when the viewer exits
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    if os.name == "nt":  # Never tracked on Windows
+        return shared_memory.SharedMemory(name=name)
+
+    return MappedSharedMemory(name)
+
+
+# Producer on the same host, writing its frames into a shared memory ring. The
+# frames are mapped without copy, and their slot handed back to the producer
+# once released by the viewer.
+class SharedMemoryConnection:
+    def __init__(self, conn: socket.socket, stream: SocketStream):
+        self.controller: Controller = Controller()
+
+        self.conn: socket.socket = conn
+        self.conn.setblocking(False)
+        self.stream: SocketStream = stream
+        self.is_closed: bool = False
+        self.is_draining: bool = False
+        self.n_drained_frames: int = 0
+
+        self.shared_memory: shared_memory.SharedMemory | MappedSharedMemory = None
+        self.n_slots: int = 0
+        self.slot_size: int = 0
+
+        self.message: bytearray = bytearray(SHARED_MEMORY_STRUCT.size)
+        self.view: memoryview = None
+        self.received_size: int = 0
+        self.on_received: Callable[[], Frame | None] = None
+
+        # Written by the thread releasing the frames, usually the viewer's
+        self.releases: bytearray = bytearray()
+        self.release_lock: Lock = Lock()
+
+        self.expect(SHARED_MEMORY_STRUCT.size, self.on_hello)
+
+    @property
+    def is_waiting_buffer(self) -> bool:
+        # The producer waits for the released slots itself
+        return False
+
+    def fileno(self) -> int:
+        return self.conn.fileno()
+
+    def receive(self) -> Frame | None:
+        self.send_releases()
+
+        try:
+            packet_size = self.conn.recv_into(
+                self.view[self.received_size :], len(self.view) - self.received_size
+            )
+
+        except BlockingIOError:
+            return None
+
+        except OSError:
+            self.close()
+            return None
+
+        if not packet_size:
+            self.close()
+            return None
+
+        self.received_size += packet_size
+
+        if self.received_size < len(self.view):
+            return None
+
+        decode_start = time.perf_counter()
+        frame = self.on_received()
+
+        if frame is not None:
+            decode_time = time.perf_counter() - decode_start
+            self.stream.telemetry.add_frame(frame.n_points, decode_time)
+
+        return frame
+
+    def expect(self, size: int, on_received: Callable[[], Frame | None]):
+        self.view = memoryview(self.message)[:size]
+        self.received_size = 0
+        self.on_received = on_received
+
+    def on_hello(self) -> None:
+        self.close_shared_memory()
+
+        try:
+            name, self.n_slots, self.slot_size = decode_shared_memory_hello(
+                self.message
+            )
+            self.shared_memory = open_shared_memory(name)
+
+        except (ValueError, OSError) as error:
+            self.fail(error)
+            return
+
+        if self.shared_memory.size < self.n_slots * self.slot_size:
+            self.fail(ValueError("Shared memory smaller than its slots"))
+            return
+
+        self.expect(SLOT_STRUCT.size, self.on_slot)
+
+    def on_slot(self) -> Frame | None:
+        if self.message[: len(SHARED_MEMORY_MAGIC)] == SHARED_MEMORY_MAGIC:
+            # Larger ring, announced once all the slots of this one are released
+            self.view = memoryview(self.message)[
+                SLOT_STRUCT.size : SHARED_MEMORY_STRUCT.size
+            ]
+            self.received_size = 0
+            self.on_received = self.on_hello
+            return None
+
+        index, _, frame_size = SLOT_STRUCT.unpack_from(self.message)
+        self.expect(SLOT_STRUCT.size, self.on_slot)
+
+        if index >= self.n_slots or frame_size > self.slot_size:
+            self.fail(ValueError(f"Slot {index} out of the shared memory"))
+            return None
+
+        if self.is_draining:
+            self.release_slot(index)
+            self.n_drained_frames += 1
+            return None
+
+        offset = index * self.slot_size
+        self.stream.telemetry.add_bytes(frame_size)
+
+        try:
+            header, records, quantization = decode_frame(
+                self.shared_memory.buf[offset : offset + frame_size]
+            )
+
+        except (ValueError, TypeError, zlib.error, lzma.LZMAError):
+            self.release_slot(index)
+            self.controller.notify(
+                Log.DEBUG,
+                f"Data received from {self.stream.name}, but wrong data format",
+            )
+            return None
+
+        # Decompressed frames are in their own records, their slot is held all
+        # the same, so that the viewer throttles the producer
+        release_callback = partial(self.release_slot, index)
+
+        return to_frame(header, records, quantization, self.stream.id, release_callback)
+
+    def release_slot(self, index: int):
+        with self.release_lock:
+            self.releases += RELEASE_STRUCT.pack(index)
+
+        self.send_releases()
+
+    def send_releases(self):
+        # Non-blocking, what is not sent now is sent on the next call
+        with self.release_lock:
+            if not self.releases or self.is_closed:
+                return
+
+            try:
+                sent_size = self.conn.send(self.releases)
+
+            except OSError:
+                return
+
+            del self.releases[:sent_size]
+
+    def close(self):
+        with self.release_lock:
+            self.is_closed = True
+            self.conn.close()
+
+        self.close_shared_memory()
+
+    def close_shared_memory(self):
+        if self.shared_memory is None:
+            return
+
+        try:
+            self.shared_memory.close()
+
+        except BufferError:
+            pass  # Still mapped by frames, unmapped once they are collected
+
+        self.shared_memory = None
+
+    def fail(self, error: Exception):
+        self.controller.notify(
+            Log.ERROR, f"Invalid message from {self.stream.name}: {error}"
+        )
+        self.close()
@@ -1,9 +1,42 @@
-from threading import Thread, Event
+import os
+import selectors
 import socket
-import numpy as np
-import pyvista as pv
+import time
+from itertools import count
+from threading import Thread, Event, Lock
+from typing import Callable
 from controller.controller import Controller
+from controller.datagram_connection import MAX_PENDING_FRAMES, DatagramConnection
+from controller.shared_memory_connection import SharedMemoryConnection
+from controller.socket_connection import SocketConnection
+from model.frame import Frame, voxel_downsample_frame
+from model.frame_log import FrameLogWriter
+from model.socket_stream import SocketStream
+from utils.protocol import (
+    MAX_DATAGRAM_SIZE,
+    SUPPORTED_CODECS,
+    encode_hello,
+    get_shared_memory_path,
+)
 from utils.log import Log
+from utils.pause_mode import PauseMode
+from utils.transport import Transport
+
+RENDER_BUFFERS_COUNT = 2  # Frame drawn and frame being received
+SELECT_TIMEOUT = 0.05  # s, also the delay to resume a client waiting a buffer
+DATAGRAM_BATCH_SIZE = 64  # Datagrams read each time the UDP socket is ready
+DATAGRAM_RECEIVE_BUFFER_SIZE = 8 << 20  # Bytes, absorbs the bursts of fragments
+DATAGRAM_STREAM_TIMEOUT = 5.0  # s without datagram before a source is removed
+STREAM_COLORS = [
+    "#ffffff",
+    "#e41a1c",
+    "#377eb8",
+    "#4daf4a",
+    "#ff7f00",
+    "#984ea3",
+    "#ffff33",
+    "#a65628",
+]
 
 
 class Socket:
@@ -24,124 +57,444 @@ class Socket:
         self._initialized = True
 
         self.controller: Controller = Controller()
-        self.controller.start_socket_signal.connect(
-            lambda port, persistence: self.start_socket(port)
-        )
+        self.controller.start_socket_signal.connect(self.start_socket)
         self.controller.pause_socket_signal.connect(self.pause_socket)
         self.controller.stop_socket_signal.connect(self.stop_socket)
+        self.controller.start_recording_signal.connect(self.start_recording)
+        self.controller.stop_recording_signal.connect(self.stop_recording)
 
         self.port: int = None
-        self.conn: socket = None
+        self.persistence: int = 0  # Of the new streams
         self.server: socket = None
-        self.connected: bool = False
+        self.datagram_server: socket = None
+        self.shared_memory_server: socket = None
+        self.shared_memory_path: str = None  # Removed on close, once bound
+        self.datagram_buffer: bytearray = bytearray(MAX_DATAGRAM_SIZE)
+        self.selector: selectors.BaseSelector = None
+
+        # One stream per connected client, and per UDP source
+        self.connections: dict[int, SocketConnection | SharedMemoryConnection] = {}
+        self.datagram_connections: dict[tuple[str, int], DatagramConnection] = {}
+        self.streams: dict[int, SocketStream] = {}
+        self.stream_ids = count()
+
+        # Streams are identified by their transport and host: a new stream of
+        # an identity whose stream disconnected is a reconnection
+        self.stream_identities: dict[int, tuple[Transport, str]] = {}
+        self.n_disconnected_by_identity: dict[tuple[Transport, str], int] = {}
+        self.n_reconnections_by_identity: dict[tuple[Transport, str], int] = {}
 
         self.pause_event: Event = Event()
         self.pause_event.set()
+        self.is_draining: bool = False
+        self.frame_log_writer: FrameLogWriter = None
+        self.frame_log_lock: Lock = Lock()
         self.socket_thread: Thread = None
+
+        # Consumer of the received frames, replaced by the headless benchmarks
+        self.frame_sink: Callable[[Frame], None] = self.controller.post_socket_frame
         self.is_running: bool = False
 
-    def start_socket(self, port: int):
+    def start_socket(self, port: int, persistence: int):
         if self.is_running:
-            self.pause_event.set()
-            self.controller.notify(Log.INFO, "Socket resumed")
+            self.resume_socket()
             return
 
         self.port = port
-        self.open_connection()
+        self.persistence = persistence
+        self.stream_identities.clear()
+        self.n_disconnected_by_identity.clear()
+        self.n_reconnections_by_identity.clear()
+
+        if not self.open_connection():
+            return
+
         self.is_running = True
         self.pause_event.set()
         self.controller.notify(Log.SUCCESS, f"Starting socket on port: {port}")
         self.socket_thread = Thread(target=self.run_socket, daemon=True)
         self.socket_thread.start()
 
-    def open_connection(self):
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server.bind(("0.0.0.0", self.port))
-        self.server.listen(1)
+    def open_connection(self) -> bool:
+        # False when a server can not be opened, those already open are closed
+        try:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server.bind(("0.0.0.0", self.port))
+            self.server.listen()
+            self.server.setblocking(False)
+
+            # Lossy high-rate feeds, on the same port number
+            self.datagram_server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.datagram_server.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF, DATAGRAM_RECEIVE_BUFFER_SIZE
+            )
+            self.datagram_server.bind(("0.0.0.0", self.port))
+            self.datagram_server.setblocking(False)
+
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.server, selectors.EVENT_READ)
+            self.selector.register(self.datagram_server, selectors.EVENT_READ)
+
+            # Producers on the same host, whose frames are in shared memory
+            if hasattr(socket, "AF_UNIX"):
+                path = get_shared_memory_path(self.port)
+
+                if os.path.exists(path):
+                    os.remove(path)
+
+                self.shared_memory_server = socket.socket(
+                    socket.AF_UNIX, socket.SOCK_STREAM
+                )
+                self.shared_memory_server.bind(path)
+                self.shared_memory_path = path
+                self.shared_memory_server.listen()
+                self.shared_memory_server.setblocking(False)
+                self.selector.register(self.shared_memory_server, selectors.EVENT_READ)
+
+        except OSError as error:
+            self.close_servers()
+            self.controller.notify(
+                Log.ERROR, f"Socket not started on port {self.port}: {error}"
+            )
+            return False
+
+        return True
 
     def run_socket(self):
+        # Single event loop serving all the clients: every ready client gets one
+        # read per iteration, whatever its rate
         while self.is_running:
+            self.pause_event.wait()
+            self.update_registrations()
+
             try:
-                self.conn, _ = self.server.accept()  # conn, addr
-                
+                events = self.selector.select(SELECT_TIMEOUT)
+
             except OSError:
                 break
 
-            if not self.is_running:
-                break
+            for key, _ in events:
+                if not self.is_running:
+                    break
 
-            self.connected = True
-            self.controller.notify(Log.INFO, "Client connected on socket")
+                if key.fileobj is self.server:
+                    self.accept_connection()
 
-            while self.connected:
-                self.pause_event.wait()
-                data_size = self.receive_data(4)
+                elif key.fileobj is self.datagram_server:
+                    self.receive_datagrams()
 
-                if len(data_size) != 4:
-                    break
+                elif key.fileobj is self.shared_memory_server:
+                    self.accept_shared_memory_connection()
 
-                expected_size = int.from_bytes(data_size, byteorder="big")
-                data = self.receive_data(expected_size)
+                else:
+                    self.receive_frame(key.fileobj)
 
-                try:
-                    pointcloud_data = np.frombuffer(data, dtype=np.float32).reshape(
-                        (-1, 3)
-                    )
-                    
-                except ValueError:
-                    self.controller.notify(
-                        Log.DEBUG, "Data socket received, but wrong data format"
-                    )
-                    continue
+            self.expire_datagram_connections()
 
-                pointcloud_object = pv.PolyData(pointcloud_data)
-                self.controller.update_socket_pointcloud(pointcloud_object)
+        self.close_connections()
 
-    def receive_data(self, size):
-        data = b""
+    def update_registrations(self):
+        # Clients whose buffers are all held by the viewer are not read, their
+        # data waits in the system buffers (and their sender) meanwhile
+        for connection in list(self.connections.values()):
+            is_registered = self.is_registered(connection)
 
-        while len(data) < size:
+            if connection.is_waiting_buffer and is_registered:
+                self.selector.unregister(connection)
+
+            elif not connection.is_waiting_buffer and not is_registered:
+                self.selector.register(connection, selectors.EVENT_READ)
+
+    def is_registered(self, connection: SocketConnection) -> bool:
+        try:
+            self.selector.get_key(connection)
+            return True
+
+        except KeyError:
+            return False
+
+    def accept_connection(self):
+        try:
+            conn, (host, port) = self.server.accept()
+
+            # Codecs negotiation, ignored by the legacy clients
+            conn.sendall(encode_hello(SUPPORTED_CODECS))
+
+        except OSError:
+            return
+
+        stream = self.create_stream(f"{host}:{port}", (Transport.TCP, host))
+        stream_id = stream.id
+        # Buffers for the frames drawn, waiting in the mailbox and received
+        mailbox_capacity = self.controller.frame_mailbox.stream_capacity or 0
+        connection = SocketConnection(
+            conn, stream, RENDER_BUFFERS_COUNT + mailbox_capacity
+        )
+        connection.is_draining = self.is_draining
+
+        self.connections[stream_id] = connection
+        self.streams[stream_id] = stream
+        self.selector.register(connection, selectors.EVENT_READ)
+        self.controller.client_connected(stream)
+
+    def accept_shared_memory_connection(self):
+        try:
+            conn, _ = self.shared_memory_server.accept()
+
+        except OSError:
+            return
+
+        stream = self.create_stream("Shared memory", (Transport.SHARED_MEMORY, ""))
+        stream_id = stream.id
+        stream.name = f"Shared memory {stream_id}"
+        connection = SharedMemoryConnection(conn, stream)
+        connection.is_draining = self.is_draining
+
+        self.connections[stream_id] = connection
+        self.streams[stream_id] = stream
+        self.selector.register(connection, selectors.EVENT_READ)
+        self.controller.client_connected(stream)
+
+    def create_stream(self, name: str, identity: tuple[Transport, str]) -> SocketStream:
+        stream_id = next(self.stream_ids)
+        stream = SocketStream(
+            stream_id,
+            name,
+            self.persistence,
+            STREAM_COLORS[stream_id % len(STREAM_COLORS)],
+        )
+
+        # Reconnections of the identity since the socket start, streams open at
+        # the same time are not reconnections
+        if self.n_disconnected_by_identity.get(identity, 0) > 0:
+            self.n_disconnected_by_identity[identity] -= 1
+            self.n_reconnections_by_identity[identity] = (
+                self.n_reconnections_by_identity.get(identity, 0) + 1
+            )
+
+        stream.telemetry.n_reconnections = self.n_reconnections_by_identity.get(
+            identity, 0
+        )
+        self.stream_identities[stream_id] = identity
+
+        return stream
+
+    def forget_stream(self, stream: SocketStream):
+        self.streams.pop(stream.id, None)
+        identity = self.stream_identities.pop(stream.id, None)
+
+        if identity is not None:
+            self.n_disconnected_by_identity[identity] = (
+                self.n_disconnected_by_identity.get(identity, 0) + 1
+            )
+
+        self.controller.client_disconnected(stream)
+
+    def receive_frame(self, connection: SocketConnection | SharedMemoryConnection):
+        frame = connection.receive()
+
+        if frame is not None:
+            self.post_frame(frame)
+
+        if connection.is_closed:
+            self.remove_connection(connection)
+
+    def receive_datagrams(self):
+        # Bounded batch, the TCP clients are served in between
+        for _ in range(DATAGRAM_BATCH_SIZE):
             try:
-                packet = self.conn.recv(size - len(data))
-
-                if not packet:
-                    self.connected = False
-                    self.conn.close()
-
-                data += packet
-                
-            except socket.error:
-                self.connected = False
-                self.conn.close()
-                self.controller.client_disconnected()
-                break
+                size, address = self.datagram_server.recvfrom_into(self.datagram_buffer)
+
+            except OSError:  # No more datagrams, or an ICMP error on Windows
+                return
+
+            connection = self.datagram_connections.get(address)
 
-        return data
+            if connection is None:
+                connection = self.add_datagram_connection(address)
 
-    def pause_socket(self):
-        self.pause_event.clear()
+            frame = connection.receive(memoryview(self.datagram_buffer)[:size])
+
+            if frame is not None:
+                self.post_frame(frame)
+
+    def add_datagram_connection(self, address: tuple[str, int]) -> DatagramConnection:
+        host, port = address
+        stream = self.create_stream(f"{host}:{port} (UDP)", (Transport.UDP, host))
+        stream_id = stream.id
+        # Buffers for the frames drawn, waiting in the mailbox and reassembled
+        mailbox_capacity = self.controller.frame_mailbox.stream_capacity or 0
+        connection = DatagramConnection(
+            address,
+            stream,
+            RENDER_BUFFERS_COUNT + mailbox_capacity + MAX_PENDING_FRAMES - 1,
+        )
+        connection.is_draining = self.is_draining
+
+        self.datagram_connections[address] = connection
+        self.streams[stream_id] = stream
+        self.controller.client_connected(stream)
+
+        return connection
+
+    def expire_datagram_connections(self):
+        now = time.monotonic()
+
+        for connection in list(self.datagram_connections.values()):
+            connection.expire_frames(now)
+
+            # No disconnection over UDP, a silent source is removed
+            if now - connection.last_receive_time > DATAGRAM_STREAM_TIMEOUT:
+                connection.close()
+                self.datagram_connections.pop(connection.address, None)
+                self.forget_stream(connection.stream)
+
+    def post_frame(self, frame: Frame):
+        frame.receive_time = time.monotonic()
+        stream = self.streams.get(frame.stream_id)
+
+        # Sender clock, meaningful with synchronized clocks only
+        if stream is not None and frame.timestamp > 0:
+            stream.telemetry.add_transfer_latency(time.time() - frame.timestamp)
+
+        # Recorded at full resolution, downsampled for the viewer only
+        with self.frame_log_lock:
+            if self.frame_log_writer is not None:
+                self.frame_log_writer.write(frame, frame.receive_time)
+
+        if stream is not None and stream.voxel_size > 0:
+            downsample_start = time.perf_counter()
+            frame = voxel_downsample_frame(frame, stream.voxel_size)
+            stream.telemetry.add_decode_time(time.perf_counter() - downsample_start)
+
+        self.frame_sink(frame)
+
+    def start_recording(self, path: str):
+        self.stop_recording()
+
+        try:
+            frame_log_writer = FrameLogWriter(path)
+
+        except OSError as error:
+            self.controller.notify(Log.ERROR, f"Unable to record the socket: {error}")
+            return
+
+        with self.frame_log_lock:
+            self.frame_log_writer = frame_log_writer
+
+        self.controller.update_recording_state(True)
+        self.controller.notify(Log.SUCCESS, f"Recording socket streams to: {path}")
+
+    def stop_recording(self):
+        with self.frame_log_lock:
+            frame_log_writer, self.frame_log_writer = self.frame_log_writer, None
+
+        if frame_log_writer is None:
+            return
+
+        frame_log_writer.close()
+        self.controller.update_recording_state(False)
+
+        if frame_log_writer.error is not None:
+            self.controller.notify(
+                Log.ERROR,
+                f"Socket streams recording stopped after {frame_log_writer.n_frames} frames: {frame_log_writer.error}",
+            )
+            return
+
+        self.controller.notify(
+            Log.SUCCESS,
+            f"Socket streams recorded: {frame_log_writer.n_frames} frames to {frame_log_writer.path}",
+        )
+
+    def remove_connection(self, connection: SocketConnection | SharedMemoryConnection):
+        if self.is_registered(connection):
+            self.selector.unregister(connection)
+
+        self.connections.pop(connection.stream.id, None)
+        self.forget_stream(connection.stream)
+
+    def close_connections(self):
+        for connection in self.connections.values():
+            connection.close()
+
+        for connection in self.datagram_connections.values():
+            connection.close()
+
+        self.connections.clear()
+        self.datagram_connections.clear()
+        self.streams.clear()
+
+        self.close_servers()
+
+    def close_servers(self):
+        if self.selector is not None:
+            self.selector.close()
+            self.selector = None
+
+        for server in (self.server, self.datagram_server, self.shared_memory_server):
+            if server is not None:
+                server.close()
+
+        self.server = None
+        self.datagram_server = None
+        self.shared_memory_server = None
+
+        if self.shared_memory_path is not None:
+            try:
+                os.remove(self.shared_memory_path)
+
+            except FileNotFoundError:
+                pass  # Removed by another viewer on the same port since
+
+            self.shared_memory_path = None
+
+    def pause_socket(self, mode: PauseMode):
+        if mode == PauseMode.DRAIN:
+            # The event loop keeps reading the clients, at full speed since the
+            # discarded frames release their buffers at once
+            self.set_draining(True)
+
+        else:
+            self.pause_event.clear()
+
+    def resume_socket(self):
+        n_drained_frames = sum(
+            connection.n_drained_frames for connection in self.get_connections()
+        )
+        self.set_draining(False)
+        self.pause_event.set()
+
+        if n_drained_frames:
+            self.controller.notify(
+                Log.INFO, f"Socket resumed, {n_drained_frames} frames discarded"
+            )
+
+        else:
+            self.controller.notify(Log.INFO, "Socket resumed")
+
+    def set_draining(self, is_draining: bool):
+        self.is_draining = is_draining
+
+        for connection in self.get_connections():
+            connection.is_draining = is_draining
+            connection.n_drained_frames = 0
+
+    def get_connections(
+        self,
+    ) -> list[SocketConnection | SharedMemoryConnection | DatagramConnection]:
+        # Copied, the socket thread may add or remove connections meanwhile
+        return list(self.connections.values()) + list(
+            self.datagram_connections.values()
+        )
 
     def stop_socket(self):
         self.is_running = False
+        self.is_draining = False
         self.pause_event.set()
 
-        if self.conn:
-            try:
-                self.conn.shutdown(socket.SHUT_RDWR)
-                
-            except OSError:
-                pass
-            
-            self.conn.close()
-            self.conn = None
-
-        if self.server:
-            try:
-                self.server.shutdown(socket.SHUT_RDWR)
-                
-            except OSError:
-                pass
-            
-            self.server.close()
-            self.server = None
+        # The event loop closes the connections when it stops
+        if self.socket_thread is not None:
+            self.socket_thread.join()
+            self.socket_thread = None
@@ -0,0 +1,319 @@
+import lzma
+import zlib
+import socket
+import time
+from functools import partial
+from typing import Callable
+import numpy as np
+from controller.controller import Controller
+from model.buffer_pool import BufferPool
+from model.frame import Frame, to_frame
+from model.socket_stream import SocketStream
+from utils.log import Log
+from utils.protocol import (
+    CODEC_MASK,
+    FIELD_STRUCT,
+    FRAME_MAGIC,
+    HEADER_STRUCT,
+    LEGACY_SIZE_LENGTH,
+    MAX_FRAME_SIZE,
+    QUANTIZATION_STRUCT,
+    QUANTIZED_FLAG,
+    RANGE_STRUCT,
+    XYZ_DTYPE,
+    FrameHeader,
+    FrameType,
+    check_frame_size,
+    decode_fields,
+    decode_header,
+    decode_quantization,
+    decompress_payload,
+)
+
+READ_CHUNK_SIZE = 1 << 20  # Bytes read from a client each time it is ready
+
+
+# Non-blocking client of the socket server, decoding its frames incrementally:
+# each call reads at most one chunk, so that a fast client can not starve the
+# other ones served by the same event loop.
+class SocketConnection:
+    def __init__(self, conn: socket.socket, stream: SocketStream, n_buffers: int = 2):
+        self.controller: Controller = Controller()
+
+        self.conn: socket.socket = conn
+        self.conn.setblocking(False)
+        self.stream: SocketStream = stream
+        self.is_closed: bool = False
+        self.is_draining: bool = False  # Frames read but discarded, when paused
+        self.n_drained_frames: int = 0
+
+        self.buffer_pool: BufferPool = BufferPool(n_buffers)
+        self.header: bytearray = bytearray(HEADER_STRUCT.size)
+        self.compressed_buffer: bytearray = bytearray()
+        self.sequence: int = 0
+
+        self.view: memoryview = None  # None while waiting for a free buffer
+        self.received_size: int = 0
+        self.on_received: Callable[[], Frame | None] = None
+
+        self.frame_header: FrameHeader = None
+        self.dtype: np.dtype = None
+        self.quantization = None
+        self.buffer: bytearray = None
+
+        self.start_frame()
+
+    @property
+    def is_waiting_buffer(self) -> bool:
+        return self.view is None and not self.buffer_pool.has_free_buffer
+
+    def fileno(self) -> int:
+        return self.conn.fileno()
+
+    def receive(self) -> Frame | None:
+        has_read = False
+
+        while not self.is_closed:
+            if self.view is None and not self.acquire_buffer():
+                return None
+
+            if self.received_size < len(self.view):
+                if has_read:
+                    return None
+
+                has_read = True
+
+                if not self.read_chunk():
+                    return None
+
+                if self.received_size < len(self.view):
+                    return None
+
+            decode_start = time.perf_counter()
+            frame = self.on_received()
+
+            if frame is not None:
+                decode_time = time.perf_counter() - decode_start
+                self.stream.telemetry.add_frame(frame.n_points, decode_time)
+                return frame
+
+        return None
+
+    def read_chunk(self) -> bool:
+        size = min(len(self.view) - self.received_size, READ_CHUNK_SIZE)
+
+        try:
+            packet_size = self.conn.recv_into(self.view[self.received_size :], size)
+
+        except BlockingIOError:
+            return False
+
+        except OSError:
+            self.close()
+            return False
+
+        if not packet_size:
+            self.close()
+            return False
+
+        self.received_size += packet_size
+        self.stream.telemetry.add_bytes(packet_size)
+
+        return True
+
+    def close(self):
+        self.is_closed = True
+        self.buffer_pool.close()
+        self.conn.close()
+
+    def expect(self, view: memoryview, on_received: Callable[[], Frame | None]):
+        self.view = view
+        self.received_size = 0
+        self.on_received = on_received
+
+    def start_frame(self):
+        self.frame_header = None
+        self.dtype = None
+        self.quantization = None
+        self.buffer = None
+        self.expect(memoryview(self.header)[:LEGACY_SIZE_LENGTH], self.on_magic)
+
+    def on_magic(self) -> None:
+        header = memoryview(self.header)
+
+        if header[:LEGACY_SIZE_LENGTH] == FRAME_MAGIC:
+            self.expect(header[LEGACY_SIZE_LENGTH:], self.on_header)
+            return
+
+        # Legacy frame, raw float32 xyz
+        payload_size = int.from_bytes(header[:LEGACY_SIZE_LENGTH], byteorder="big")
+
+        if payload_size > MAX_FRAME_SIZE:
+            self.fail(ValueError("Frame larger than the maximum frame size"))
+            return
+
+        self.dtype = XYZ_DTYPE
+        self.frame_header = FrameHeader(
+            0,
+            FrameType.POINTS,
+            len(self.dtype.names),
+            0,
+            payload_size // self.dtype.itemsize,
+            self.sequence,
+            0.0,
+            payload_size,
+        )
+        self.wait_buffer()
+
+    def on_header(self) -> None:
+        try:
+            self.frame_header = decode_header(self.header)
+
+        except ValueError as error:
+            self.fail(error)
+            return
+
+        fields = bytearray(self.frame_header.n_fields * FIELD_STRUCT.size)
+        self.expect(memoryview(fields), partial(self.on_fields, fields))
+
+    def on_fields(self, fields: bytearray) -> None:
+        try:
+            self.dtype = decode_fields(
+                fields, self.frame_header.n_fields, self.frame_header.frame_type
+            )
+            check_frame_size(self.frame_header.n_points, self.dtype)
+
+        except (ValueError, TypeError) as error:
+            self.fail(error)
+            return
+
+        if self.frame_header.flags & QUANTIZED_FLAG:
+            quantization_data = bytearray(QUANTIZATION_STRUCT.size)
+            self.expect(
+                memoryview(quantization_data),
+                partial(self.on_quantization, quantization_data),
+            )
+
+        else:
+            self.expect_range()
+
+    def on_quantization(self, quantization_data: bytearray) -> None:
+        self.quantization = decode_quantization(quantization_data)
+        self.expect_range()
+
+    def expect_range(self):
+        if self.frame_header.frame_type != FrameType.REPLACE:
+            self.wait_buffer()
+            return
+
+        range_data = bytearray(RANGE_STRUCT.size)
+        self.expect(memoryview(range_data), partial(self.on_range, range_data))
+
+    def on_range(self, range_data: bytearray) -> None:
+        (self.frame_header.range_start,) = RANGE_STRUCT.unpack(range_data)
+        self.wait_buffer()
+
+    def wait_buffer(self):
+        self.sequence = self.frame_header.sequence + 1
+        self.view = None
+
+    def acquire_buffer(self) -> bool:
+        payload_size = self.frame_header.payload_size
+        is_compressed = self.frame_header.flags & CODEC_MASK
+        frame_size = self.frame_header.n_points * self.dtype.itemsize
+
+        self.buffer = self.buffer_pool.acquire(
+            frame_size if is_compressed else payload_size
+        )
+
+        if self.buffer is None:
+            return False
+
+        if not is_compressed:
+            self.expect(memoryview(self.buffer)[:payload_size], self.on_payload)
+            return True
+
+        if len(self.compressed_buffer) < payload_size:
+            self.compressed_buffer = bytearray(payload_size)
+
+        self.expect(
+            memoryview(self.compressed_buffer)[:payload_size],
+            self.on_compressed_payload,
+        )
+
+        return True
+
+    def on_payload(self) -> Frame | None:
+        if self.is_draining:
+            self.drain_frame()
+            return None
+
+        frame_size = self.frame_header.n_points * self.dtype.itemsize
+
+        if self.frame_header.payload_size != frame_size:
+            self.discard_frame()
+            return None
+
+        # Decoded in a single pass: the records, and the xyz when they are only
+        # float32 coordinates, are views on the receive buffer
+        return self.create_frame()
+
+    def on_compressed_payload(self) -> Frame | None:
+        if self.is_draining:
+            self.drain_frame()
+            return None
+
+        # Decompressed here, in the socket thread, into the receive buffer
+        try:
+            decompress_payload(self.view, self.frame_header.flags, self.get_records())
+
+        except (ValueError, zlib.error, lzma.LZMAError):
+            self.discard_frame()
+            return None
+
+        return self.create_frame()
+
+    def get_records(self) -> np.ndarray:
+        return np.frombuffer(
+            self.buffer, dtype=self.dtype, count=self.frame_header.n_points
+        )
+
+    def create_frame(self) -> Frame | None:
+        # Quantized coordinates are dequantized here, in the socket thread
+        try:
+            frame = to_frame(
+                self.frame_header,
+                self.get_records(),
+                self.quantization,
+                self.stream.id,
+                partial(self.buffer_pool.release, self.buffer),
+            )
+
+        except (ValueError, TypeError):
+            self.discard_frame()
+            return None
+
+        self.start_frame()
+
+        return frame
+
+    def drain_frame(self):
+        # Neither decompressed nor decoded, the frame boundaries are enough
+        self.buffer_pool.release(self.buffer)
+        self.n_drained_frames += 1
+        self.start_frame()
+
+    def discard_frame(self):
+        self.buffer_pool.release(self.buffer)
+        self.controller.notify(
+            Log.DEBUG,
+            f"Data received from {self.stream.name}, but wrong data format",
+        )
+        self.start_frame()
+
+    def fail(self, error: Exception):
+        # The frames boundaries are lost, the client is disconnected
+        self.controller.notify(
+            Log.ERROR, f"Invalid frame from {self.stream.name}: {error}"
+        )
+        self.close()
@@ -0,0 +1,41 @@
+from threading import Lock
+
+
+# Fixed set of reusable receive buffers shared between the socket thread, which
+# writes frames into them, and the render side, which releases them once the
+# points are copied. With two buffers, a frame is received while the previous
+# one is drawn; the client is not read while the render side holds both.
+class BufferPool:
+    def __init__(self, n_buffers: int = 2):
+        self._free_buffers: list[bytearray] = [bytearray() for _ in range(n_buffers)]
+        self._lock = Lock()
+        self._is_closed = False
+
+    @property
+    def is_closed(self) -> bool:
+        return self._is_closed
+
+    @property
+    def has_free_buffer(self) -> bool:
+        return bool(self._free_buffers) and not self._is_closed
+
+    def acquire(self, size: int) -> bytearray | None:
+        # Never blocks, the socket event loop serves the other clients meanwhile
+        with self._lock:
+            if not self._free_buffers or self._is_closed:
+                return None
+
+            buffer = self._free_buffers.pop()
+
+        if len(buffer) < size:  # Grown with some margin for the next frames
+            buffer = bytearray(max(size, len(buffer) * 3 // 2))
+
+        return buffer
+
+    def release(self, buffer: bytearray):
+        with self._lock:
+            self._free_buffers.append(buffer)
+
+    def close(self):
+        with self._lock:
+            self._is_closed = True
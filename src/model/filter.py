@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import numpy as np
 import pyvista as pv
 from pyvista import PolyData
 
@@ -8,6 +9,7 @@ class Filter:
     _name: str
     _box: PolyData
     _color: str
+    _is_box: bool
 
     def __init__(
         self,
@@ -31,6 +33,10 @@ class Filter:
     def color(self) -> str:
         return self._color
 
+    @property
+    def is_box(self) -> bool:
+        return self._is_box
+
     @name.setter
     def name(self, name: str):
         self._name = name
@@ -39,9 +45,23 @@ class Filter:
     def box(self, box: PolyData | tuple[float, float, float, float, float, float]):
         if isinstance(box, PolyData):
             self._box = box
+            self._is_box = is_axis_aligned_box(box)
         else:
             self._box = pv.Box(bounds=box)
+            self._is_box = True
 
     @color.setter
     def color(self, color: str):
         self._color = color
+
+
+def is_axis_aligned_box(mesh: PolyData) -> bool:
+    # Every vertex of an axis-aligned box lies on its bounds on the 3 axes
+    if mesh.n_points == 0:
+        return False
+
+    points = np.asarray(mesh.points)
+    bounds = np.asarray(mesh.bounds).reshape(3, 2)
+    on_bounds = (points == bounds[:, 0]) | (points == bounds[:, 1])
+
+    return bool(np.all(on_bounds))
@@ -0,0 +1,151 @@
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable
+import numpy as np
+from utils.protocol import (
+    DELTA_FRAME_TYPES,
+    FrameHeader,
+    FrameType,
+    Quantization,
+    get_attributes,
+    get_xyz,
+)
+from utils.voxel import voxel_downsample_indices
+
+
+# Release callback shared by several holders of a frame, called once all of
+# them released it
+class SharedRelease:
+    def __init__(self, release_callback: Callable[[], None], n_holders: int):
+        self._release_callback: Callable[[], None] = release_callback
+        self._n_holders: int = n_holders
+        self._lock: Lock = Lock()
+
+    def release(self):
+        with self._lock:
+            self._n_holders -= 1
+
+            if self._n_holders > 0:
+                return
+
+        self._release_callback()
+
+
+@dataclass
+class Frame:
+    _points: np.ndarray
+    _attributes: dict[str, np.ndarray] = field(default_factory=dict)
+    _sequence: int = 0
+    _timestamp: float = 0.0
+    _stream_id: int = 0
+    _release_callback: Callable[[], None] | None = field(
+        default=None, repr=False, compare=False
+    )
+    _receive_time: float = field(default=0.0, compare=False)  # Monotonic (s)
+    _frame_type: FrameType = FrameType.POINTS
+    _range_start: int = 0  # First point replaced, for the replace frames
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points
+
+    @property
+    def n_points(self) -> int:
+        return len(self._points)
+
+    @property
+    def attributes(self) -> dict[str, np.ndarray]:
+        return self._attributes
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    @property
+    def timestamp(self) -> float:
+        return self._timestamp
+
+    @property
+    def stream_id(self) -> int:
+        return self._stream_id
+
+    @property
+    def receive_time(self) -> float:
+        return self._receive_time
+
+    @property
+    def frame_type(self) -> FrameType:
+        return self._frame_type
+
+    @property
+    def range_start(self) -> int:
+        return self._range_start
+
+    @property
+    def is_delta(self) -> bool:
+        # Updates the points of the previous frames, can not be dropped
+        return self._frame_type in DELTA_FRAME_TYPES
+
+    @receive_time.setter
+    def receive_time(self, receive_time: float):
+        self._receive_time = receive_time
+
+    def retain(self) -> Callable[[], None]:
+        # Another holder of the points, which are released with the last holder
+        if self._release_callback is None:
+            return lambda: None
+
+        shared_release = SharedRelease(self._release_callback, 2)
+        self._release_callback = shared_release.release
+
+        return shared_release.release
+
+    def release(self):
+        # The points and attributes may be views on a receive buffer: they must
+        # not be used once the frame is released and the buffer handed back
+        if self._release_callback is not None:
+            self._release_callback()
+            self._release_callback = None
+
+
+def to_frame(
+    header: FrameHeader,
+    records: np.ndarray,
+    quantization: Quantization | None,
+    stream_id: int,
+    release_callback: Callable[[], None] | None = None,
+) -> Frame:
+    # Quantized coordinates are dequantized here, in the calling thread
+    return Frame(
+        get_xyz(records, quantization),
+        get_attributes(records),
+        header.sequence,
+        header.timestamp,
+        stream_id,
+        release_callback,
+        _frame_type=header.frame_type,
+        _range_start=header.range_start,
+    )
+
+
+def voxel_downsample_frame(frame: Frame, voxel_size: float) -> Frame:
+    # First point of each voxel, copied. The received buffer is still held
+    # until the downsampled frame is released, so that the viewer keeps
+    # throttling the sender. Keyframes and delta frames are kept whole, their
+    # points indices are used by the next frames
+    if voxel_size <= 0 or frame.frame_type != FrameType.POINTS:
+        return frame
+
+    indices = voxel_downsample_indices(frame.points, voxel_size)
+    downsampled_frame = Frame(
+        frame.points[indices],
+        {name: values[indices] for name, values in frame.attributes.items()},
+        frame.sequence,
+        frame.timestamp,
+        frame.stream_id,
+        frame.retain(),
+        frame.receive_time,
+    )
+    frame.release()
+
+    return downsampled_frame
@@ -0,0 +1,196 @@
+import mmap
+import os
+from queue import Queue
+from threading import Thread
+from typing import Callable
+import numpy as np
+from model.frame import Frame
+from utils.protocol import (
+    INDEX_FIELD,
+    FrameHeader,
+    FrameType,
+    Quantization,
+    decode_frame,
+    encode_header,
+    to_index_records,
+    to_records,
+)
+
+INDEX_EXTENSION = ".idx"
+WRITE_QUEUE_SIZE = 16  # Frames waiting for the writer thread
+INDEX_DTYPE = np.dtype(
+    [
+        ("offset", "<u8"),
+        ("size", "<u8"),
+        ("time", "<f8"),  # Reception time (s), for the replay timing
+        ("stream_id", "<u4"),
+    ]
+)
+
+
+# Append-only log of the received frames: a data file with the frames encoded
+# back to back, as over the socket, and an index file with a fixed size entry
+# per frame, so that any frame is found in constant time. The frames are
+# encoded and written by a writer thread, their points are held until then.
+class FrameLogWriter:
+    def __init__(self, path: str):
+        self._path: str = path
+        self._data_file = open(path, "wb")
+        self._index_file = open(path + INDEX_EXTENSION, "wb")
+        self._offset: int = 0
+        self._n_frames: int = 0
+        self._start_time: float = None
+        self._error: OSError = None  # Frames are no longer written after it
+
+        # None stops the writer thread
+        self._queue: Queue[tuple[Frame, float, Callable[[], None]] | None] = Queue(
+            WRITE_QUEUE_SIZE
+        )
+        self._writer_thread: Thread = Thread(target=self.run_writer, daemon=True)
+        self._writer_thread.start()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def n_frames(self) -> int:
+        return self._n_frames
+
+    @property
+    def error(self) -> OSError | None:
+        return self._error
+
+    def write(self, frame: Frame, receive_time: float):
+        # Blocks while the queue is full, when the disk is slower than the
+        # streams
+        self._queue.put((frame, receive_time, frame.retain()))
+
+    def run_writer(self):
+        while True:
+            queued_frame = self._queue.get()
+
+            if queued_frame is None:
+                return
+
+            frame, receive_time, release = queued_frame
+
+            try:
+                if self._error is None:
+                    self.write_frame(frame, receive_time)
+
+            except OSError as error:
+                self._error = error
+
+            finally:
+                release()
+
+    def write_frame(self, frame: Frame, receive_time: float):
+        if frame.frame_type == FrameType.REMOVE:
+            records = to_index_records(frame.attributes[INDEX_FIELD])
+
+        else:
+            records = to_records(frame.points, **frame.attributes)
+
+        header = encode_header(
+            records,
+            frame.sequence,
+            frame.timestamp,
+            frame_type=frame.frame_type,
+            range_start=frame.range_start,
+        )
+
+        if self._start_time is None:
+            self._start_time = receive_time
+
+        entry = np.array(
+            (
+                self._offset,
+                len(header) + records.nbytes,
+                receive_time - self._start_time,
+                frame.stream_id,
+            ),
+            dtype=INDEX_DTYPE,
+        )
+
+        self._data_file.write(header)
+        self._data_file.write(records)
+        self._index_file.write(entry.tobytes())
+
+        self._offset += int(entry["size"])
+        self._n_frames += 1
+
+    def close(self):
+        # The queued frames are written first
+        self._queue.put(None)
+        self._writer_thread.join()
+
+        self._data_file.close()
+        self._index_file.close()
+
+
+class FrameLogReader:
+    def __init__(self, path: str):
+        self._path: str = path
+        self._index: np.ndarray = np.zeros(0, dtype=INDEX_DTYPE)
+        self._data: mmap.mmap = None
+
+        with open(path + INDEX_EXTENSION, "rb") as index_file:
+            # Entries of a recording interrupted while writing one are ignored
+            n_frames = os.fstat(index_file.fileno()).st_size // INDEX_DTYPE.itemsize
+
+            if n_frames:
+                self._index = np.memmap(
+                    index_file, dtype=INDEX_DTYPE, mode="r", shape=(n_frames,)
+                )
+
+        with open(path, "rb") as data_file:
+            if os.fstat(data_file.fileno()).st_size:
+                self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if n_frames and (
+            self._data is None
+            or self._index["offset"][-1] + self._index["size"][-1] > len(self._data)
+        ):
+            raise ValueError("Frame log data shorter than its index")
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def n_frames(self) -> int:
+        return len(self._index)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._index["time"]
+
+    @property
+    def stream_ids(self) -> np.ndarray:
+        return np.unique(self._index["stream_id"])
+
+    def get_stream_id(self, index: int) -> int:
+        return int(self._index["stream_id"][index])
+
+    def get_frame_size(self, index: int) -> int:
+        return int(self._index["size"][index])
+
+    def read_frame(
+        self, index: int
+    ) -> tuple[FrameHeader, np.ndarray, Quantization | None]:
+        # Records mapped from the file, without copy
+        offset = int(self._index["offset"][index])
+        size = int(self._index["size"][index])
+
+        return decode_frame(memoryview(self._data)[offset : offset + size])
+
+    def close(self):
+        self._index = np.zeros(0, dtype=INDEX_DTYPE)
+
+        if self._data is not None:
+            try:
+                self._data.close()
+
+            except BufferError:
+                pass  # Still mapped by frames, unmapped once they are collected
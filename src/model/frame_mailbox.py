@@ -0,0 +1,113 @@
+from collections import deque
+from threading import Lock
+from model.frame import Frame
+from utils.delivery_mode import DeliveryMode
+from utils.protocol import FrameType
+
+DEFAULT_QUEUE_SIZE = 4
+
+
+# Bounded handoff of the received frames from the socket thread to the viewer,
+# which pulls them when it renders. Frames are queued per stream, so that a
+# fast stream never drops the frames of a slow one.
+class FrameMailbox:
+    def __init__(
+        self,
+        mode: DeliveryMode = DeliveryMode.LATEST,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        self._mode: DeliveryMode = mode
+        self._queue_size: int = queue_size
+        self._queues: dict[int, deque[Frame]] = {}
+        self._n_pending: int = 0
+        self._n_dropped: int = 0
+        self._n_dropped_by_stream: dict[int, int] = {}
+        self._lock = Lock()
+
+    @property
+    def mode(self) -> DeliveryMode:
+        return self._mode
+
+    @property
+    def n_dropped(self) -> int:
+        return self._n_dropped
+
+    @property
+    def stream_capacity(self) -> int | None:
+        # Pending frames of a stream, None when unbounded
+        if self._mode == DeliveryMode.LATEST:
+            return 1
+
+        if self._mode == DeliveryMode.BOUNDED:
+            return self._queue_size
+
+        return None
+
+    @mode.setter
+    def mode(self, mode: DeliveryMode):
+        with self._lock:
+            self._mode = mode
+
+    def put(self, frame: Frame) -> bool:
+        # True when the mailbox was empty, the viewer has to be notified then
+        with self._lock:
+            queue = self._queues.setdefault(frame.stream_id, deque())
+            queue.append(frame)
+            self._n_pending += 1
+            was_empty = self._n_pending == 1
+            capacity = self.stream_capacity
+
+            while capacity is not None and len(queue) > capacity:
+                n_dropped = self.get_droppable_count(queue)
+
+                if not n_dropped:
+                    break  # Delta frames are never dropped
+
+                for _ in range(n_dropped):
+                    queue.popleft().release()
+
+                self._n_pending -= n_dropped
+                self._n_dropped += n_dropped
+                self._n_dropped_by_stream[frame.stream_id] = (
+                    self._n_dropped_by_stream.get(frame.stream_id, 0) + n_dropped
+                )
+
+        return was_empty
+
+    def get_droppable_count(self, queue: deque[Frame]) -> int:
+        # Oldest frames that can be dropped: a points frame alone, otherwise the
+        # keyframe and delta frames until the next frame resetting the points
+        if queue[0].frame_type == FrameType.POINTS:
+            return 1
+
+        for i in range(1, len(queue)):
+            if queue[i].frame_type in (FrameType.POINTS, FrameType.KEYFRAME):
+                return i
+
+        return 0
+
+    def get_stream_counts(self, stream_id: int) -> tuple[int, int]:
+        # Pending and dropped frames of a stream
+        with self._lock:
+            queue = self._queues.get(stream_id)
+
+            return (
+                len(queue) if queue is not None else 0,
+                self._n_dropped_by_stream.get(stream_id, 0),
+            )
+
+    def take_all(self) -> list[Frame]:
+        # Pending frames of all the streams, in reception order per stream
+        with self._lock:
+            frames = [frame for queue in self._queues.values() for frame in queue]
+            self._queues.clear()
+            self._n_pending = 0
+
+        return frames
+
+    def clear(self):
+        for frame in self.take_all():
+            frame.release()
+
+        self._n_dropped = 0
+        self._n_dropped_by_stream.clear()
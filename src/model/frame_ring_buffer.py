@@ -0,0 +1,169 @@
+from typing import Callable
+import numpy as np
+import pyvista as pv
+from model.stream_buffer import StreamBuffer
+
+
+# Fixed number of frame slots of the same size, rendered as a single
+# PolyData. Received frames are kept in the raw slots, the displayed slots
+# hold the filtered frames padded with copies of their first point, so the
+# merged points array never changes its layout from a frame to another.
+class FrameRingBuffer:
+    def __init__(self, capacity: int = None):
+        # Without capacity, the number of slots grows with the frames
+        self._is_growable: bool = capacity is None or capacity < 1
+        self._capacity: int = 1 if self._is_growable else capacity
+        self._frame_size: int = 0
+
+        self._frames = np.zeros((self._capacity, 0, 3), dtype=np.float32)
+        self._lengths = np.zeros(self._capacity, dtype=np.int64)
+        self._display_lengths = np.zeros(self._capacity, dtype=np.int64)
+        self._n_frames: int = 0
+        self._next_slot: int = 0
+        self._filler_slot: int = None
+
+        self._frame_filter: Callable[[np.ndarray], np.ndarray] = None
+        self._display: StreamBuffer = StreamBuffer()
+
+    @property
+    def polydata(self) -> pv.PolyData:
+        return self._display.polydata
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def is_growable(self) -> bool:
+        return self._is_growable
+
+    @property
+    def n_frames(self) -> int:
+        return self._n_frames
+
+    @property
+    def n_points(self) -> int:
+        return int(self._lengths.sum())
+
+    @property
+    def n_displayed_points(self) -> int:
+        return int(self._display_lengths.sum())
+
+    @property
+    def frame_filter(self) -> Callable[[np.ndarray], np.ndarray]:
+        return self._frame_filter
+
+    @frame_filter.setter
+    def frame_filter(self, frame_filter: Callable[[np.ndarray], np.ndarray]):
+        self._frame_filter = frame_filter
+        self.refresh()
+
+    def append(self, points: np.ndarray):
+        if len(points) > self._frame_size:
+            self.reshape(self._capacity, max(len(points), self._frame_size * 3 // 2))
+
+        if self._is_growable and self._n_frames == self._capacity:
+            self.reshape(2 * self._capacity, self._frame_size)
+
+        slot = self._next_slot
+        self._frames[slot, : len(points)] = points
+        self._lengths[slot] = len(points)
+        self.update_display_slot(slot)
+
+        self._next_slot = (slot + 1) % self._capacity
+        self._n_frames = min(self._n_frames + 1, self._capacity)
+
+        if self._filler_slot in (None, slot) or self._display_lengths[slot] == 0:
+            self.fill_empty_slots(slot)
+
+        self._display.modified()
+
+    def limit_frame_size(
+        self, frame_size: int, subsample: Callable[[np.ndarray, int], np.ndarray]
+    ):
+        # Frames larger than the new size are subsampled, then the slots shrink
+        if frame_size >= self._frame_size:
+            return
+
+        for slot in np.flatnonzero(self._lengths > frame_size):
+            frame = subsample(self._frames[slot, : self._lengths[slot]], frame_size)
+            self._frames[slot, : len(frame)] = frame
+            self._lengths[slot] = len(frame)
+
+        self.reshape(self._capacity, frame_size)
+
+    def refresh(self):
+        for slot in range(self._capacity):
+            self.update_display_slot(slot)
+
+        self._filler_slot = None
+        self.fill_empty_slots(self._next_slot - 1)
+        self._display.modified()
+
+    def clear(self):
+        self._lengths[:] = 0
+        self._display_lengths[:] = 0
+        self._n_frames = 0
+        self._next_slot = 0
+        self._filler_slot = None
+        self._display.modified()
+
+    def get_display_slots(self) -> np.ndarray:
+        return self._display.points.reshape(self._capacity, self._frame_size, 3)
+
+    def update_display_slot(self, slot: int):
+        frame = self._frames[slot, : self._lengths[slot]]
+
+        if self._frame_filter is not None and len(frame) > 0:
+            frame = self._frame_filter(frame)
+
+        display_slot = self.get_display_slots()[slot]
+        display_slot[: len(frame)] = frame
+        self._display_lengths[slot] = len(frame)
+
+        if len(frame) > 0:
+            display_slot[len(frame) :] = display_slot[0]
+
+    def fill_empty_slots(self, last_slot: int):
+        # Empty slots are filled with a point of a displayed frame, the most
+        # recent one, so they do not draw anything new
+        valid_slots = np.flatnonzero(self._display_lengths > 0)
+
+        if len(valid_slots) == 0:
+            self._filler_slot = None
+            return
+
+        last_slot %= self._capacity
+        self._filler_slot = (
+            last_slot if self._display_lengths[last_slot] > 0 else int(valid_slots[-1])
+        )
+
+        display_slots = self.get_display_slots()
+        empty_slots = self._display_lengths == 0
+        display_slots[empty_slots] = display_slots[self._filler_slot, 0]
+
+    def reshape(self, capacity: int, frame_size: int):
+        # Frames are moved in chronological order at the start of the new slots
+        order = (self._next_slot - self._n_frames + np.arange(self._n_frames)) % (
+            self._capacity
+        )
+        order = order[-capacity:]
+
+        frames = np.zeros((capacity, frame_size, 3), dtype=np.float32)
+        lengths = np.zeros(capacity, dtype=np.int64)
+
+        for new_slot, slot in enumerate(order):
+            length = min(self._lengths[slot], frame_size)
+            frames[new_slot, :length] = self._frames[slot, :length]
+            lengths[new_slot] = length
+
+        self._capacity = capacity
+        self._frame_size = frame_size
+        self._frames = frames
+        self._lengths = lengths
+        self._display_lengths = np.zeros(capacity, dtype=np.int64)
+        self._n_frames = len(order)
+        self._next_slot = len(order) % capacity
+
+        self._display.resize(capacity * frame_size)
+        self.refresh()
@@ -1,11 +1,17 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pyvista import PolyData
+from model.spatial_index import SpatialIndex
 
 
 @dataclass
 class Pointcloud:
     _name: str
     _points: PolyData
+    _lods: list[PolyData] = field(default_factory=list)
+    _importance: float = 1.0
+    _spatial_indexes: dict[int, SpatialIndex] = field(
+        default_factory=dict, repr=False, compare=False
+    )
 
     @property
     def name(self) -> str:
@@ -15,6 +21,15 @@ class Pointcloud:
     def points(self) -> PolyData:
         return self._points
 
+    @property
+    def lods(self) -> list[PolyData]:
+        # Level 0 is the full resolution pointcloud, then coarser and coarser
+        return self._lods if self._lods else [self._points]
+
+    @property
+    def importance(self) -> float:
+        return self._importance
+
     @name.setter
     def name(self, name: str):
         self._name = name
@@ -22,3 +37,21 @@ class Pointcloud:
     @points.setter
     def points(self, points: PolyData):
         self._points = points
+        self._lods = []
+        self._spatial_indexes = {}
+
+    @lods.setter
+    def lods(self, lods: list[PolyData]):
+        self._lods = lods
+        self._spatial_indexes = {}
+
+    @importance.setter
+    def importance(self, importance: float):
+        self._importance = importance
+
+    def get_spatial_index(self, level: int = 0) -> SpatialIndex:
+        # Built on first use, then cached for the lifetime of the pointcloud
+        if level not in self._spatial_indexes:
+            self._spatial_indexes[level] = SpatialIndex(self.lods[level].points)
+
+        return self._spatial_indexes[level]
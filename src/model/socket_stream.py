@@ -0,0 +1,63 @@
+from dataclasses import dataclass, field
+from model.stream_telemetry import StreamTelemetry
+
+
+@dataclass
+class SocketStream:
+    _id: int
+    _name: str
+    _persistence: int
+    _color: str
+    _is_visible: bool = True
+    _voxel_size: float = 0.0  # Of the socket thread downsampling, 0 for none
+    _telemetry: StreamTelemetry = field(
+        default_factory=StreamTelemetry, repr=False, compare=False
+    )
+
+    @property
+    def id(self) -> int:
+        return self._id
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def persistence(self) -> int:
+        return self._persistence
+
+    @property
+    def color(self) -> str:
+        return self._color
+
+    @property
+    def is_visible(self) -> bool:
+        return self._is_visible
+
+    @property
+    def voxel_size(self) -> float:
+        return self._voxel_size
+
+    @property
+    def telemetry(self) -> StreamTelemetry:
+        return self._telemetry
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+
+    @persistence.setter
+    def persistence(self, persistence: int):
+        self._persistence = persistence
+
+    @color.setter
+    def color(self, color: str):
+        self._color = color
+
+    @is_visible.setter
+    def is_visible(self, is_visible: bool):
+        self._is_visible = is_visible
+
+    @voxel_size.setter
+    def voxel_size(self, voxel_size: float):
+        self._voxel_size = voxel_size
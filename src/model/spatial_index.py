@@ -0,0 +1,169 @@
+import numpy as np
+
+DEFAULT_DEPTH = 8  # 256 cells per axis
+
+
+def spread_bits(values: np.ndarray) -> np.ndarray:
+    # Insert two zero bits between each of the 21 lowest bits
+    values = values & 0x1FFFFF
+    values = (values | values << 32) & 0x1F00000000FFFF
+    values = (values | values << 16) & 0x1F0000FF0000FF
+    values = (values | values << 8) & 0x100F00F00F00F00F
+    values = (values | values << 4) & 0x10C30C30C30C30C3
+    values = (values | values << 2) & 0x1249249249249249
+
+    return values
+
+
+def morton_encode(cells: np.ndarray) -> np.ndarray:
+    return (
+        spread_bits(cells[:, 0])
+        | spread_bits(cells[:, 1]) << 1
+        | spread_bits(cells[:, 2]) << 2
+    )
+
+
+def ranges_to_indices(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    total = int(counts.sum())
+
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    offsets = starts - (np.cumsum(counts) - counts)
+
+    return np.repeat(offsets, counts) + np.arange(total)
+
+
+# Morton-ordered bucket index: the points are sorted by the Z-order code of
+# their cell in a regular grid, so each non-empty cell (node) is a contiguous
+# range of the sorted order. Coarser nodes are obtained by shifting the codes.
+class SpatialIndex:
+    def __init__(self, points: np.ndarray, depth: int = DEFAULT_DEPTH):
+        self._points = np.asarray(points)
+        self._depth = depth
+
+        if len(self._points) == 0:
+            self._origin = np.zeros(3)
+            self._cell_size = np.ones(3)
+            cells = np.empty((0, 3), dtype=np.int64)
+
+        else:
+            self._origin = self._points.min(axis=0).astype(np.float64)
+            extent = self._points.max(axis=0) - self._origin
+            self._cell_size = np.maximum(extent, 1e-9) / (1 << depth)
+            cells = ((self._points - self._origin) / self._cell_size).astype(np.int64)
+            np.clip(cells, 0, (1 << depth) - 1, out=cells)
+
+        codes = morton_encode(cells)
+        self._order = np.argsort(codes, kind="stable")
+        self._codes, self._starts, self._counts = np.unique(
+            codes[self._order], return_index=True, return_counts=True
+        )
+
+        node_cells = cells[self._order[self._starts]]
+        self._nodes_min = self._origin + node_cells * self._cell_size
+        self._nodes_max = self._nodes_min + self._cell_size
+
+    @property
+    def n_points(self) -> int:
+        return len(self._points)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self._codes)
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def get_node_counts(self, depth: int = None) -> tuple[np.ndarray, np.ndarray]:
+        # Morton codes and point counts of the non-empty nodes at a given depth
+        if depth is None or depth >= self._depth:
+            return self._codes, self._counts
+
+        parent_codes = self._codes >> (3 * (self._depth - depth))
+        codes, starts = np.unique(parent_codes, return_index=True)
+
+        return codes, np.add.reduceat(self._counts, starts)
+
+    def classify_nodes(
+        self, bounds: tuple[float, float, float, float, float, float]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        lower = np.asarray(bounds[0::2])
+        upper = np.asarray(bounds[1::2])
+
+        overlap = np.all(
+            (self._nodes_max >= lower) & (self._nodes_min <= upper), axis=1
+        )
+        inside = np.all(
+            (self._nodes_min >= lower) & (self._nodes_max <= upper), axis=1
+        )
+
+        return inside, overlap & ~inside
+
+    def query_box(
+        self, bounds: tuple[float, float, float, float, float, float]
+    ) -> np.ndarray:
+        inside, partial = self.classify_nodes(bounds)
+
+        inside_indices = self._order[
+            ranges_to_indices(self._starts[inside], self._counts[inside])
+        ]
+        candidates = self._order[
+            ranges_to_indices(self._starts[partial], self._counts[partial])
+        ]
+
+        points = self._points[candidates]
+        is_inside = np.all(
+            (points >= bounds[0::2]) & (points <= bounds[1::2]), axis=1
+        )
+
+        return np.concatenate((inside_indices, candidates[is_inside]))
+
+    def query_box_mask(
+        self, bounds: tuple[float, float, float, float, float, float]
+    ) -> np.ndarray:
+        mask = np.zeros(self.n_points, dtype=bool)
+        mask[self.query_box(bounds)] = True
+
+        return mask
+
+    def count_in_box(
+        self, bounds: tuple[float, float, float, float, float, float]
+    ) -> int:
+        inside, partial = self.classify_nodes(bounds)
+
+        candidates = self._order[
+            ranges_to_indices(self._starts[partial], self._counts[partial])
+        ]
+        points = self._points[candidates]
+        partial_count = np.count_nonzero(
+            np.all((points >= bounds[0::2]) & (points <= bounds[1::2]), axis=1)
+        )
+
+        return int(self._counts[inside].sum()) + partial_count
+
+    def get_visible_nodes(self, planes: np.ndarray) -> np.ndarray:
+        # Planes are (a, b, c, d) rows with a*x + b*y + c*z + d >= 0 inside.
+        # A node is culled when its corner furthest along a plane normal is
+        # still outside of that plane.
+        planes = np.asarray(planes, dtype=np.float64).reshape(-1, 4)
+        normals = planes[:, :3]
+
+        distances = (
+            self._nodes_max @ np.clip(normals, 0, None).T
+            + self._nodes_min @ np.clip(normals, None, 0).T
+            + planes[:, 3]
+        )
+
+        return np.all(distances >= 0, axis=1)
+
+    def query_frustum(self, planes: np.ndarray) -> np.ndarray:
+        visible = self.get_visible_nodes(planes)
+
+        return self._order[
+            ranges_to_indices(self._starts[visible], self._counts[visible])
+        ]
+
+    def count_in_frustum(self, planes: np.ndarray) -> int:
+        return int(self._counts[self.get_visible_nodes(planes)].sum())
@@ -0,0 +1,90 @@
+import numpy as np
+import pyvista as pv
+from vtkmodules.vtkCommonCore import vtkPoints
+from vtkmodules.vtkCommonDataModel import vtkCellArray
+from vtkmodules.util.numpy_support import (
+    ID_TYPE_CODE,
+    numpy_to_vtk,
+    numpy_to_vtkIdTypeArray,
+)
+
+
+# Preallocated points buffer whose PolyData points and vertices are views on
+# NumPy arrays: a new frame overwrites the coordinates in place, the arrays are
+# only reallocated when a frame does not fit in the current capacity.
+class StreamBuffer:
+    def __init__(self, capacity: int = 0):
+        self._points = np.zeros((capacity, 3), dtype=np.float32)
+        self._ids = np.arange(capacity + 1, dtype=ID_TYPE_CODE)
+        self._n_points = 0
+        self._polydata = pv.PolyData()
+        self.bind_arrays()
+
+    @property
+    def polydata(self) -> pv.PolyData:
+        return self._polydata
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points[: self._n_points]
+
+    @property
+    def n_points(self) -> int:
+        return self._n_points
+
+    @property
+    def capacity(self) -> int:
+        return len(self._points)
+
+    def reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+
+        capacity = max(capacity, 2 * self.capacity)
+
+        points = np.zeros((capacity, 3), dtype=np.float32)
+        points[: self._n_points] = self._points[: self._n_points]
+
+        self._points = points
+        self._ids = np.arange(capacity + 1, dtype=ID_TYPE_CODE)
+        self.bind_arrays()
+
+    def resize(self, n_points: int):
+        if n_points == self._n_points:
+            return
+
+        self.reserve(n_points)
+        self._n_points = n_points
+        self.bind_arrays()
+
+    def update(self, points: np.ndarray):
+        self.resize(len(points))
+        self._points[: self._n_points] = points
+        self.modified()
+
+    def update_range(self, points: np.ndarray, start: int, end: int):
+        # Only the points of the range are written, the others are unchanged
+        self.resize(len(points))
+        self._points[start:end] = points[start:end]
+        self.modified()
+
+    def clear(self):
+        self.resize(0)
+
+    def modified(self):
+        self._polydata.GetPoints().Modified()
+        self._polydata.Modified()
+
+    def bind_arrays(self):
+        # VTK keeps a reference on the NumPy views, no data is copied here
+        vtk_points = vtkPoints()
+        vtk_points.SetData(numpy_to_vtk(self._points[: self._n_points], deep=False))
+
+        vertices = vtkCellArray()
+        vertices.SetData(
+            numpy_to_vtkIdTypeArray(self._ids[: self._n_points + 1], deep=False),
+            numpy_to_vtkIdTypeArray(self._ids[: self._n_points], deep=False),
+        )
+
+        self._polydata.SetPoints(vtk_points)
+        self._polydata.SetVerts(vertices)
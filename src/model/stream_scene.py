@@ -0,0 +1,101 @@
+import numpy as np
+from model.frame import Frame
+from utils.protocol import INDEX_FIELD, FrameType
+
+
+# Points of a stream kept across its keyframes and delta frames, which update
+# them in place. The range changed since the last display update is tracked,
+# so that only its points are written again in the display buffer.
+class StreamScene:
+    def __init__(self):
+        self._points = np.zeros((0, 3), dtype=np.float32)
+        self._n_points: int = 0
+        self._changed_range: tuple[int, int] | None = None  # None for all
+
+    @property
+    def points(self) -> np.ndarray:
+        return self._points[: self._n_points]
+
+    @property
+    def n_points(self) -> int:
+        return self._n_points
+
+    @property
+    def changed_range(self) -> tuple[int, int] | None:
+        return self._changed_range
+
+    def apply(self, frame: Frame):
+        if frame.frame_type == FrameType.APPEND:
+            self.append(frame.points)
+
+        elif frame.frame_type == FrameType.REPLACE:
+            self.replace(frame.range_start, frame.points)
+
+        elif frame.frame_type == FrameType.REMOVE:
+            self.remove(frame.attributes[INDEX_FIELD])
+
+        else:
+            self.reset(frame.points)
+
+    def reset(self, points: np.ndarray):
+        self._n_points = 0
+        self.append(points)
+        self.invalidate()
+
+    def append(self, points: np.ndarray):
+        start = self._n_points
+        self.reserve(start + len(points))
+        self._points[start : start + len(points)] = points
+        self._n_points += len(points)
+        self.add_change(start, self._n_points)
+
+    def replace(self, start: int, points: np.ndarray):
+        if start + len(points) > self._n_points:
+            raise ValueError(
+                f"Replaced range {start}-{start + len(points)} out of the {self._n_points} points"
+            )
+
+        self._points[start : start + len(points)] = points
+        self.add_change(start, start + len(points))
+
+    def remove(self, indices: np.ndarray):
+        if len(indices) == 0:
+            return
+
+        if indices.max() >= self._n_points:
+            raise ValueError(f"Removed index out of the {self._n_points} points")
+
+        # Only the points after the first removed one are moved
+        start = int(indices.min())
+        kept = np.ones(self._n_points - start, dtype=bool)
+        kept[indices - start] = False
+        kept_points = self._points[start : self._n_points][kept]
+
+        self._points[start : start + len(kept_points)] = kept_points
+        self._n_points = start + len(kept_points)
+        self.add_change(start, self._n_points)
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self._points):
+            return
+
+        points = np.zeros((max(capacity, 2 * len(self._points)), 3), np.float32)
+        points[: self._n_points] = self._points[: self._n_points]
+        self._points = points
+
+    def add_change(self, start: int, end: int):
+        if self._changed_range is None:
+            return
+
+        changed_start, changed_end = self._changed_range
+        self._changed_range = (
+            min(changed_start, start),
+            min(max(changed_end, end), self._n_points),
+        )
+
+    def clear_changes(self):
+        self._changed_range = (self._n_points, self._n_points)
+
+    def invalidate(self):
+        # All the points are written again on the next display update
+        self._changed_range = None
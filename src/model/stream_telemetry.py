@@ -0,0 +1,119 @@
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class TelemetrySample:
+    frames_per_second: float
+    megabytes_per_second: float
+    points_per_frame: float
+    decode_time: float  # ms per frame
+    render_latency: float  # ms from the reception to the render
+    transfer_latency: float | None  # ms from the sender timestamp to the reception
+    n_dropped_frames: int
+    n_queued_frames: int
+    n_reconnections: int
+
+
+# Cumulative ingest counters of a stream. Each counter is written by a single
+# thread, the socket one or the viewer one, with a plain addition: they are
+# turned into rates by difference between two samples, taken on a timer.
+class StreamTelemetry:
+    def __init__(self):
+        self._n_frames: int = 0
+        self._n_bytes: int = 0
+        self._n_points: int = 0
+        self._decode_time: float = 0.0
+        self._n_incomplete_frames: int = 0
+        self._n_reconnections: int = 0
+
+        self._n_render_latencies: int = 0
+        self._render_latency: float = 0.0
+        self._n_transfer_latencies: int = 0
+        self._transfer_latency: float = 0.0
+
+        self._sample_counters: tuple = self.get_counters()
+        self._sample_time: float = time.monotonic()
+
+    @property
+    def n_reconnections(self) -> int:
+        return self._n_reconnections
+
+    @n_reconnections.setter
+    def n_reconnections(self, n_reconnections: int):
+        self._n_reconnections = n_reconnections
+
+    def add_bytes(self, n_bytes: int):
+        self._n_bytes += n_bytes
+
+    def add_frame(self, n_points: int, decode_time: float):
+        self._n_frames += 1
+        self._n_points += n_points
+        self._decode_time += decode_time
+
+    def add_decode_time(self, decode_time: float):
+        self._decode_time += decode_time
+
+    def add_incomplete_frame(self):
+        self._n_incomplete_frames += 1
+
+    def add_render_latency(self, latency: float):
+        self._n_render_latencies += 1
+        self._render_latency += latency
+
+    def add_transfer_latency(self, latency: float):
+        self._n_transfer_latencies += 1
+        self._transfer_latency += latency
+
+    def get_counters(self) -> tuple:
+        return (
+            self._n_frames,
+            self._n_bytes,
+            self._n_points,
+            self._decode_time,
+            self._n_render_latencies,
+            self._render_latency,
+            self._n_transfer_latencies,
+            self._transfer_latency,
+        )
+
+    def sample(
+        self, n_queued_frames: int = 0, n_dropped_frames: int = 0
+    ) -> TelemetrySample:
+        # Rates and means since the previous sample, the dropped frames add the
+        # ones given, from the mailbox, to the incomplete ones
+        counters = self.get_counters()
+        sample_time = time.monotonic()
+        (
+            n_frames,
+            n_bytes,
+            n_points,
+            decode_time,
+            n_render_latencies,
+            render_latency,
+            n_transfer_latencies,
+            transfer_latency,
+        ) = (
+            counter - previous_counter
+            for counter, previous_counter in zip(counters, self._sample_counters)
+        )
+        duration = max(sample_time - self._sample_time, 1e-6)
+
+        self._sample_counters = counters
+        self._sample_time = sample_time
+
+        return TelemetrySample(
+            n_frames / duration,
+            n_bytes / duration / 1e6,
+            n_points / n_frames if n_frames else 0.0,
+            decode_time / n_frames * 1e3 if n_frames else 0.0,
+            render_latency / n_render_latencies * 1e3 if n_render_latencies else 0.0,
+            (
+                transfer_latency / n_transfer_latencies * 1e3
+                if n_transfer_latencies
+                else None
+            ),
+            self._n_incomplete_frames + n_dropped_frames,
+            n_queued_frames,
+            self._n_reconnections,
+        )
@@ -0,0 +1,408 @@
+import socket
+import time
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from threading import Condition, Thread
+import numpy as np
+from utils.protocol import (
+    DEFAULT_DATAGRAM_SIZE,
+    HELLO_STRUCT,
+    RELEASE_STRUCT,
+    SLOT_STRUCT,
+    Codec,
+    FrameType,
+    Quantization,
+    decode_hello,
+    encode_fragments,
+    encode_frame,
+    encode_legacy_frame,
+    encode_shared_memory_hello,
+    get_shared_memory_path,
+    get_xyz,
+)
+from utils.transport import Transport
+
+HELLO_TIMEOUT = 1.0  # s
+DEFAULT_QUEUE_SIZE = 4  # Frames queued while the previous ones are sent
+DEFAULT_SLOTS_COUNT = 4
+SLOT_SIZE_MARGIN = 1.5  # Of the frame size a ring is made for, for compression
+RECONNECT_DELAY = 0.5  # s, doubled after each failed attempt
+MAX_RECONNECT_DELAY = 2.0  # s
+LATENCY_SAMPLES = 100_000  # Latest send latencies kept for the percentiles
+
+
+# Ring of frame slots in shared memory, for a viewer on the same host: a slot
+# is written only once the viewer released it
+class SharedMemoryRing:
+    def __init__(self, client: socket.socket, n_slots: int, slot_size: int):
+        self.client: socket.socket = client
+        self.n_slots: int = n_slots
+        self.slot_size: int = slot_size
+        self.shared_memory = shared_memory.SharedMemory(
+            create=True, size=n_slots * slot_size
+        )
+        self.free_slots: deque[int] = deque(range(n_slots))
+        self.releases: bytearray = bytearray()
+
+        self.client.sendall(
+            encode_shared_memory_hello(self.shared_memory.name, n_slots, slot_size)
+        )
+
+    def send(self, frame: bytes, sequence: int):
+        if len(frame) > self.slot_size:
+            raise ValueError("Frame larger than the shared memory slots")
+
+        self.receive_releases()
+
+        while not self.free_slots:
+            self.receive_releases(wait=True)
+
+        index = self.free_slots.popleft()
+        offset = index * self.slot_size
+        self.shared_memory.buf[offset : offset + len(frame)] = frame
+        self.client.sendall(SLOT_STRUCT.pack(index, sequence, len(frame)))
+
+    def wait_all_released(self):
+        while len(self.free_slots) < self.n_slots:
+            self.receive_releases(wait=True)
+
+    def receive_releases(self, wait: bool = False):
+        self.client.setblocking(wait)
+
+        try:
+            data = self.client.recv(4096)
+
+            if wait and not data:
+                raise ConnectionError("Viewer disconnected")
+
+        except BlockingIOError:
+            data = b""
+
+        finally:
+            self.client.setblocking(True)
+
+        self.releases += data
+        n_releases = len(self.releases) // RELEASE_STRUCT.size
+
+        for (index,) in RELEASE_STRUCT.iter_unpack(
+            self.releases[: n_releases * RELEASE_STRUCT.size]
+        ):
+            self.free_slots.append(index)
+
+        del self.releases[: n_releases * RELEASE_STRUCT.size]
+
+    def close(self):
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+
+@dataclass
+class QueuedFrame:
+    records: np.ndarray
+    quantization: Quantization | None
+    frame_type: FrameType
+    range_start: int
+    sequence: int
+    timestamp: float
+    queue_time: float  # perf_counter when the frame was given to the client
+
+
+@dataclass
+class ClientStats:
+    n_frames: int
+    n_bytes: int
+    n_dropped_frames: int
+    n_connections: int
+    latencies: np.ndarray  # s from the send call to the frame written
+
+
+def negotiate_codec(client: socket.socket, codec: Codec) -> Codec:
+    # Servers without codecs negotiation do not send any hello
+    client.settimeout(HELLO_TIMEOUT)
+
+    try:
+        _, codecs = decode_hello(client.recv(HELLO_STRUCT.size, socket.MSG_WAITALL))
+
+    except (socket.timeout, ValueError, OSError):
+        codecs = (Codec.NONE,)
+
+    finally:
+        client.settimeout(None)
+
+    if codec not in codecs:  # Sent uncompressed
+        return Codec.NONE
+
+    return codec
+
+
+# Client of the viewer socket, for the producers. A frame given to send() is
+# only queued: a sender thread encodes and writes it while the caller prepares
+# the next one, the records are not to be modified meanwhile. A lost connection
+# is opened again by the sender thread, the queued frames are dropped then.
+# A client is meant to be fed by a single thread.
+class PointcloudClient:
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 8080,
+        transport: Transport = Transport.TCP,
+        codec: Codec = Codec.NONE,
+        shuffle: bool = True,
+        legacy: bool = False,
+        datagram_size: int = DEFAULT_DATAGRAM_SIZE,
+        n_slots: int = DEFAULT_SLOTS_COUNT,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        reconnect: bool = True,
+    ):
+        self.host: str = host
+        self.port: int = port
+        self.transport: Transport = transport
+        self.requested_codec: Codec = codec
+        self.codec: Codec = codec  # Negotiated again on each connection
+        self.shuffle: bool = shuffle
+        self.legacy: bool = legacy
+        self.datagram_size: int = datagram_size
+        self.n_slots: int = n_slots
+        self.queue_size: int = queue_size
+        self.reconnect: bool = reconnect
+
+        self.connection: socket.socket = None
+        self.ring: SharedMemoryRing = None
+        self.error: OSError = None  # Connection lost without reconnection
+
+        self.queue: deque[QueuedFrame] = deque()
+        self.condition: Condition = Condition()
+        self.is_closed: bool = False
+        self.sequence: int = 0
+
+        self.n_frames: int = 0
+        self.n_bytes: int = 0
+        self.n_dropped_frames: int = 0
+        self.n_connections: int = 0
+        self.latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+        if not self.connect() and not reconnect:
+            raise self.error
+
+        self.sender_thread: Thread = Thread(target=self.run_sender, daemon=True)
+        self.sender_thread.start()
+
+    @property
+    def is_connected(self) -> bool:
+        return self.connection is not None
+
+    def send(
+        self,
+        records: np.ndarray,
+        quantization: Quantization = None,
+        frame_type: FrameType = FrameType.POINTS,
+        range_start: int = 0,
+        timestamp: float = None,
+        block: bool = True,
+    ) -> bool:
+        # False when the queue is full and not blocking, the frame is dropped
+        queue_time = time.perf_counter()
+
+        with self.condition:
+            while len(self.queue) >= self.queue_size and not self.is_closed:
+                if not block:
+                    self.n_dropped_frames += 1
+                    return False
+
+                self.condition.wait()
+
+            if self.is_closed:
+                raise ConnectionError("Client closed") from self.error
+
+            self.queue.append(
+                QueuedFrame(
+                    records,
+                    quantization,
+                    frame_type,
+                    range_start,
+                    self.sequence,
+                    time.time() if timestamp is None else timestamp,
+                    queue_time,
+                )
+            )
+            self.sequence += 1
+            self.condition.notify_all()
+
+        return True
+
+    def get_stats(self) -> ClientStats:
+        with self.condition:
+            return ClientStats(
+                self.n_frames,
+                self.n_bytes,
+                self.n_dropped_frames,
+                self.n_connections,
+                np.array(self.latencies),
+            )
+
+    def run_sender(self):
+        reconnect_delay = RECONNECT_DELAY
+
+        while True:
+            with self.condition:
+                while not self.queue and not self.is_closed:
+                    self.condition.wait()
+
+                if not self.queue:  # Closed once the queued frames are sent
+                    return
+
+                queued_frame = self.queue[0]
+
+            if not self.is_connected:
+                if self.is_closed or not self.reconnect:
+                    with self.condition:
+                        self.is_closed = True  # The next sends raise the error
+
+                    self.drop_queue()
+                    return
+
+                if not self.connect():
+                    with self.condition:  # Woken up early by close() only
+                        self.condition.wait_for(lambda: self.is_closed, reconnect_delay)
+
+                    reconnect_delay = min(2 * reconnect_delay, MAX_RECONNECT_DELAY)
+                    continue
+
+                reconnect_delay = RECONNECT_DELAY
+
+                # Frames queued before the connection loss may depend on frames
+                # lost with it, the next ones are to restart the stream
+                if self.n_connections > 1:
+                    self.drop_queue()
+
+                continue
+
+            frame = self.encode(queued_frame)
+
+            try:
+                is_sent = self.write(frame, queued_frame.sequence)
+
+            except OSError as error:
+                self.error = error
+                self.disconnect()
+                continue
+
+            with self.condition:
+                self.queue.popleft()
+
+                if is_sent:
+                    self.n_frames += 1
+                    self.n_bytes += len(frame)
+                    self.latencies.append(time.perf_counter() - queued_frame.queue_time)
+
+                else:
+                    self.n_dropped_frames += 1
+
+                self.condition.notify_all()
+
+    def encode(self, queued_frame: QueuedFrame) -> bytes:
+        if self.legacy:
+            return encode_legacy_frame(
+                get_xyz(queued_frame.records, queued_frame.quantization)
+            )
+
+        return encode_frame(
+            queued_frame.records,
+            queued_frame.sequence,
+            queued_frame.timestamp,
+            self.codec,
+            self.shuffle,
+            queued_frame.quantization,
+            queued_frame.frame_type,
+            queued_frame.range_start,
+        )
+
+    def write(self, frame: bytes, sequence: int) -> bool:
+        # False when the frame is dropped without losing the connection
+        if self.transport == Transport.SHARED_MEMORY:
+            # Frames outgrowing the slots are written in a larger ring, once the
+            # viewer released the slots of the current one
+            if self.ring is not None and len(frame) > self.ring.slot_size:
+                self.ring.wait_all_released()
+                self.ring.close()
+                self.ring = None
+
+            if self.ring is None:
+                slot_size = int(len(frame) * SLOT_SIZE_MARGIN)
+                self.ring = SharedMemoryRing(self.connection, self.n_slots, slot_size)
+
+            self.ring.send(frame, sequence)
+
+            return True
+
+        if self.transport == Transport.UDP:
+            try:
+                for fragment in encode_fragments(frame, sequence, self.datagram_size):
+                    self.connection.send(fragment)
+
+            except ConnectionRefusedError:
+                return False  # No viewer listening yet, nothing to reconnect
+
+            except ValueError:
+                return False  # Too many fragments for the datagram size
+
+            return True
+
+        self.connection.sendall(frame)
+
+        return True
+
+    def connect(self) -> bool:
+        try:
+            if self.transport == Transport.SHARED_MEMORY:
+                connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                connection.connect(get_shared_memory_path(self.port))
+
+            elif self.transport == Transport.UDP:
+                connection = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                connection.connect((self.host, self.port))
+
+            else:
+                connection = socket.create_connection((self.host, self.port))
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        except OSError as error:
+            self.error = error
+            return False
+
+        # No hello over UDP and shared memory, the codec is sent as requested
+        if self.transport == Transport.TCP and not self.legacy:
+            self.codec = negotiate_codec(connection, self.requested_codec)
+
+        self.connection = connection
+        self.error = None
+
+        with self.condition:
+            self.n_connections += 1
+
+        return True
+
+    def disconnect(self):
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def drop_queue(self):
+        with self.condition:
+            self.n_dropped_frames += len(self.queue)
+            self.queue.clear()
+            self.condition.notify_all()
+
+    def close(self):
+        # The queued frames are sent first, unless the connection is lost
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify_all()
+
+        self.sender_thread.join()
+        self.disconnect()
@@ -1,5 +1,22 @@
 import socket
 import numpy as np
+from utils.protocol import (
+    FIELD_STRUCT,
+    FRAME_MAGIC,
+    HEADER_STRUCT,
+    LEGACY_SIZE_LENGTH,
+    QUANTIZATION_STRUCT,
+    QUANTIZED_FLAG,
+    RANGE_STRUCT,
+    XYZ_DTYPE,
+    FrameType,
+    decode_fields,
+    decode_header,
+    decode_quantization,
+    decompress_payload,
+    get_attributes,
+    get_xyz,
+)
 
 
 def receive_data(conn, size):
@@ -16,6 +33,37 @@ def receive_data(conn, size):
     return data
 
 
+def receive_frame(conn):
+    data_size = receive_data(conn, LEGACY_SIZE_LENGTH)
+
+    if data_size != FRAME_MAGIC:  # Legacy frame, raw float32 xyz
+        expected_size = int.from_bytes(data_size, byteorder="big")
+        data = receive_data(conn, expected_size)
+
+        return np.frombuffer(data, dtype=XYZ_DTYPE), 0, None
+
+    header = decode_header(
+        data_size + receive_data(conn, HEADER_STRUCT.size - LEGACY_SIZE_LENGTH)
+    )
+    fields = receive_data(conn, header.n_fields * FIELD_STRUCT.size)
+    dtype = decode_fields(fields, header.n_fields, header.frame_type)
+    quantization = None
+
+    if header.flags & QUANTIZED_FLAG:
+        quantization = decode_quantization(receive_data(conn, QUANTIZATION_STRUCT.size))
+
+    if header.frame_type == FrameType.REPLACE:
+        (header.range_start,) = RANGE_STRUCT.unpack(
+            receive_data(conn, RANGE_STRUCT.size)
+        )
+
+    data = receive_data(conn, header.payload_size)
+    records = np.empty(header.n_points, dtype=dtype)
+    decompress_payload(data, header.flags, records)
+
+    return records, header.sequence, quantization
+
+
 def main():
     server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server.bind(("localhost", 8080))
@@ -27,13 +75,11 @@ def main():
 
     try:
         while True:
-            data_size = receive_data(conn, 4)
-            expected_size = int.from_bytes(data_size, byteorder="big")
-
-            data = receive_data(conn, expected_size)
+            records, sequence, quantization = receive_frame(conn)
 
-            _ = np.frombuffer(data, dtype=np.float32).reshape((-1, 3))
-            print("Data received")
+            _ = get_xyz(records, quantization)
+            attributes = get_attributes(records)
+            print(f"Data received: frame {sequence}, fields {list(attributes)}")
 
     except KeyboardInterrupt:
         print("Program interrupted")
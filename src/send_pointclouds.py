@@ -1,30 +1,395 @@
 import time
-import socket
+import argparse
+import itertools
+from threading import Event, Thread
 import numpy as np
 from generate_pointcloud import generate_random_pointcloud
+from pointcloud_client import DEFAULT_SLOTS_COUNT, ClientStats, PointcloudClient
+from utils.protocol import (
+    DEFAULT_DATAGRAM_SIZE,
+    DEFAULT_PRECISION,
+    Codec,
+    FrameType,
+    Quantization,
+    compress_payload,
+    get_attributes,
+    decompress_payload,
+    to_quantized_records,
+    to_records,
+)
+from utils.transport import Transport
 
+BENCHMARK_REPEATS = 10
+QUANTIZATION_DTYPES = {16: "<i2", 32: "<i4"}
+FRAMES_POOL_SIZE = 8  # Random frames sent in turn by the streams
+REPORT_INTERVAL = 1.0  # s
 
-def main():
-    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client.connect(("localhost", 8080))
+
+def get_records(
+    nb_points: int,
+    colors: bool,
+    quantization_bits: int = None,
+    precision: float = DEFAULT_PRECISION,
+) -> tuple[np.ndarray, Quantization | None]:
+    pointcloud, pcd_colors = generate_random_pointcloud(nb_points, colors)
+    attributes = {"intensity": np.linalg.norm(pointcloud, axis=1)}
+
+    if pcd_colors is not None:
+        attributes["rgb"] = (pcd_colors * 255).astype(np.uint8)
+
+    if quantization_bits is None:
+        return to_records(pointcloud, **attributes), None
+
+    return to_quantized_records(
+        pointcloud, QUANTIZATION_DTYPES[quantization_bits], precision, **attributes
+    )
+
+
+def run_stream(
+    client: PointcloudClient,
+    frames: list[tuple[np.ndarray, Quantization | None]],
+    rate: float,
+    append: bool,
+    stop_event: Event,
+):
+    # Frames sent at the given rate, as fast as the client accepts them when 0.
+    # Late frames are sent at once, without catching up on the missed ones
+    period = 1 / rate if rate > 0 else 0.0
+    n_connections = 0
+    send_time = time.perf_counter()
+
+    for i in itertools.count():
+        if stop_event.is_set():
+            break
+
+        records, quantization = frames[i % len(frames)]
+        frame_type = FrameType.POINTS
+
+        # A keyframe first and after each reconnection, then points appended
+        if append:
+            is_reconnected = client.n_connections != n_connections
+            n_connections = client.n_connections
+            frame_type = FrameType.KEYFRAME if is_reconnected else FrameType.APPEND
+
+        try:
+            client.send(records, quantization, frame_type)
+
+        except ConnectionError as error:
+            print(f"Stream stopped: {error.__cause__ or error}")
+            break
+
+        send_time += period
+        now = time.perf_counter()
+
+        if send_time < now:
+            send_time = now  # Late, the missed frames are not caught up
+
+        else:
+            stop_event.wait(send_time - now)
+
+
+def print_report(stats: list[ClientStats], duration: float):
+    n_frames = sum(client_stats.n_frames for client_stats in stats)
+    n_bytes = sum(client_stats.n_bytes for client_stats in stats)
+    latencies = np.concatenate([client_stats.latencies for client_stats in stats])
+
+    print(
+        f"{n_frames} frames sent in {duration:.1f} s: {n_frames / duration:.1f} "
+        f"frames/s, {n_bytes / duration / 1e6:.2f} MB/s"
+    )
+
+    if len(latencies):
+        p50, p90, p99, p_max = np.percentile(latencies, (50, 90, 99, 100)) * 1e3
+        print(
+            f"Send latency (ms): p50 {p50:.2f}, p90 {p90:.2f}, "
+            f"p99 {p99:.2f}, max {p_max:.2f}"
+        )
+
+    n_dropped_frames = sum(client_stats.n_dropped_frames for client_stats in stats)
+    n_reconnections = sum(
+        max(client_stats.n_connections - 1, 0) for client_stats in stats
+    )
+    print(f"Dropped frames: {n_dropped_frames}, reconnections: {n_reconnections}")
+
+
+def main(
+    port: int = 8080,
+    nb_points: int = 100,
+    colors: bool = False,
+    legacy: bool = False,
+    codec: Codec = Codec.NONE,
+    shuffle: bool = True,
+    quantization_bits: int = None,
+    precision: float = DEFAULT_PRECISION,
+    transport: Transport = Transport.TCP,
+    datagram_size: int = DEFAULT_DATAGRAM_SIZE,
+    n_slots: int = DEFAULT_SLOTS_COUNT,
+    append: bool = False,
+    host: str = "localhost",
+    rate: float = 1.0,
+    n_streams: int = 1,
+    duration: float = None,
+):
+    # Random frames generated beforehand, so that only their encoding and
+    # sending is measured
+    frames = [
+        get_records(nb_points, colors, quantization_bits, precision)
+        for _ in range(FRAMES_POOL_SIZE)
+    ]
+    clients = [
+        PointcloudClient(
+            host,
+            port,
+            transport,
+            codec,
+            shuffle,
+            legacy,
+            datagram_size,
+            n_slots,
+        )
+        for _ in range(n_streams)
+    ]
+
+    if any(client.codec != codec for client in clients):
+        print(f"Codec {codec} not supported by the server, sending uncompressed")
+
+    stop_event = Event()
+    stream_threads = [
+        Thread(
+            target=run_stream,
+            args=(client, frames, rate, append, stop_event),
+            daemon=True,
+        )
+        for client in clients
+    ]
+    start_time = time.perf_counter()
+    n_frames = 0
+
+    for stream_thread in stream_threads:
+        stream_thread.start()
 
     try:
-        while True:
-            pointcloud, _ = generate_random_pointcloud(100, False)
+        while duration is None or time.perf_counter() - start_time < duration:
+            time.sleep(REPORT_INTERVAL)
 
-            bytes_pointcloud = pointcloud.astype(np.float32).tobytes()
+            stats = [client.get_stats() for client in clients]
+            sent_frames = sum(client_stats.n_frames for client_stats in stats)
+            print(f"{sent_frames - n_frames} frames sent")
+            n_frames = sent_frames
 
-            client.sendall(len(bytes_pointcloud).to_bytes(4, byteorder="big"))
-            client.sendall(bytes_pointcloud)
-            print("Data sent")
-            time.sleep(1)
+            if not any(stream_thread.is_alive() for stream_thread in stream_threads):
+                break
 
     except KeyboardInterrupt:
         print("Program interrupted")
 
     finally:
-        client.close()
+        stop_event.set()
+
+        for stream_thread in stream_threads:
+            stream_thread.join()
+
+        for client in clients:
+            client.close()
+
+        duration = time.perf_counter() - start_time
+        print_report([client.get_stats() for client in clients], duration)
+
+
+def benchmark(
+    nb_points: int = 100_000,
+    colors: bool = False,
+    bandwidth: float = 10,
+    quantization_bits: int = None,
+    precision: float = DEFAULT_PRECISION,
+):
+    # End-to-end latency of a frame: compression, transfer on a link of the
+    # given bandwidth (MB/s) and decompression in the socket thread. The ratio
+    # is computed against float32 xyz records, to include the quantization
+    records, _ = get_records(nb_points, colors, quantization_bits, precision)
+    output = np.empty_like(records)
+    raw_size = to_records(np.zeros((nb_points, 3)), **get_attributes(records)).nbytes
+
+    print(f"{nb_points} points, {raw_size / 1e6:.2f} MB, {bandwidth} MB/s link")
+    print("codec  shuffle  ratio  compress  transfer  decompress  latency (ms)")
+
+    for codec in Codec:
+        for shuffle in (False, True) if codec != Codec.NONE else (False,):
+            start = time.perf_counter()
+
+            for _ in range(BENCHMARK_REPEATS):
+                payload, flags = compress_payload(records, codec, shuffle)
+
+            compress_time = (time.perf_counter() - start) / BENCHMARK_REPEATS
+            start = time.perf_counter()
+
+            for _ in range(BENCHMARK_REPEATS):
+                decompress_payload(payload, flags, output)
+
+            decompress_time = (time.perf_counter() - start) / BENCHMARK_REPEATS
+            transfer_time = len(payload) / (bandwidth * 1e6)
+            latency = compress_time + transfer_time + decompress_time
+
+            print(
+                f"{codec!s:<6} {shuffle!s:<8} {raw_size / len(payload):5.2f} "
+                f"{compress_time * 1e3:9.1f} {transfer_time * 1e3:9.1f} "
+                f"{decompress_time * 1e3:11.1f} {latency * 1e3:13.1f}"
+            )
 
 
 if __name__ == "__main__":
-    main()
+    arg = argparse.ArgumentParser()
+    arg.add_argument("--host", default="localhost", help="Socket host")
+    arg.add_argument("-p", "--port", type=int, default=8080, help="Socket port")
+    arg.add_argument(
+        "-n",
+        "--nb_points",
+        type=int,
+        default=100,
+        help="Number of points in each pointcloud",
+    )
+    arg.add_argument(
+        "-c",
+        "--colors",
+        action="store_true",
+        help="Send random colors for the points",
+    )
+    arg.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Send raw float32 xyz frames, without header",
+    )
+    arg.add_argument(
+        "--udp",
+        action="store_true",
+        help="Send the frames as datagram fragments, over UDP",
+    )
+    arg.add_argument(
+        "--datagram-size",
+        type=int,
+        default=DEFAULT_DATAGRAM_SIZE,
+        help="Size of the UDP datagrams, in bytes",
+    )
+    arg.add_argument(
+        "--shm",
+        type=int,
+        nargs="?",
+        const=DEFAULT_SLOTS_COUNT,
+        metavar="SLOTS",
+        help="Send the frames through a ring of shared memory slots, same host only",
+    )
+    arg.add_argument(
+        "--append",
+        action="store_true",
+        help="Send a keyframe, then frames appending their points to it",
+    )
+    arg.add_argument(
+        "--codec",
+        type=str.upper,
+        choices=[codec.name for codec in Codec],
+        default=Codec.NONE.name,
+        help="Payload compression codec",
+    )
+    arg.add_argument(
+        "--no-shuffle",
+        action="store_true",
+        help="Compress the payload without shuffling its bytes",
+    )
+    arg.add_argument(
+        "-q",
+        "--quantize",
+        type=int,
+        choices=list(QUANTIZATION_DTYPES),
+        help="Send the coordinates as 16 or 32 bits integers",
+    )
+    arg.add_argument(
+        "--precision",
+        type=float,
+        default=DEFAULT_PRECISION,
+        help="Precision of the quantized coordinates",
+    )
+    arg.add_argument(
+        "-r",
+        "--rate",
+        type=float,
+        default=1.0,
+        help="Frames sent per second by each stream, 0 for as fast as possible",
+    )
+    arg.add_argument(
+        "-s",
+        "--streams",
+        type=int,
+        default=1,
+        help="Number of concurrent streams, each with its own connection",
+    )
+    arg.add_argument(
+        "-d",
+        "--duration",
+        type=float,
+        help="Sending duration in seconds, until interrupted by default",
+    )
+    arg.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Compare the codecs compression ratio and latency, without sending",
+    )
+    arg.add_argument(
+        "--bandwidth",
+        type=float,
+        default=10,
+        help="Link bandwidth used by the benchmark, in MB/s",
+    )
+
+    args = arg.parse_args()
+
+    if args.shm is not None and args.shm < 1:
+        arg.error("the shared memory ring needs at least 1 slot")
+
+    if (args.udp or args.shm) and args.legacy:
+        arg.error("legacy frames can only be sent over TCP")
+
+    if args.udp and args.shm:
+        arg.error("--udp and --shm are exclusive")
+
+    if args.append and (args.udp or args.legacy):
+        arg.error("appended frames need a reliable transport, TCP or --shm")
+
+    if args.rate < 0 or args.streams < 1:
+        arg.error("the rate must be positive and the streams at least 1")
+
+    if args.benchmark:
+        benchmark(
+            args.nb_points,
+            args.colors,
+            args.bandwidth,
+            args.quantize,
+            args.precision,
+        )
+
+    else:
+        transport = Transport.TCP
+
+        if args.udp:
+            transport = Transport.UDP
+
+        elif args.shm is not None:
+            transport = Transport.SHARED_MEMORY
+
+        main(
+            args.port,
+            args.nb_points,
+            args.colors,
+            args.legacy,
+            Codec[args.codec],
+            not args.no_shuffle,
+            args.quantize,
+            args.precision,
+            transport,
+            args.datagram_size,
+            args.shm or DEFAULT_SLOTS_COUNT,
+            args.append,
+            args.host,
+            args.rate,
+            args.streams,
+            args.duration,
+        )
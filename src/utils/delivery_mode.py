@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class DeliveryMode(Enum):
+    LATEST = "Latest frame"  # Older pending frames are dropped
+    BOUNDED = "Bounded queue"  # Oldest pending frames dropped when full
+    EVERY = "Every frame"  # Never dropped, the clients are throttled instead
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class PauseMode(Enum):
+    BLOCK = "Stop receiving"  # The clients are blocked by the TCP backpressure
+    DRAIN = "Keep draining"  # Frames still received, but discarded
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,604 @@
+import lzma
+import os
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+from enum import IntEnum
+import numpy as np
+from numpy.lib import recfunctions
+
+# Frame layout, little-endian:
+#   header: magic, version, frame type, fields count, flags, points count,
+#           sequence number, sensor timestamp (s), payload size (bytes)
+#   fields: name, NumPy dtype string and components count, for each field
+#   quantization: xyz scale and offset, for quantized frames only
+#   range start: index of the first point replaced, for replace frames only
+#   payload: points count packed records of the fields
+# Points frames stand alone. Keyframes reset the points of the stream, which
+# append, replace and remove frames then update: with points appended, points
+# replaced from the range start, or points removed by their uint32 "index".
+# The flags hold the payload codec, whether its bytes were shuffled and whether
+# the xyz are integers to multiply by the scale and add to the offset.
+# Legacy frames are a 4 bytes big-endian payload size followed by float32 xyz,
+# a size which never matches the magic.
+# On connection, the server sends a hello with the codecs it can decode.
+# Over UDP, each encoded frame is split into fragments sent in a datagram each,
+# after a fragment header: magic, frame id, frame size, fragment offset in the
+# frame, fragment index and fragments count. There is no hello.
+# Producers on the same host write the encoded frames into the slots of a
+# shared memory ring, announced once on a Unix socket: magic, shared memory
+# name, slots count and slot size. Then they send the index, sequence number
+# and frame size of each slot written, and the server sends back the index of
+# each slot released by the viewer. Frames outgrowing the slots are written in
+# a larger ring, announced the same way once all the slots are released.
+FRAME_MAGIC = b"PCVF"
+HELLO_MAGIC = b"PCVH"
+PROTOCOL_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sBBBBIIdI")
+FIELD_STRUCT = struct.Struct("<16s3sB")
+HELLO_STRUCT = struct.Struct("<4sBB")
+QUANTIZATION_STRUCT = struct.Struct("<3d3d")
+RANGE_STRUCT = struct.Struct("<I")
+FRAGMENT_MAGIC = b"PCVD"
+FRAGMENT_STRUCT = struct.Struct("<4sIIIHH")
+SHARED_MEMORY_MAGIC = b"PCVS"
+SHARED_MEMORY_STRUCT = struct.Struct("<4s64sII")
+SLOT_STRUCT = struct.Struct("<III")
+RELEASE_STRUCT = struct.Struct("<I")
+LEGACY_SIZE_LENGTH = 4
+
+CODEC_MASK = 0x0F
+SHUFFLE_FLAG = 0x10
+QUANTIZED_FLAG = 0x20
+ZLIB_LEVEL = 1
+LZMA_PRESET = 1
+DEFAULT_PRECISION = 0.001  # Millimetre with coordinates in metres
+DEFAULT_DATAGRAM_SIZE = 1400  # Fits in an Ethernet MTU with the IP/UDP headers
+MAX_DATAGRAM_SIZE = 65507  # UDP payload over IPv4
+MAX_FRAME_SIZE = 1 << 30  # Bytes of an encoded or decoded frame, 1 GB
+MAX_DATAGRAM_FRAME_SIZE = 1 << 25  # Bytes of a frame over UDP, 32 MB
+FRAME_ID_MODULO = 1 << 32
+
+XYZ_FIELDS = ("x", "y", "z")
+FIELD_KINDS = "biuf"  # Booleans, integers and floats
+INDEX_FIELD = "index"
+DEFAULT_FIELDS = {
+    "x": ("<f4", 1),
+    "y": ("<f4", 1),
+    "z": ("<f4", 1),
+    "rgb": ("|u1", 3),
+    "intensity": ("<f4", 1),
+    "ring": ("<u2", 1),
+    "timestamp": ("<f8", 1),
+}
+
+
+class FrameType(IntEnum):
+    POINTS = 0
+    KEYFRAME = 1
+    APPEND = 2
+    REPLACE = 3
+    REMOVE = 4
+
+    def __str__(self):
+        return self.name
+
+
+class Codec(IntEnum):
+    NONE = 0
+    ZLIB = 1
+    LZMA = 2
+
+    def __str__(self):
+        return self.name
+
+
+SUPPORTED_CODECS = (Codec.NONE, Codec.ZLIB, Codec.LZMA)
+DELTA_FRAME_TYPES = (FrameType.APPEND, FrameType.REPLACE, FrameType.REMOVE)
+
+
+@dataclass
+class FrameHeader:
+    version: int
+    frame_type: FrameType
+    n_fields: int
+    flags: int
+    n_points: int
+    sequence: int
+    timestamp: float
+    payload_size: int
+    range_start: int = 0
+
+
+@dataclass
+class FragmentHeader:
+    frame_id: int
+    frame_size: int
+    offset: int
+    index: int
+    n_fragments: int
+
+
+@dataclass
+class Quantization:
+    scale: np.ndarray
+    offset: np.ndarray
+
+
+def get_points_dtype(fields: list[tuple[str, str, int]]) -> np.dtype:
+    # Packed records, without any alignment padding between the fields
+    return np.dtype(
+        [
+            (name, dtype) if count == 1 else (name, dtype, (count,))
+            for name, dtype, count in fields
+        ]
+    )
+
+
+XYZ_DTYPE = get_points_dtype([(name, *DEFAULT_FIELDS[name]) for name in XYZ_FIELDS])
+INDEX_DTYPE = get_points_dtype([(INDEX_FIELD, "<u4", 1)])
+
+
+def get_dtype_fields(dtype: np.dtype) -> list[tuple[str, str, int]]:
+    fields = []
+
+    for name in dtype.names:
+        field_dtype = dtype.fields[name][0]
+        count = int(np.prod(field_dtype.shape)) if field_dtype.shape else 1
+        base_dtype = field_dtype.base if field_dtype.shape else field_dtype
+        fields.append((name, base_dtype.str, count))
+
+    return fields
+
+
+def get_values_field(values: np.ndarray) -> tuple[str, int]:
+    return values.dtype.str, int(np.prod(values.shape[1:]))
+
+
+def to_records(points: np.ndarray, **attributes: np.ndarray) -> np.ndarray:
+    # Structured array with xyz and the given attributes, in the default layouts
+    fields = [(name, *DEFAULT_FIELDS[name]) for name in XYZ_FIELDS]
+    fields += [
+        (name, *DEFAULT_FIELDS.get(name, get_values_field(values)))
+        for name, values in attributes.items()
+    ]
+
+    records = np.empty(len(points), dtype=get_points_dtype(fields))
+
+    for i, name in enumerate(XYZ_FIELDS):
+        records[name] = points[:, i]
+
+    for name, values in attributes.items():
+        records[name] = values
+
+    return records
+
+
+def to_index_records(indices: np.ndarray) -> np.ndarray:
+    # Records of a remove frame
+    records = np.empty(len(indices), dtype=INDEX_DTYPE)
+    records[INDEX_FIELD] = indices
+
+    return records
+
+
+def quantize(
+    points: np.ndarray, dtype: str = "<i2", precision: float = DEFAULT_PRECISION
+) -> tuple[np.ndarray, Quantization]:
+    # Coordinates centered on their bounds, the scale is coarsened on the axes
+    # whose extent does not fit in the integers range at the given precision
+    lower = points.min(axis=0) if len(points) else np.zeros(3)
+    upper = points.max(axis=0) if len(points) else np.zeros(3)
+    offset = (lower + upper) / 2
+    max_value = np.iinfo(dtype).max - 1
+    scale = np.maximum(precision, (upper - lower) / 2 / max_value)
+
+    quantized = np.rint((points - offset) / scale).astype(dtype)
+
+    return quantized, Quantization(scale, offset)
+
+
+def to_quantized_records(
+    points: np.ndarray,
+    dtype: str = "<i2",
+    precision: float = DEFAULT_PRECISION,
+    **attributes: np.ndarray,
+) -> tuple[np.ndarray, Quantization]:
+    quantized, quantization = quantize(points, dtype, precision)
+    fields = [(name, dtype, 1) for name in XYZ_FIELDS]
+    fields += [
+        (name, *DEFAULT_FIELDS.get(name, get_values_field(values)))
+        for name, values in attributes.items()
+    ]
+
+    records = np.empty(len(points), dtype=get_points_dtype(fields))
+
+    for i, name in enumerate(XYZ_FIELDS):
+        records[name] = quantized[:, i]
+
+    for name, values in attributes.items():
+        records[name] = values
+
+    return records, quantization
+
+
+def encode_header(
+    records: np.ndarray,
+    sequence: int = 0,
+    timestamp: float = 0.0,
+    payload_size: int = None,
+    flags: int = 0,
+    frame_type: FrameType = FrameType.POINTS,
+    quantization: Quantization = None,
+    range_start: int = 0,
+) -> bytes:
+    fields = get_dtype_fields(records.dtype)
+
+    if quantization is not None:
+        flags |= QUANTIZED_FLAG
+
+    header = HEADER_STRUCT.pack(
+        FRAME_MAGIC,
+        PROTOCOL_VERSION,
+        frame_type,
+        len(fields),
+        flags,
+        len(records),
+        sequence,
+        timestamp,
+        records.nbytes if payload_size is None else payload_size,
+    )
+
+    header += b"".join(
+        FIELD_STRUCT.pack(name.encode(), dtype.encode(), count)
+        for name, dtype, count in fields
+    )
+
+    if quantization is not None:
+        header += QUANTIZATION_STRUCT.pack(*quantization.scale, *quantization.offset)
+
+    if frame_type == FrameType.REPLACE:
+        header += RANGE_STRUCT.pack(range_start)
+
+    return header
+
+
+def encode_frame(
+    records: np.ndarray,
+    sequence: int = 0,
+    timestamp: float = 0.0,
+    codec: Codec = Codec.NONE,
+    shuffle: bool = True,
+    quantization: Quantization = None,
+    frame_type: FrameType = FrameType.POINTS,
+    range_start: int = 0,
+) -> bytes:
+    if codec == Codec.NONE:
+        payload, flags = records.tobytes(), 0
+
+    else:
+        payload, flags = compress_payload(records, codec, shuffle)
+
+    header = encode_header(
+        records,
+        sequence,
+        timestamp,
+        len(payload),
+        flags,
+        frame_type,
+        quantization,
+        range_start,
+    )
+
+    return header + payload
+
+
+def compress_payload(
+    records: np.ndarray, codec: Codec, shuffle: bool = True
+) -> tuple[bytes, int]:
+    # Shuffling groups the n-th byte of every record: the exponent bytes of the
+    # coordinates end up together and compress far better than interleaved
+    data = np.ascontiguousarray(records).view(np.uint8)
+    flags = codec
+
+    if shuffle:
+        data = data.reshape((len(records), records.dtype.itemsize)).T
+        flags |= SHUFFLE_FLAG
+
+    data = data.tobytes()
+
+    if codec == Codec.ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL), flags
+
+    if codec == Codec.LZMA:
+        return lzma.compress(data, preset=LZMA_PRESET), flags
+
+    return data, flags
+
+
+def decompress_payload(data: bytes, flags: int, records: np.ndarray) -> np.ndarray:
+    # Decompressed and unshuffled into the given records. The output is capped
+    # a byte over the records size, a payload inflating further is rejected
+    codec = Codec(flags & CODEC_MASK)
+    max_size = records.nbytes + 1
+
+    if codec == Codec.ZLIB:
+        data = zlib.decompressobj().decompress(data, max_size)
+
+    elif codec == Codec.LZMA:
+        data = lzma.LZMADecompressor().decompress(data, max_length=max_size)
+
+    if len(data) != records.nbytes:
+        raise ValueError("Decompressed payload size does not match the points")
+
+    output = records.view(np.uint8).reshape((len(records), records.dtype.itemsize))
+    data = np.frombuffer(data, dtype=np.uint8)
+
+    if flags & SHUFFLE_FLAG:
+        output[:] = data.reshape(output.shape[::-1]).T
+
+    else:
+        output[:] = data.reshape(output.shape)
+
+    return records
+
+
+def encode_hello(codecs: tuple[Codec, ...] = SUPPORTED_CODECS) -> bytes:
+    return HELLO_STRUCT.pack(
+        HELLO_MAGIC, PROTOCOL_VERSION, sum(1 << codec for codec in codecs)
+    )
+
+
+def decode_hello(data: bytes) -> tuple[int, tuple[Codec, ...]]:
+    magic, version, codecs_mask = HELLO_STRUCT.unpack(data)
+
+    if magic != HELLO_MAGIC:
+        raise ValueError("Not a hello message")
+
+    codecs = tuple(codec for codec in Codec if codecs_mask & (1 << codec))
+
+    return version, codecs
+
+
+def encode_legacy_frame(points: np.ndarray) -> bytes:
+    payload = points.astype(np.float32).tobytes()
+
+    return len(payload).to_bytes(LEGACY_SIZE_LENGTH, byteorder="big") + payload
+
+
+def encode_fragments(
+    frame: bytes, frame_id: int, datagram_size: int = DEFAULT_DATAGRAM_SIZE
+) -> list[bytes]:
+    fragment_size = datagram_size - FRAGMENT_STRUCT.size
+    offsets = range(0, max(len(frame), 1), fragment_size)
+
+    if len(offsets) > 0xFFFF or len(frame) > MAX_DATAGRAM_FRAME_SIZE:
+        raise ValueError("Frame too large to be sent over UDP")
+
+    return [
+        FRAGMENT_STRUCT.pack(
+            FRAGMENT_MAGIC,
+            frame_id % FRAME_ID_MODULO,
+            len(frame),
+            offset,
+            index,
+            len(offsets),
+        )
+        + frame[offset : offset + fragment_size]
+        for index, offset in enumerate(offsets)
+    ]
+
+
+def decode_fragment_header(data: bytes) -> FragmentHeader:
+    if len(data) < FRAGMENT_STRUCT.size:
+        raise ValueError("Datagram smaller than a fragment header")
+
+    magic, frame_id, frame_size, offset, index, n_fragments = (
+        FRAGMENT_STRUCT.unpack_from(data)
+    )
+
+    if magic != FRAGMENT_MAGIC:
+        raise ValueError("Not a frame fragment")
+
+    fragment_size = len(data) - FRAGMENT_STRUCT.size
+
+    # Checked before the frame buffer is allocated from the frame size, any
+    # datagram can claim it
+    if frame_size > MAX_DATAGRAM_FRAME_SIZE:
+        raise ValueError("Frame larger than the maximum frame size over UDP")
+
+    if (
+        index >= n_fragments
+        or offset + fragment_size > frame_size
+        or frame_size > n_fragments * (MAX_DATAGRAM_SIZE - FRAGMENT_STRUCT.size)
+    ):
+        raise ValueError("Fragment out of its frame bounds")
+
+    return FragmentHeader(frame_id, frame_size, offset, index, n_fragments)
+
+
+def is_newer_frame_id(frame_id: int, other_frame_id: int) -> bool:
+    # Frame ids wrap around, the newer one is less than half the range ahead
+    return 0 < (frame_id - other_frame_id) % FRAME_ID_MODULO < FRAME_ID_MODULO // 2
+
+
+def get_shared_memory_path(port: int) -> str:
+    # Unix socket of the shared memory producers, next to the TCP port
+    return os.path.join(tempfile.gettempdir(), f"pointcloud-viewer-{port}.sock")
+
+
+def encode_shared_memory_hello(name: str, n_slots: int, slot_size: int) -> bytes:
+    return SHARED_MEMORY_STRUCT.pack(
+        SHARED_MEMORY_MAGIC, name.encode(), n_slots, slot_size
+    )
+
+
+def decode_shared_memory_hello(data: bytes) -> tuple[str, int, int]:
+    magic, name, n_slots, slot_size = SHARED_MEMORY_STRUCT.unpack(data)
+
+    if magic != SHARED_MEMORY_MAGIC:
+        raise ValueError("Not a shared memory hello")
+
+    return name.rstrip(b"\0").decode(), n_slots, slot_size
+
+
+def decode_header(data: bytes) -> FrameHeader:
+    (
+        magic,
+        version,
+        frame_type,
+        n_fields,
+        flags,
+        n_points,
+        sequence,
+        timestamp,
+        payload_size,
+    ) = HEADER_STRUCT.unpack(data)
+
+    if magic != FRAME_MAGIC:
+        raise ValueError("Not a frame header")
+
+    if version > PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version: {version}")
+
+    if payload_size > MAX_FRAME_SIZE or n_points > MAX_FRAME_SIZE:
+        raise ValueError("Frame larger than the maximum frame size")
+
+    return FrameHeader(
+        version,
+        FrameType(frame_type),
+        n_fields,
+        flags,
+        n_points,
+        sequence,
+        timestamp,
+        payload_size,
+    )
+
+
+def decode_fields(
+    data: bytes, n_fields: int, frame_type: FrameType = FrameType.POINTS
+) -> np.dtype:
+    fields = []
+
+    for i in range(n_fields):
+        name, dtype, count = FIELD_STRUCT.unpack_from(data, i * FIELD_STRUCT.size)
+        name = name.rstrip(b"\0").decode()
+
+        # Numbers only, a single coordinate per point for the xyz
+        if np.dtype(dtype.decode()).kind not in FIELD_KINDS:
+            raise ValueError(f"Unsupported type of field {name}")
+
+        if count < 1 or (name in XYZ_FIELDS and count != 1):
+            raise ValueError(f"Invalid components count of field {name}")
+
+        fields.append((name, dtype.decode(), count))
+
+    dtype = get_points_dtype(fields)
+
+    if dtype.itemsize == 0:
+        raise ValueError("Frame without any data per point")
+
+    if frame_type == FrameType.REMOVE:
+        if get_dtype_fields(dtype) != get_dtype_fields(INDEX_DTYPE):
+            raise ValueError("Remove frame without only uint32 indices")
+
+    elif not set(XYZ_FIELDS).issubset(dtype.names):
+        raise ValueError("Frame without xyz fields")
+
+    return dtype
+
+
+def check_frame_size(n_points: int, dtype: np.dtype):
+    # Decoded size, the buffers of a frame are allocated from it
+    if n_points * dtype.itemsize > MAX_FRAME_SIZE:
+        raise ValueError("Frame larger than the maximum frame size")
+
+
+def decode_quantization(data: bytes) -> Quantization:
+    values = np.array(QUANTIZATION_STRUCT.unpack(data))
+
+    return Quantization(values[:3], values[3:])
+
+
+def decode_frame(data: memoryview) -> tuple[FrameHeader, np.ndarray, Quantization]:
+    # Whole frame in memory: the records are a view on it, unless compressed
+    if len(data) < HEADER_STRUCT.size:
+        raise ValueError("Frame smaller than its header")
+
+    header = decode_header(data[: HEADER_STRUCT.size])
+    offset = HEADER_STRUCT.size + header.n_fields * FIELD_STRUCT.size
+    quantization = None
+
+    if len(data) < offset:
+        raise ValueError("Frame smaller than its fields")
+
+    dtype = decode_fields(
+        data[HEADER_STRUCT.size : offset], header.n_fields, header.frame_type
+    )
+    check_frame_size(header.n_points, dtype)
+
+    if header.flags & QUANTIZED_FLAG:
+        quantization_end = offset + QUANTIZATION_STRUCT.size
+
+        if len(data) < quantization_end:
+            raise ValueError("Frame smaller than its quantization")
+
+        quantization = decode_quantization(data[offset:quantization_end])
+        offset = quantization_end
+
+    if header.frame_type == FrameType.REPLACE:
+        if len(data) < offset + RANGE_STRUCT.size:
+            raise ValueError("Frame smaller than its range")
+
+        (header.range_start,) = RANGE_STRUCT.unpack_from(data, offset)
+        offset += RANGE_STRUCT.size
+
+    payload = data[offset:]
+
+    if len(payload) != header.payload_size:
+        raise ValueError("Payload size does not match the frame header")
+
+    if header.flags & CODEC_MASK:
+        records = np.empty(header.n_points, dtype=dtype)
+        decompress_payload(payload, header.flags, records)
+
+    elif header.payload_size != header.n_points * dtype.itemsize:
+        raise ValueError("Payload size does not match the points")
+
+    else:
+        records = np.frombuffer(payload, dtype=dtype, count=header.n_points)
+
+    return header, records, quantization
+
+
+def get_xyz(records: np.ndarray, quantization: Quantization = None) -> np.ndarray:
+    # A view on the records when they are only float32 xyz, a single copy
+    # gathering (and dequantizing) the xyz columns otherwise
+    if not set(XYZ_FIELDS).issubset(records.dtype.names):  # Remove frames
+        return np.empty((0, 3), dtype=np.float32)
+
+    if quantization is not None:
+        points = np.empty((len(records), 3), dtype=np.float32)
+
+        for i, name in enumerate(XYZ_FIELDS):
+            np.multiply(
+                records[name], quantization.scale[i], out=points[:, i], casting="unsafe"
+            )
+            points[:, i] += quantization.offset[i]
+
+        return points
+
+    if get_dtype_fields(records.dtype) == [(name, "<f4", 1) for name in XYZ_FIELDS]:
+        return records.view(np.float32).reshape((-1, 3))
+
+    return recfunctions.structured_to_unstructured(
+        records[list(XYZ_FIELDS)], dtype=np.float32
+    )
+
+
+def get_attributes(records: np.ndarray) -> dict[str, np.ndarray]:
+    return {
+        name: records[name] for name in records.dtype.names if name not in XYZ_FIELDS
+    }
@@ -0,0 +1,10 @@
+from enum import Enum
+
+
+class Transport(Enum):
+    TCP = "TCP"
+    UDP = "UDP"  # Frames split into datagram fragments, lost ones are dropped
+    SHARED_MEMORY = "Shared memory"  # Same host only, frames written in place
+
+    def __str__(self):
+        return self.name
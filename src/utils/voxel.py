@@ -0,0 +1,46 @@
+import numpy as np
+
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)  # Fibonacci hashing
+
+
+def get_first_indices(keys: np.ndarray) -> np.ndarray:
+    # Index of the first occurrence of each key, in input order, without
+    # sorting the keys: they are hashed in a table keeping the smallest index
+    # per slot, the keys losing their slot to another one are hashed again
+    indices = np.arange(len(keys))
+    first_indices = []
+
+    while len(indices):
+        n_bits = (2 * len(indices)).bit_length()
+        slots = (keys[indices].astype(np.uint64) * HASH_MULTIPLIER) >> np.uint64(
+            64 - n_bits
+        )
+
+        table = np.full(1 << n_bits, len(keys), dtype=np.int64)
+        np.minimum.at(table, slots, indices)
+        slot_indices = table[slots]
+
+        first_indices.append(indices[slot_indices == indices])
+        indices = indices[keys[slot_indices] != keys[indices]]
+
+    return np.sort(np.concatenate(first_indices))
+
+
+def voxel_downsample_indices(points: np.ndarray, voxel_size: float) -> np.ndarray:
+    # Indices of the first point found in each occupied voxel, in input order
+    if len(points) == 0 or voxel_size <= 0:
+        return np.arange(len(points))
+
+    origin = points.min(axis=0)
+    voxels = ((points - origin) / voxel_size).astype(np.int64)
+    dims = voxels.max(axis=0) + 1
+
+    if np.prod(dims.astype(np.float64)) < np.iinfo(np.int64).max:
+        keys = (voxels[:, 0] * dims[1] + voxels[:, 1]) * dims[2] + voxels[:, 2]
+
+        return get_first_indices(keys)
+
+    # Grid too large for a linear key
+    _, indices = np.unique(voxels, axis=0, return_index=True)
+
+    return np.sort(indices)
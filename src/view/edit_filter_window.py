@@ -8,10 +8,12 @@ from PyQt5.QtWidgets import (
     QStyle,
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt, pyqtSignal, QEvent
+from PyQt5.QtCore import Qt, pyqtSignal, QEvent, QTimer
 from controller.controller import Controller
 from model.filter import Filter
 
+COUNT_DELAY = 200  # ms without bounds change before the points are counted again
+
 
 # TODO: Minimize/maximize event are still bugging
 # TODO: Move action in the menu does not work
@@ -45,6 +47,13 @@ class EditFilterWindow(QMdiSubWindow):
         self.setAttribute(Qt.WA_DeleteOnClose, True)
 
         self.normal_size = None
+
+        # The count is only refreshed once the bounds stop changing
+        self.count_timer = QTimer(self)
+        self.count_timer.setSingleShot(True)
+        self.count_timer.setInterval(COUNT_DELAY)
+        self.count_timer.timeout.connect(self.update_points_count)
+
         self.create_ui()
 
     def create_ui(self):
@@ -90,6 +99,12 @@ class EditFilterWindow(QMdiSubWindow):
         main_layout.addLayout(first_line_layout)
         main_layout.addLayout(second_line_layout)
 
+        self.points_count_label = QLabel()
+        self.points_count_label.setFont(QFont("Arial", 10))
+        self.points_count_label.setToolTip("Number of points inside the filter")
+        main_layout.addWidget(self.points_count_label)
+        self.update_points_count()
+
         self.normal_height = self.sizeHint().height()
 
     def closeEvent(self, event):
@@ -122,6 +137,7 @@ class EditFilterWindow(QMdiSubWindow):
             self.coord_inputs[label].setValue(value)
 
         self.is_changing_filter = False
+        self.update_points_count()
 
     def update_viewer(self):
         if self.is_changing_filter:
@@ -138,6 +154,13 @@ class EditFilterWindow(QMdiSubWindow):
                 self.coord_inputs["Z max"].value(),
             ),
         )
+        self.count_timer.start()
+
+    def update_points_count(self):
+        self.count_timer.stop()
+
+        points_count = self.controller.count_points_inside_filter(self.current_filter)
+        self.points_count_label.setText(f"Points inside: {points_count}")
 
     def handle_minimize(self):
         self.is_collapsed = not self.is_collapsed
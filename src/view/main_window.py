@@ -1,3 +1,4 @@
+from typing import Callable
 import qdarkstyle
 from PyQt5.QtWidgets import (
     QWidget,
@@ -5,8 +6,10 @@ from PyQt5.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QLabel,
+    QMenu,
     QMenuBar,
     QAction,
+    QActionGroup,
     QPushButton,
 )
 from PyQt5.QtCore import Qt
@@ -15,9 +18,24 @@ from controller.controller import Controller
 from view.control_layout import ControlLayout
 from view.viewer_area import ViewerArea
 from view.help_window import HelpWindow
+from view.viewer_layout import DEFAULT_POINT_BUDGET
+from view.render_scheduler import DEFAULT_MAX_FPS
 from utils.log import Log
 from utils.theme import Theme
 
+POINT_BUDGETS = (1_000_000, 2_000_000, 5_000_000, 10_000_000, 20_000_000)
+MAX_FPS_CHOICES = (15, 30, 60, 120)
+
+
+def format_points_count(points_count: int) -> str:
+    if points_count >= 1_000_000:
+        return f"{points_count / 1_000_000:.1f}M"
+
+    if points_count >= 1_000:
+        return f"{points_count / 1_000:.1f}k"
+
+    return str(points_count)
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -27,6 +45,7 @@ class MainWindow(QMainWindow):
         self.controller.notify_signal.connect(self.on_notify_signal)
         self.controller.close_application_signal.connect(self.close)
         self.controller.change_theme_signal.connect(self.change_theme)
+        self.controller.update_drawn_points_signal.connect(self.update_drawn_points)
 
         self.setWindowTitle("Pointclouds Viewer")
         self.resize(1920, 1080)
@@ -62,6 +81,10 @@ class MainWindow(QMainWindow):
 
         info_layout.addStretch()
 
+        self.drawn_points_label = QLabel("")
+        self.drawn_points_label.setToolTip("Points drawn within the point budget")
+        info_layout.addWidget(self.drawn_points_label)
+
         open_debug_window_button = QPushButton("…")
         open_debug_window_button.setCursor(Qt.PointingHandCursor)
         open_debug_window_button.setToolTip("Open debug window")
@@ -102,14 +125,69 @@ class MainWindow(QMainWindow):
         toggle_axes_action.toggled.connect(self.controller.show_hide_axes)
         view_menu.addAction(toggle_axes_action)
 
+        color_by_filter_action = QAction("Color points by filter", self)
+        color_by_filter_action.setCheckable(True)
+        color_by_filter_action.setChecked(False)
+        color_by_filter_action.toggled.connect(self.controller.toggle_color_by_filter)
+        view_menu.addAction(color_by_filter_action)
+
+        self.add_choice_menu(
+            view_menu,
+            "Point budget",
+            {
+                f"{format_points_count(budget)} points": budget
+                for budget in POINT_BUDGETS
+            },
+            DEFAULT_POINT_BUDGET,
+            self.controller.set_point_budget,
+        )
+        self.add_choice_menu(
+            view_menu,
+            "Max frame rate",
+            {f"{max_fps} fps": max_fps for max_fps in MAX_FPS_CHOICES},
+            DEFAULT_MAX_FPS,
+            self.controller.set_max_fps,
+        )
+
         menu_bar.addAction("&Help", self.open_help_window)
         menu_bar.setCursor(Qt.PointingHandCursor)
 
+    def add_choice_menu(
+        self,
+        menu: QMenu,
+        title: str,
+        choices: dict[str, int],
+        current_value: int,
+        on_choice: Callable[[int], None],
+    ):
+        # Submenu of exclusive values, the checked one being the current value
+        choice_menu = menu.addMenu(title)
+        action_group = QActionGroup(self)
+
+        for label, value in choices.items():
+            action = QAction(label, self)
+            action.setCheckable(True)
+            action.setChecked(value == current_value)
+            action.triggered.connect(lambda checked, value=value: on_choice(value))
+            action_group.addAction(action)
+            choice_menu.addAction(action)
+
     def on_notify_signal(self, log: Log, message: str):
         if log != Log.DEBUG:
             self.info_label.setStyleSheet(f"color: {log.value};")
             self.info_label.setText(message)
 
+    def update_drawn_points(self, drawn_points: int, total_points: int):
+        if total_points == 0:
+            self.drawn_points_label.setText("")
+            return
+
+        ratio = 100 * drawn_points / total_points
+        self.drawn_points_label.setText(
+            f"Drawn: {format_points_count(drawn_points)} / "
+            f"{format_points_count(total_points)} points ({ratio:.0f}%)"
+        )
+
     def closeEvent(self, event: QCloseEvent):
         self.controller.close_application()
 
@@ -1,13 +1,16 @@
-from PyQt5.QtWidgets import QMenu, QAction
+from PyQt5.QtWidgets import QMenu, QAction, QActionGroup
 from PyQt5.QtCore import pyqtSignal
 
+IMPORTANCE_LEVELS = {"Low": 0.5, "Normal": 1.0, "High": 2.0}
+
 
 class PointcloudMenu(QMenu):
     toggle_pointcloud_visibility = pyqtSignal()
     rename_pointcloud = pyqtSignal()
+    change_pointcloud_importance = pyqtSignal(float)
     delete_pointcloud = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, importance: float = 1.0):
         super().__init__()
 
         visibility_action = QAction("Toggle visibility", self)
@@ -18,6 +21,21 @@ class PointcloudMenu(QMenu):
         rename_action.triggered.connect(self.rename_pointcloud)
         self.addAction(rename_action)
 
+        importance_menu = self.addMenu("Importance")
+        importance_group = QActionGroup(self)
+
+        for label, value in IMPORTANCE_LEVELS.items():
+            importance_action = QAction(label, self)
+            importance_action.setCheckable(True)
+            importance_action.setChecked(value == importance)
+            importance_action.triggered.connect(
+                lambda checked, value=value: self.change_pointcloud_importance.emit(
+                    value
+                )
+            )
+            importance_group.addAction(importance_action)
+            importance_menu.addAction(importance_action)
+
         delete_action = QAction("Delete", self)
         delete_action.triggered.connect(self.delete_pointcloud)
         self.addAction(delete_action)
@@ -60,7 +60,7 @@ class PointcloudWidget(QWidget):
         self.customContextMenuRequested.connect(self.pointcloud_menu)
 
     def pointcloud_menu(self, position: QPoint):
-        menu = PointcloudMenu()
+        menu = PointcloudMenu(self.pointcloud.importance)
 
         menu.toggle_pointcloud_visibility.connect(
             lambda is_visible=self.checkbox.isChecked(): self.checkbox.setChecked(
@@ -68,6 +68,11 @@ class PointcloudWidget(QWidget):
             )
         )
         menu.rename_pointcloud.connect(self.label.enter_edit_mode)
+        menu.change_pointcloud_importance.connect(
+            lambda importance, pointcloud=self.pointcloud: self.controller.set_pointcloud_importance(
+                pointcloud, importance
+            )
+        )
         menu.delete_pointcloud.connect(
             lambda pointcloud=self.pointcloud: self.controller.delete_pointcloud(
                 pointcloud
@@ -0,0 +1,54 @@
+from typing import Callable, Hashable
+from PyQt5.QtCore import QObject, QTimer
+
+DEFAULT_MAX_FPS = 30
+
+
+class RenderScheduler(QObject):
+    def __init__(
+        self, render_function: Callable[[], None], max_fps: int = DEFAULT_MAX_FPS
+    ):
+        super().__init__()
+
+        self.render_function = render_function
+
+        # Pending updates are merged by key, only the last one is applied
+        self.pending_updates: dict[Hashable, Callable[[], None]] = {}
+        self.is_dirty: bool = False
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.on_tick)
+
+        self.max_fps: int = None
+        self.set_max_fps(max_fps)
+
+    def set_max_fps(self, max_fps: int):
+        self.max_fps = max(1, max_fps)
+        self.timer.setInterval(round(1000 / self.max_fps))
+
+    def schedule_update(self, key: Hashable, update_function: Callable[[], None]):
+        self.pending_updates[key] = update_function
+        self.request_render()
+
+    def request_render(self):
+        self.is_dirty = True
+
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        updates = self.pending_updates
+        self.pending_updates = {}
+        self.is_dirty = False
+
+        for update_function in updates.values():
+            update_function()
+
+        self.render_function()
+
+    def on_tick(self):
+        if not self.is_dirty:  # Nothing changed since the last frame
+            self.timer.stop()
+            return
+
+        self.flush()
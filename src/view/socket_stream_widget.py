@@ -0,0 +1,137 @@
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QCheckBox,
+    QPushButton,
+    QColorDialog,
+    QLabel,
+    QSpinBox,
+    QDoubleSpinBox,
+)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QCursor, QColor, QFont
+from controller.controller import Controller
+from model.socket_stream import SocketStream
+
+
+class SocketStreamWidget(QWidget):
+    def __init__(self, stream: SocketStream, parent=None):
+        super().__init__(parent)
+
+        self.controller: Controller = Controller()
+        self.stream: SocketStream = stream
+
+        self.create_ui()
+
+    def create_ui(self):
+        main_layout = QVBoxLayout()
+        main_layout.setContentsMargins(0, 0, 0, 0)
+        main_layout.setSpacing(2)
+        self.setLayout(main_layout)
+
+        layout = QHBoxLayout()
+        layout.setSpacing(5)
+        layout.setAlignment(Qt.AlignVCenter)
+        main_layout.addLayout(layout)
+
+        self.checkbox = QCheckBox()
+        self.checkbox.setToolTip("Show/Hide stream")
+        self.checkbox.setChecked(self.stream.is_visible)
+        self.checkbox.setCursor(QCursor(Qt.PointingHandCursor))
+        self.checkbox.toggled.connect(
+            lambda is_visible, stream=self.stream: self.controller.toggle_socket_stream_visibility(
+                stream, is_visible
+            )
+        )
+        layout.addWidget(self.checkbox)
+
+        self.label = QLabel(self.stream.name)
+        self.label.setMinimumWidth(120)
+        self.label.setToolTip(self.stream.name)
+        layout.addWidget(self.label)
+
+        self.color_btn = QPushButton()
+        self.color_btn.setToolTip("Change stream color")
+        self.color_btn.setFixedSize(20, 20)
+        self.color_btn.setCursor(QCursor(Qt.PointingHandCursor))
+        self.color_btn.clicked.connect(self.change_stream_color)
+        self.update_color_button()
+        layout.addWidget(self.color_btn)
+
+        self.persistence_spinbox = QSpinBox()
+        self.persistence_spinbox.setToolTip("Stream persistence (-1: all frames)")
+        self.persistence_spinbox.setMinimum(-1)
+        self.persistence_spinbox.setMaximum(10)
+        self.persistence_spinbox.setValue(self.stream.persistence)
+        self.persistence_spinbox.valueChanged.connect(
+            lambda persistence, stream=self.stream: self.controller.set_socket_stream_persistence(
+                stream, persistence
+            )
+        )
+        layout.addWidget(self.persistence_spinbox)
+
+        self.voxel_size_spinbox = QDoubleSpinBox()
+        self.voxel_size_spinbox.setToolTip(
+            "Voxel size of the stream downsampling, on reception (0: all points)"
+        )
+        self.voxel_size_spinbox.setDecimals(3)
+        self.voxel_size_spinbox.setMinimum(0.0)
+        self.voxel_size_spinbox.setMaximum(100.0)
+        self.voxel_size_spinbox.setSingleStep(0.01)
+        self.voxel_size_spinbox.setValue(self.stream.voxel_size)
+        self.voxel_size_spinbox.valueChanged.connect(
+            lambda voxel_size, stream=self.stream: self.controller.set_socket_stream_voxel_size(
+                stream, voxel_size
+            )
+        )
+        layout.addWidget(self.voxel_size_spinbox)
+
+        self.telemetry_label = QLabel()
+        self.telemetry_label.setFont(QFont("Arial", 8))
+        self.telemetry_label.setToolTip(
+            "Frames and MB received per second, points per frame, decode time, "
+            "latency from the reception (and from the sender) to the render, "
+            "dropped and queued frames, reconnections"
+        )
+        main_layout.addWidget(self.telemetry_label)
+        self.update_telemetry()
+
+    def update_telemetry(self, n_queued_frames: int = 0, n_dropped_frames: int = 0):
+        sample = self.stream.telemetry.sample(n_queued_frames, n_dropped_frames)
+        latency = f"{sample.render_latency:.1f} ms"
+
+        if sample.transfer_latency is not None:
+            latency += f" (+{sample.transfer_latency:.1f} ms sender)"
+
+        self.telemetry_label.setText(
+            f"{sample.frames_per_second:.1f} fps, "
+            f"{sample.megabytes_per_second:.2f} MB/s, "
+            f"{sample.points_per_frame:.0f} pts, "
+            f"decode {sample.decode_time:.1f} ms, "
+            f"latency {latency}\n"
+            f"dropped {sample.n_dropped_frames}, "
+            f"queued {sample.n_queued_frames}, "
+            f"reconnections {sample.n_reconnections}"
+        )
+
+    def change_stream_color(self):
+        color = QColorDialog.getColor(initial=QColor(self.stream.color), parent=self)
+
+        if color.isValid():
+            self.controller.set_socket_stream_color(self.stream, color.name())
+            self.update_color_button()
+
+    def update_color_button(self):
+        self.color_btn.setStyleSheet(
+            f"""
+                QPushButton {{
+                    background-color: {self.stream.color};
+                }}
+                QToolTip {{
+                    background-color: #ffffdc;
+                    color: black;
+                    border: 1px solid black;
+                }}
+            """
+        )
@@ -8,14 +8,28 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QSlider,
+    QComboBox,
 )
-from PyQt5.QtCore import Qt, QEvent, pyqtSignal
+from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal
 from PyQt5.QtGui import QIntValidator, QFont, QCursor
 from controller.controller import Controller
+from controller.replay import Replay
 from controller.socket import Socket
+from model.socket_stream import SocketStream
+from view.socket_stream_widget import SocketStreamWidget
+from utils.delivery_mode import DeliveryMode
+from utils.pause_mode import PauseMode
 from utils.log import Log
 
 DEFAULT_PORT = 8080
+TELEMETRY_INTERVAL = 1000  # ms between two samples of the streams telemetry
+REPLAY_SPEEDS = {
+    "Original speed": 1.0,
+    "Speed x2": 2.0,
+    "Speed x4": 4.0,
+    "Speed x10": 10.0,
+    "As fast as possible": 0.0,
+}
 
 
 class SocketWindow(QMdiSubWindow):
@@ -25,7 +39,20 @@ class SocketWindow(QMdiSubWindow):
         super().__init__()
 
         self.controller: Controller = Controller()
+        self.controller.add_socket_stream_signal.connect(self.add_stream_widget)
+        self.controller.delete_socket_stream_signal.connect(self.remove_stream_widget)
+        self.controller.stop_socket_signal.connect(self.remove_stream_widgets)
+        self.controller.update_socket_dropped_frames_signal.connect(
+            lambda n_dropped: self.dropped_frames_label.setText(str(n_dropped))
+        )
+        self.controller.update_recording_state_signal.connect(self.update_record_button)
+        self.controller.update_replay_state_signal.connect(self.update_replay_controls)
+        self.controller.update_replay_position_signal.connect(
+            self.update_replay_position
+        )
         self.socket = Socket()
+        self.replay = Replay()
+        self.stream_widgets: dict[int, SocketStreamWidget] = {}
 
         self.is_collapsed: bool = False
         self.title_bar_height = self.style().pixelMetric(QStyle.PM_TitleBarHeight)
@@ -42,6 +69,10 @@ class SocketWindow(QMdiSubWindow):
         self.normal_size: bool = None
         self.create_ui()
 
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.update_telemetry)
+        self.telemetry_timer.start(TELEMETRY_INTERVAL)
+
     def create_ui(self):
         main_widget = QWidget()
         self.setWidget(main_widget)
@@ -77,7 +108,7 @@ class SocketWindow(QMdiSubWindow):
         pcd_persistence_layout.addWidget(self.persistence_label)
 
         self.persistence_slider = QSlider(Qt.Horizontal)
-        self.persistence_slider.setToolTip("Choose pointclouds persistence")
+        self.persistence_slider.setToolTip("Choose the new streams persistence")
         self.persistence_slider.setCursor(QCursor(Qt.PointingHandCursor))
         self.persistence_slider.setMinimum(-1)
         self.persistence_slider.setMaximum(10)
@@ -87,6 +118,106 @@ class SocketWindow(QMdiSubWindow):
         )
         pcd_persistence_layout.addWidget(self.persistence_slider)
 
+        delivery_layout = QHBoxLayout()
+        main_layout.addLayout(delivery_layout)
+
+        delivery_layout.addWidget(QLabel("Delivery: "))
+
+        self.delivery_combobox = QComboBox()
+        self.delivery_combobox.setToolTip(
+            "Choose which received frames are drawn when the viewer is slower"
+        )
+        self.delivery_combobox.setCursor(QCursor(Qt.PointingHandCursor))
+
+        for mode in DeliveryMode:
+            self.delivery_combobox.addItem(mode.value, mode)
+
+        self.delivery_combobox.setCurrentIndex(
+            list(DeliveryMode).index(self.controller.frame_mailbox.mode)
+        )
+        self.delivery_combobox.currentIndexChanged.connect(
+            lambda index: self.controller.set_socket_delivery_mode(
+                self.delivery_combobox.itemData(index)
+            )
+        )
+        delivery_layout.addWidget(self.delivery_combobox)
+
+        delivery_layout.addWidget(QLabel("Dropped: "))
+
+        self.dropped_frames_label = QLabel(str(self.controller.n_dropped_frames))
+        self.dropped_frames_label.setToolTip("Frames dropped since the socket start")
+        delivery_layout.addWidget(self.dropped_frames_label)
+
+        pause_mode_layout = QHBoxLayout()
+        main_layout.addLayout(pause_mode_layout)
+
+        pause_mode_layout.addWidget(QLabel("Pause: "))
+
+        self.pause_mode_combobox = QComboBox()
+        self.pause_mode_combobox.setToolTip(
+            "Choose whether the clients are still read while the socket is paused"
+        )
+        self.pause_mode_combobox.setCursor(QCursor(Qt.PointingHandCursor))
+
+        for mode in PauseMode:
+            self.pause_mode_combobox.addItem(mode.value, mode)
+
+        pause_mode_layout.addWidget(self.pause_mode_combobox)
+
+        replay_layout = QHBoxLayout()
+        replay_layout.setSpacing(5)
+        main_layout.addLayout(replay_layout)
+
+        self.record_button = QPushButton("Record")
+        self.record_button.setFont(QFont("Arial", 10))
+        self.record_button.setCursor(QCursor(Qt.PointingHandCursor))
+        self.record_button.setToolTip("Record the received frames to a file")
+        self.record_button.clicked.connect(self.on_record_button)
+        replay_layout.addWidget(self.record_button)
+
+        self.replay_button = QPushButton("Replay")
+        self.replay_button.setFont(QFont("Arial", 10))
+        self.replay_button.setCursor(QCursor(Qt.PointingHandCursor))
+        self.replay_button.setToolTip("Replay frames recorded to a file")
+        self.replay_button.clicked.connect(self.on_replay_button)
+        replay_layout.addWidget(self.replay_button)
+
+        self.replay_speed_combobox = QComboBox()
+        self.replay_speed_combobox.setToolTip("Choose the replay speed")
+        self.replay_speed_combobox.setCursor(QCursor(Qt.PointingHandCursor))
+
+        for name, speed in REPLAY_SPEEDS.items():
+            self.replay_speed_combobox.addItem(name, speed)
+
+        self.replay_speed_combobox.currentIndexChanged.connect(
+            lambda index: self.controller.set_replay_speed(
+                self.replay_speed_combobox.itemData(index)
+            )
+        )
+        replay_layout.addWidget(self.replay_speed_combobox)
+
+        replay_position_layout = QHBoxLayout()
+        main_layout.addLayout(replay_position_layout)
+
+        self.replay_slider = QSlider(Qt.Horizontal)
+        self.replay_slider.setToolTip("Move to a replayed frame")
+        self.replay_slider.setCursor(QCursor(Qt.PointingHandCursor))
+        self.replay_slider.setMaximum(0)
+        self.replay_slider.setEnabled(False)
+        self.replay_slider.valueChanged.connect(self.controller.seek_replay)
+        replay_position_layout.addWidget(self.replay_slider)
+
+        self.replay_position_label = QLabel("0/0")
+        replay_position_layout.addWidget(self.replay_position_label)
+
+        self.update_record_button(self.socket.frame_log_writer is not None)
+        self.update_replay_controls(self.replay.frame_log_reader is not None)
+
+        # One entry per connected client
+        self.streams_layout = QVBoxLayout()
+        self.streams_layout.setSpacing(5)
+        main_layout.addLayout(self.streams_layout)
+
         button_layout = QHBoxLayout()
         button_layout.setSpacing(5)
         main_layout.addLayout(button_layout)
@@ -114,14 +245,77 @@ class SocketWindow(QMdiSubWindow):
         self.start_button.clicked.connect(self.on_start_socket_button)
         button_layout.addWidget(self.start_button)
 
-        self.normal_height = self.sizeHint().height()
-
         if self.socket.is_running:
             self.start_button.setEnabled(False)
             self.stop_button.setEnabled(True)
             self.port_edit.setEnabled(False)
             self.port_edit.setText(str(self.socket.port))
 
+            for stream in list(self.socket.streams.values()):
+                self.add_stream_widget(stream)
+
+        self.normal_height = self.sizeHint().height()
+
+    def add_stream_widget(self, stream: SocketStream):
+        if stream.id in self.stream_widgets:
+            return
+
+        stream_widget = SocketStreamWidget(stream)
+        self.stream_widgets[stream.id] = stream_widget
+        self.streams_layout.addWidget(stream_widget)
+        self.update_height()
+
+    def remove_stream_widget(self, stream: SocketStream):
+        stream_widget = self.stream_widgets.pop(stream.id, None)
+
+        if stream_widget is not None:
+            self.streams_layout.removeWidget(stream_widget)
+            stream_widget.deleteLater()
+            self.update_height()
+
+    def remove_stream_widgets(self):
+        for stream_widget in self.stream_widgets.values():
+            self.streams_layout.removeWidget(stream_widget)
+            stream_widget.deleteLater()
+
+        self.stream_widgets.clear()
+        self.update_height()
+
+    def update_telemetry(self):
+        for stream_id, stream_widget in self.stream_widgets.items():
+            stream_widget.update_telemetry(
+                *self.controller.frame_mailbox.get_stream_counts(stream_id)
+            )
+
+    def update_record_button(self, is_recording: bool):
+        self.record_button.setText("Stop recording" if is_recording else "Record")
+
+    def update_replay_controls(self, is_replaying: bool):
+        self.replay_button.setText("Stop replay" if is_replaying else "Replay")
+        self.replay_slider.setEnabled(is_replaying)
+
+        if not is_replaying:
+            self.update_replay_position(0, 0)
+
+    def update_replay_position(self, index: int, n_frames: int):
+        if self.replay_slider.isSliderDown():  # Moved by the user meanwhile
+            return
+
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setMaximum(max(n_frames - 1, 0))
+        self.replay_slider.setValue(index)
+        self.replay_slider.blockSignals(False)
+        self.replay_position_label.setText(f"{min(index + 1, n_frames)}/{n_frames}")
+
+    def update_height(self):
+        if self.is_collapsed:
+            return
+
+        self.setMinimumHeight(0)
+        self.setMaximumHeight(16777215)  # QWIDGETSIZE_MAX, undo setFixedHeight
+        self.adjustSize()
+        self.normal_height = self.sizeHint().height()
+
     def closeEvent(self, event):
         self.closed.emit()
         super().closeEvent(event)
@@ -185,11 +379,28 @@ class SocketWindow(QMdiSubWindow):
 
         self.controller.start_socket(port, persistence)
 
+        if not self.socket.is_running:  # The port could not be opened
+            self.on_stop_socket_button()
+
     def on_pause_socket_button(self):
         self.start_button.setEnabled(True)
         self.pause_button.setEnabled(False)
 
-        self.controller.pause_socket()
+        self.controller.pause_socket(self.pause_mode_combobox.currentData())
+
+    def on_record_button(self):
+        if self.socket.frame_log_writer is None:
+            self.controller.start_recording()
+
+        else:
+            self.controller.stop_recording()
+
+    def on_replay_button(self):
+        if self.replay.frame_log_reader is None:
+            self.controller.start_replay(self.replay_speed_combobox.currentData())
+
+        else:
+            self.controller.stop_replay()
 
     def on_stop_socket_button(self):
         self.port_edit.setEnabled(True)
@@ -1,13 +1,25 @@
+import time
 import numpy as np
 import pyvista as pv
 from PyQt5.QtWidgets import QVBoxLayout
 from controller.controller import Controller
 from view.pointclouds_interactor import PointcloudsInteractor
+from view.render_scheduler import RenderScheduler
 from model.filter import Filter
+from model.frame import Frame
+from model.socket_stream import SocketStream
 from model.pointcloud import Pointcloud
+from model.stream_buffer import StreamBuffer
+from model.stream_scene import StreamScene
+from model.frame_ring_buffer import FrameRingBuffer
 from utils.log import Log
+from utils.protocol import FrameType
 from utils.theme import Theme
 
+DEFAULT_POINT_BUDGET = 5_000_000
+# Displayed point counts only change when their budget moves by more than this
+POINT_BUDGET_TOLERANCE = 0.1
+
 
 def get_origin_axis(scale: float = 1.0, line_width: float = 1.0) -> pv.Arrow:
     def make_arrow(
@@ -49,31 +61,67 @@ class ViewerLayout(QVBoxLayout):
         self.controller.toggle_pointcloud_visibility_signal.connect(
             self.toggle_pointcloud_visibility
         )
+        self.controller.update_pointcloud_signal.connect(
+            lambda pointcloud: self.schedule_point_budget_update()
+        )
 
-        self.controller.update_socket_pointcloud_signal.connect(
-            self.update_socket_pointcloud
+        self.controller.socket_frames_available_signal.connect(
+            lambda: self.render_scheduler.schedule_update(
+                "socket_frames", self.pull_socket_frames
+            )
         )
-        self.controller.client_disconnected_signal.connect(self.remove_stock_pointcloud)
-        self.controller.start_socket_signal.connect(
-            lambda port, persistence: self.set_socket_persistence(persistence)
+        self.controller.add_socket_stream_signal.connect(self.add_socket_stream)
+        self.controller.delete_socket_stream_signal.connect(self.remove_socket_stream)
+        self.controller.toggle_socket_stream_visibility_signal.connect(
+            self.toggle_socket_stream_visibility
         )
-        self.controller.stop_socket_signal.connect(self.remove_stock_pointcloud)
+        self.controller.update_socket_stream_signal.connect(
+            self.update_socket_stream_settings
+        )
+        self.controller.stop_socket_signal.connect(self.remove_socket_streams)
 
         self.controller.add_filter_signal.connect(self.add_filter)
-        self.controller.delete_filter_signal.connect(self.remove_filter)
+        self.controller.delete_filter_signal.connect(self.delete_filter)
         self.controller.toggle_filter_visibility_signal.connect(
             self.toggle_filter_visibility
         )
-        self.controller.update_filter_signal.connect(self.update_viewer)
+        self.controller.update_filter_signal.connect(self.update_filter)
+        self.controller.color_by_filter_signal.connect(self.set_color_by_filter)
+        self.controller.set_point_budget_signal.connect(self.set_point_budget)
+        self.controller.set_max_fps_signal.connect(
+            lambda max_fps: self.render_scheduler.set_max_fps(max_fps)
+        )
 
         self.show_axes: bool = False
+        self.color_by_filter: bool = False
         self.axes: pv.Arrow = get_origin_axis(line_width=0.5)
 
         self.pointclouds_list: list[Pointcloud] = []
         self.filters_list: list[Filter] = []
 
-        self.socket_pointclouds: list[pv.PolyData] = []
-        self.persistence = None
+        # Actors registry, keyed by the identity of the displayed object
+        self.pointcloud_actors: dict[int, pv.Actor | None] = {}
+        self.pointcloud_displays: dict[int, tuple[int, int]] = {}  # LOD, points
+        self.hidden_pointclouds: set[int] = set()
+        self.stale_pointclouds: set[int] = set()  # Hidden when filters changed
+        # (pointcloud, LOD, filter) -> (filter box, inside mask)
+        self.filters_masks: dict[tuple[int, int, int], tuple[pv.PolyData, np.ndarray]]
+        self.filters_masks = {}
+        self.filter_actors: dict[int, pv.Actor] = {}
+        self.filter_states: dict[int, tuple[tuple[float, ...], str]] = {}
+
+        # Socket streams displays, keyed by stream id: the frames of a stream
+        # with persistence are kept in a history, otherwise only the latest one
+        self.socket_streams: dict[int, SocketStream] = {}
+        self.socket_histories: dict[int, FrameRingBuffer] = {}
+        self.socket_buffers: dict[int, StreamBuffer] = {}
+        self.socket_frames: dict[int, Frame] = {}
+        self.socket_scenes: dict[int, StreamScene] = {}  # Streams of keyframes
+        self.socket_actors: dict[int, pv.Actor] = {}
+
+        self.point_budget: int = DEFAULT_POINT_BUDGET
+        self.socket_point_budgets: dict[int, int] = {}
+        self.socket_points_count_at_split: int = 0
 
         self.create_ui()
 
@@ -88,42 +136,403 @@ class ViewerLayout(QVBoxLayout):
         # self.add_origin_axes(line_width=0.5)
         self.addWidget(self.plotter.interactor)
 
+        self.render_scheduler = RenderScheduler(self.render)
+
+        self.plotter.iren.add_observer(
+            "EndInteractionEvent", lambda *args: self.schedule_point_budget_update()
+        )
+
+    def render(self):
+        self.plotter.render()
+        self.controller.update_drawn_points(
+            self.count_drawn_points(), self.count_total_points()
+        )
+
     # POINTCLOUDS
     def add_pointcloud(self, pointcloud: Pointcloud):
         self.pointclouds_list.append(pointcloud)
-        self.update_viewer()
+        self.schedule_point_budget_update()
 
     def remove_pointcloud(self, pointcloud_to_remove: Pointcloud):
         try:
             self.pointclouds_list.remove(pointcloud_to_remove)
 
-            self.update_viewer()
         except ValueError:
             self.controller.notify(
                 Log.ERROR, f"Pointcloud not found: {pointcloud_to_remove}"
             )
+            return
+
+        self.remove_actor(self.pointcloud_actors.pop(id(pointcloud_to_remove), None))
+        self.pointcloud_displays.pop(id(pointcloud_to_remove), None)
+        self.hidden_pointclouds.discard(id(pointcloud_to_remove))
+        self.stale_pointclouds.discard(id(pointcloud_to_remove))
+        self.filters_masks = {
+            key: value
+            for key, value in self.filters_masks.items()
+            if key[0] != id(pointcloud_to_remove)
+        }
+        self.schedule_point_budget_update()
 
     def toggle_pointcloud_visibility(self, pointcloud: Pointcloud, is_visible: bool):
+        # Hidden pointclouds keep their actor, GPU buffers and filters masks
         if is_visible:
-            self.add_pointcloud(pointcloud)
-
+            self.hidden_pointclouds.discard(id(pointcloud))
         else:
-            self.remove_pointcloud(pointcloud)
+            self.hidden_pointclouds.add(id(pointcloud))
+
+        actor = self.pointcloud_actors.get(id(pointcloud))
+
+        if actor is not None:
+            actor.SetVisibility(is_visible)
+
+        self.schedule_point_budget_update()
+
+    def get_visible_pointclouds(self) -> list[Pointcloud]:
+        return [
+            pointcloud
+            for pointcloud in self.pointclouds_list
+            if id(pointcloud) not in self.hidden_pointclouds
+        ]
+
+    def add_pointcloud_actor(
+        self, pointcloud: pv.PolyData, filters_masks: list[np.ndarray] = None
+    ) -> pv.Actor | None:
+        if pointcloud.n_points == 0:
+            return None
+
+        if not self.filters_list:
+            return self.add_mesh_actor(pointcloud)
+
+        filter_srv = self.controller.filter_srv
+
+        if filters_masks is None:
+            filters_masks = [
+                filter_srv.get_inside_filter_mask(pointcloud.points, filter)
+                for filter in self.filters_list
+            ]
+
+        # One mesh per pointcloud, whatever the number of (overlapping) filters
+        mask, filter_indices = filter_srv.combine_filters_masks(
+            pointcloud.n_points, filters_masks, self.color_by_filter
+        )
+
+        if not mask.any():
+            return None
+
+        filtered_pointcloud = self.controller.pointcloud_srv.extract_points(
+            pointcloud, mask
+        )
+
+        if not self.color_by_filter:
+            return self.add_mesh_actor(filtered_pointcloud)
+
+        filters_colors = np.array(
+            [pv.Color(filter.color).int_rgb for filter in self.filters_list],
+            dtype=np.uint8,
+        )
+        filtered_pointcloud.point_data["filter_colors"] = filters_colors[
+            filter_indices[mask]
+        ]
+
+        return self.add_mesh_actor(filtered_pointcloud, scalars="filter_colors")
+
+    def add_mesh_actor(
+        self, pointcloud: pv.PolyData, scalars: str = None, color: str = None
+    ) -> pv.Actor:
+        return self.plotter.add_mesh(
+            pointcloud,
+            scalars=scalars,
+            color=color,
+            rgb=scalars is not None,
+            show_scalar_bar=False,
+            render=False,
+        )
+
+    def refresh_pointclouds_actors(self):
+        for pointcloud in self.pointclouds_list:
+            if id(pointcloud) in self.hidden_pointclouds:
+                self.stale_pointclouds.add(id(pointcloud))  # Updated when shown
+            else:
+                self.update_lod_actor(pointcloud)
+
+        for stream in self.socket_streams.values():
+            if stream.id in self.socket_histories:
+                self.socket_histories[stream.id].refresh()
+                self.update_socket_actor(stream)
+
+            else:
+                self.update_socket_stream(stream)
+
+    def schedule_pointclouds_refresh(self):
+        # Bursts of filter changes only refilter the pointclouds once per frame
+        self.render_scheduler.schedule_update(
+            "pointclouds", self.refresh_pointclouds_actors
+        )
+
+    # POINT BUDGET
+    def set_point_budget(self, point_budget: int):
+        self.point_budget = point_budget
+        self.schedule_point_budget_update()
+
+    def schedule_point_budget_update(self):
+        self.render_scheduler.schedule_update(
+            "point_budget", self.update_point_budget
+        )
+
+    def update_point_budget(self):
+        pointclouds_list = self.get_visible_pointclouds()
+        visible_ratios = {
+            id(pointcloud): self.get_visible_ratio(pointcloud)
+            for pointcloud in pointclouds_list
+        }
+
+        weights = {
+            id(pointcloud): pointcloud.points.n_points
+            * visible_ratios[id(pointcloud)]
+            * pointcloud.importance
+            for pointcloud in pointclouds_list
+        }
+        needs = {
+            id(pointcloud): pointcloud.points.n_points * visible_ratios[id(pointcloud)]
+            for pointcloud in pointclouds_list
+        }
+
+        streams = self.get_visible_socket_streams()
+
+        for stream in streams:
+            weights[("socket", stream.id)] = needs[("socket", stream.id)] = (
+                self.count_socket_points(stream)
+            )
+
+        self.socket_points_count_at_split = self.count_socket_points()
+        shares = self.split_point_budget(weights, needs)
+        self.update_socket_point_budgets(
+            {
+                stream.id: shares[("socket", stream.id)]
+                for stream in streams
+                if weights[("socket", stream.id)] > 0
+            }
+        )
+
+        for pointcloud in pointclouds_list:
+            display = self.select_lod(
+                pointcloud, shares[id(pointcloud)], visible_ratios[id(pointcloud)]
+            )
+            current_display = self.pointcloud_displays.get(id(pointcloud))
+
+            if (
+                id(pointcloud) in self.pointcloud_actors
+                and id(pointcloud) not in self.stale_pointclouds
+                and not self.is_display_changed(current_display, display)
+            ):
+                continue
+
+            self.pointcloud_displays[id(pointcloud)] = display
+            self.update_lod_actor(pointcloud)
+
+    def update_socket_point_budgets(self, point_budgets: dict[int, int]):
+        # Streams without points yet keep the whole budget for their first frame.
+        # The latest frame of a stream without persistence is drawn again when
+        # its budget changed significantly
+        current_budgets = self.socket_point_budgets
+        self.socket_point_budgets = point_budgets
+
+        for stream_id, point_budget in point_budgets.items():
+            current_budget = current_budgets.get(stream_id)
+            tolerance = POINT_BUDGET_TOLERANCE * point_budget
+
+            if (
+                stream_id in self.socket_frames or stream_id in self.socket_scenes
+            ) and (
+                current_budget is None or abs(point_budget - current_budget) > tolerance
+            ):
+                self.update_socket_stream(self.socket_streams[stream_id])
+
+            elif stream_id in self.socket_histories:
+                self.limit_socket_history(self.socket_streams[stream_id])
+
+    def split_point_budget(
+        self, weights: dict[object, float], needs: dict[object, float]
+    ) -> dict[object, int]:
+        # Proportional split, where what a small pointcloud does not need is
+        # shared again between the others
+        shares = {}
+        remaining_budget = self.point_budget
+        pending = {key: weight for key, weight in weights.items() if weight > 0}
+
+        for key in weights.keys() - pending.keys():
+            shares[key] = 0
+
+        while pending:
+            total_weight = sum(pending.values())
+            satisfied = [
+                key
+                for key, weight in pending.items()
+                if needs[key] <= remaining_budget * weight / total_weight
+            ]
+
+            if not satisfied:
+                for key, weight in pending.items():
+                    shares[key] = int(remaining_budget * weight / total_weight)
+                break
+
+            for key in satisfied:
+                shares[key] = int(np.ceil(needs[key]))
+                remaining_budget -= needs[key]
+                del pending[key]
+
+        return shares
+
+    def is_display_changed(
+        self, current_display: tuple[int, int], display: tuple[int, int]
+    ) -> bool:
+        if current_display is None or current_display[0] != display[0]:
+            return True
+
+        tolerance = POINT_BUDGET_TOLERANCE * current_display[1]
+
+        return abs(display[1] - current_display[1]) > tolerance
+
+    def update_lod_actor(self, pointcloud: Pointcloud):
+        self.stale_pointclouds.discard(id(pointcloud))
+        self.remove_actor(self.pointcloud_actors.pop(id(pointcloud), None))
+        self.pointcloud_actors[id(pointcloud)] = self.add_lod_actor(pointcloud)
+
+    def add_lod_actor(self, pointcloud: Pointcloud) -> pv.Actor | None:
+        level, n_points = self.pointcloud_displays.get(
+            id(pointcloud), (0, pointcloud.points.n_points)
+        )
+        lod = pointcloud.lods[level]
+        filters_masks = None
+
+        if n_points < lod.n_points:  # Deterministic subsampling of the level
+            pointcloud_srv = self.controller.pointcloud_srv
+            indices = pointcloud_srv.get_subsample_indices(lod.n_points, n_points)
+            lod = pointcloud_srv.extract_points(lod, indices)
+
+        elif self.filters_list:
+            filters_masks = [
+                self.get_filter_mask(pointcloud, level, filter)
+                for filter in self.filters_list
+            ]
+
+        return self.add_pointcloud_actor(lod, filters_masks)
+
+    def get_filter_mask(
+        self, pointcloud: Pointcloud, level: int, filter: Filter
+    ) -> np.ndarray:
+        # Masks are cached until the filter box changes, which replaces it
+        key = (id(pointcloud), level, id(filter))
+        box, mask = self.filters_masks.get(key, (None, None))
+
+        if box is filter.box:
+            return mask
+
+        mask = self.controller.filter_srv.get_inside_filter_mask(
+            pointcloud.lods[level].points, filter, pointcloud.get_spatial_index(level)
+        )
+        self.filters_masks[key] = (filter.box, mask)
+
+        return mask
+
+    def get_visible_ratio(self, pointcloud: Pointcloud) -> float:
+        # Part of the pointcloud inside the view frustum, estimated on the
+        # coarsest level index
+        coarsest_level = len(pointcloud.lods) - 1
+
+        if not self.plotter.camera_set:
+            return 1.0
+
+        coarsest_index = pointcloud.get_spatial_index(coarsest_level)
+        visible_count = coarsest_index.count_in_frustum(self.get_frustum_planes())
+
+        return visible_count / max(coarsest_index.n_points, 1)
+
+    def select_lod(
+        self, pointcloud: Pointcloud, point_budget: int, visible_ratio: float
+    ) -> tuple[int, int]:
+        # Only the visible part of a level counts in the budget: the closer the
+        # camera, the finer the level, up to the full resolution
+        lods = pointcloud.lods
+        coarsest_level = len(lods) - 1
+
+        if visible_ratio == 0:
+            return coarsest_level, lods[coarsest_level].n_points
+
+        for level, lod in enumerate(lods):
+            if lod.n_points * visible_ratio <= point_budget:
+                return level, lod.n_points
+
+        n_points = int(point_budget / visible_ratio)
+
+        return coarsest_level, min(n_points, lods[coarsest_level].n_points)
+
+    def count_drawn_points(self) -> int:
+        actors = [
+            actor
+            for actor in self.pointcloud_actors.values()
+            if actor is not None and actor.GetVisibility()
+        ]
+        actors += [
+            actor
+            for stream_id, actor in self.socket_actors.items()
+            if stream_id not in self.socket_histories and actor.GetVisibility()
+        ]
+
+        drawn_points = sum(
+            actor.GetMapper().GetInput().GetNumberOfPoints() for actor in actors
+        )
+
+        # Padding points of the histories are not counted
+        drawn_points += sum(
+            self.socket_histories[stream.id].n_displayed_points
+            for stream in self.get_visible_socket_streams()
+            if stream.id in self.socket_histories
+        )
+
+        return drawn_points
+
+    def count_total_points(self) -> int:
+        pointclouds_count = sum(
+            pointcloud.points.n_points for pointcloud in self.get_visible_pointclouds()
+        )
+
+        return pointclouds_count + self.count_socket_points()
+
+    def get_frustum_planes(self) -> np.ndarray:
+        planes = [0.0] * 24
+        aspect = self.plotter.renderer.GetTiledAspectRatio()
+        self.plotter.camera.GetFrustumPlanes(aspect, planes)
+
+        return np.asarray(planes).reshape(6, 4)
 
     # FILTERS
     def add_filter(self, filter: Filter):
         self.filters_list.append(filter)
-        self.update_viewer()
+        self.add_filter_actor(filter)
+        self.schedule_pointclouds_refresh()
 
     def remove_filter(self, filter_to_remove: Filter):
         try:
             self.filters_list.remove(filter_to_remove)
 
-            self.update_viewer()
         except ValueError:
             self.controller.notify(
                 Log.ERROR, f"Filter not found: {filter_to_remove.name}"
             )
+            return
+
+        self.remove_filter_actor(filter_to_remove)
+        self.schedule_pointclouds_refresh()
+
+    def delete_filter(self, filter_to_delete: Filter):
+        self.remove_filter(filter_to_delete)
+        self.filters_masks = {
+            key: value
+            for key, value in self.filters_masks.items()
+            if key[2] != id(filter_to_delete)
+        }
 
     def toggle_filter_visibility(self, filter: Filter, is_visible: bool):
         if is_visible:
@@ -132,6 +541,46 @@ class ViewerLayout(QVBoxLayout):
         else:
             self.remove_filter(filter)
 
+    def update_filter(self, filter: Filter):
+        if id(filter) not in self.filter_actors:  # Hidden filter
+            return
+
+        bounds, color = self.filter_states[id(filter)]
+
+        if tuple(filter.box.bounds) != bounds:
+            self.remove_filter_actor(filter)
+            self.add_filter_actor(filter)
+            self.schedule_pointclouds_refresh()
+
+        elif filter.color != color:
+            self.filter_actors[id(filter)].prop.color = filter.color
+            self.filter_states[id(filter)] = (bounds, filter.color)
+
+            if self.color_by_filter:
+                self.schedule_pointclouds_refresh()
+
+        else:  # Renamed filter, nothing to redraw
+            return
+
+        self.render_scheduler.request_render()
+
+    def add_filter_actor(self, filter: Filter):
+        self.filter_actors[id(filter)] = self.plotter.add_mesh(
+            filter.box,
+            style="wireframe",
+            color=filter.color,
+            line_width=3,
+            render=False,
+        )
+        self.filter_states[id(filter)] = (tuple(filter.box.bounds), filter.color)
+
+    def remove_filter_actor(self, filter: Filter):
+        actor = self.filter_actors.pop(id(filter), None)
+        self.filter_states.pop(id(filter), None)
+
+        if actor is not None:
+            self.remove_actor(actor)
+
     # UTILITY
     def show_hide_axes(self):
         self.show_axes = not self.show_axes
@@ -140,78 +589,328 @@ class ViewerLayout(QVBoxLayout):
             self.add_origin_axis()
 
         else:
-            self.plotter.remove_actor("origin_axes")
+            self.plotter.remove_actor("origin_axes", render=False)
+
+        self.render_scheduler.request_render()
+
+    def set_color_by_filter(self, color_by_filter: bool):
+        self.color_by_filter = color_by_filter
+
+        if self.filters_list:
+            self.schedule_pointclouds_refresh()
 
     def change_theme(self, theme: Theme):
         self.plotter.set_background(theme.value)
+        self.render_scheduler.request_render()
 
-    def clear_viewer(self):
-        self.plotter.clear()
+    def remove_actor(self, actor: pv.Actor | None):
+        if actor is not None:
+            self.plotter.remove_actor(actor, render=False)
 
-    def filter_points_inside_polygon(
-        self, pointcloud: pv.PolyData, box: pv.PolyData
-    ) -> pv.PolyData:
-        enclosed = pointcloud.select_enclosed_points(box, check_surface=False)
+    def add_origin_axis(self):
+        self.plotter.add_mesh(
+            self.axes,
+            scalars="colors",
+            rgb=True,
+            show_scalar_bar=False,
+            name="origin_axes",
+            render=False,
+        )
 
-        return pointcloud.extract_points(enclosed["SelectedPoints"] == 1)
+    def add_socket_stream(self, stream: SocketStream):
+        self.socket_streams[stream.id] = stream
+        self.reset_socket_stream_display(stream)
+        self.schedule_point_budget_update()
 
-    def update_viewer(self):
-        camera_position = self.plotter.camera_position
+    def remove_socket_stream(self, stream: SocketStream):
+        self.socket_streams.pop(stream.id, None)
+        self.remove_actor(self.socket_actors.pop(stream.id, None))
+        self.socket_histories.pop(stream.id, None)
+        self.socket_buffers.pop(stream.id, None)
+        self.socket_scenes.pop(stream.id, None)
+        self.socket_point_budgets.pop(stream.id, None)
 
-        self.clear_viewer()
+        frame = self.socket_frames.pop(stream.id, None)
 
-        for filter in self.filters_list:
-            self.plotter.add_mesh(
-                filter.box, style="wireframe", color=filter.color, line_width=3
-            )
+        if frame is not None:
+            frame.release()
 
-        pointclouds_list: list[pv.PolyData] = [
-            pointcloud.points for pointcloud in self.pointclouds_list
-        ]
+        self.schedule_point_budget_update()
 
-        pointclouds_list.extend(self.socket_pointclouds)
+    def remove_socket_streams(self):
+        for stream in list(self.socket_streams.values()):
+            self.remove_socket_stream(stream)
 
-        for pointcloud in pointclouds_list:
-            if self.filters_list:
-                for filter in self.filters_list:
-                    filtered_pointcloud = self.filter_points_inside_polygon(
-                        pointcloud, filter.box
+    def toggle_socket_stream_visibility(self, stream: SocketStream, is_visible: bool):
+        self.update_socket_actor(stream)
+        self.schedule_point_budget_update()
+
+    def update_socket_stream_settings(self, stream: SocketStream):
+        if stream.id not in self.socket_streams:
+            return
+
+        if self.is_socket_display_changed(stream):
+            self.reset_socket_stream_display(stream)
+            self.schedule_point_budget_update()
+
+        actor = self.socket_actors.get(stream.id)
+
+        if actor is not None:
+            actor.prop.color = stream.color
+            self.render_scheduler.request_render()
+
+    def is_socket_display_changed(self, stream: SocketStream) -> bool:
+        history = self.socket_histories.get(stream.id)
+
+        if history is None:
+            return not self.is_socket_streaming(stream)
+
+        if stream.persistence == -1:
+            return not history.is_growable
+
+        return history.is_growable or history.capacity != stream.persistence
+
+    def reset_socket_stream_display(self, stream: SocketStream):
+        # Without persistence, frames are written in place in a single buffer,
+        # otherwise they are kept in a ring of frames slots
+        self.remove_actor(self.socket_actors.pop(stream.id, None))
+        self.socket_histories.pop(stream.id, None)
+        self.socket_buffers.pop(stream.id, None)
+
+        if self.is_socket_streaming(stream):
+            self.socket_buffers[stream.id] = StreamBuffer()
+
+            if stream.id in self.socket_scenes:
+                self.socket_scenes[stream.id].invalidate()
+
+        else:
+            frame = self.socket_frames.pop(stream.id, None)
+
+            if frame is not None:
+                frame.release()
+
+            history = FrameRingBuffer(stream.persistence)
+            history.frame_filter = self.filter_socket_points
+            self.socket_histories[stream.id] = history
+
+    def pull_socket_frames(self):
+        # Frames received since the last render. Only the latest frame of a
+        # stream without persistence is drawn, the others are only released
+        updated_streams: dict[int, SocketStream] = {}
+
+        for frame in self.controller.take_socket_frames():
+            stream = self.update_socket_pointcloud(frame)
+
+            if stream is not None:
+                updated_streams[stream.id] = stream
+
+                if frame.receive_time:
+                    stream.telemetry.add_render_latency(
+                        time.monotonic() - frame.receive_time
                     )
 
-                    if filtered_pointcloud.n_points > 0:
-                        self.plotter.add_mesh(
-                            filtered_pointcloud, show_scalar_bar=False
-                        )
+        for stream in updated_streams.values():
+            if self.is_socket_streaming(stream):
+                self.update_socket_stream(stream)
 
             else:
-                self.plotter.add_mesh(pointcloud, show_scalar_bar=False)
+                self.update_socket_actor(stream)
 
-        if self.show_axes:
-            self.add_origin_axis()
+        # Split the budget again when the socket data size changed significantly
+        split_count = self.socket_points_count_at_split
+        tolerance = POINT_BUDGET_TOLERANCE * split_count
 
-        self.plotter.add_axes()
-        self.plotter.camera_position = camera_position
-        self.plotter.render()
+        if abs(self.count_socket_points() - split_count) > tolerance:
+            self.schedule_point_budget_update()
 
-    def add_origin_axis(self):
-        self.plotter.add_mesh(
-            self.axes,
-            scalars="colors",
-            rgb=True,
-            show_scalar_bar=False,
-            name="origin_axes",
+    def update_socket_pointcloud(self, frame: Frame) -> SocketStream | None:
+        stream = self.socket_streams.get(frame.stream_id)
+
+        if stream is None:  # Stream closed since the frame was received
+            frame.release()
+            return None
+
+        point_budget = self.socket_point_budgets.get(stream.id, self.point_budget)
+        points = frame.points
+
+        if frame.frame_type != FrameType.POINTS:
+            # Keyframes and delta frames update the points of the stream scene
+            scene = self.socket_scenes.get(stream.id, StreamScene())
+
+            try:
+                scene.apply(frame)
+
+            except ValueError as error:
+                self.controller.notify(
+                    Log.DEBUG, f"Frame of {stream.name} not applied: {error}"
+                )
+                frame.release()
+                return None
+
+            self.socket_scenes[stream.id] = scene
+            frame.release()  # Points copied in the scene
+            frame = None
+
+            if stream.id in self.socket_histories:  # Scenes are never persisted
+                self.reset_socket_stream_display(stream)
+
+        else:
+            # Points frames stand alone, persisted again when the stream is
+            scene = self.socket_scenes.pop(stream.id, None)
+
+            if scene is not None and not self.is_socket_streaming(stream):
+                self.reset_socket_stream_display(stream)
+
+        if self.is_socket_streaming(stream):
+            # The latest frame is kept until the next one, to filter it again
+            # when needed
+            previous_frame = self.socket_frames.pop(stream.id, None)
+
+            if previous_frame is not None:
+                previous_frame.release()
+
+            if frame is not None:
+                self.socket_frames[stream.id] = frame
+
+        else:
+            history = self.socket_histories[stream.id]
+            frames_count = (
+                stream.persistence if stream.persistence != -1 else history.n_frames + 1
+            )
+
+            history.append(
+                self.subsample_socket_points(
+                    points, max(point_budget // frames_count, 1)
+                )
+            )
+            self.limit_socket_history(stream)
+
+            if frame is not None:
+                frame.release()  # Points copied in the history
+
+        return stream
+
+    def limit_socket_history(self, stream: SocketStream):
+        # The older frames of a history were kept with a larger share of the
+        # budget when there were fewer frames, or a larger budget: they are
+        # all subsampled again to an equal share once over the budget
+        history = self.socket_histories[stream.id]
+        point_budget = self.socket_point_budgets.get(stream.id, self.point_budget)
+
+        if history.n_points <= point_budget * (1 + POINT_BUDGET_TOLERANCE):
+            return
+
+        frames_count = history.n_frames if history.is_growable else history.capacity
+        history.limit_frame_size(
+            max(point_budget // frames_count, 1), self.subsample_socket_points
+        )
+        self.update_socket_actor(stream)
+
+    def count_socket_points(self, stream: SocketStream = None) -> int:
+        if stream is None:
+            return sum(
+                self.count_socket_points(stream)
+                for stream in self.get_visible_socket_streams()
+            )
+
+        if stream.id in self.socket_histories:
+            return self.socket_histories[stream.id].n_points
+
+        if stream.id in self.socket_scenes:
+            return self.socket_scenes[stream.id].n_points
+
+        frame = self.socket_frames.get(stream.id)
+
+        return 0 if frame is None else frame.n_points
+
+    def get_visible_socket_streams(self) -> list[SocketStream]:
+        return [stream for stream in self.socket_streams.values() if stream.is_visible]
+
+    def subsample_socket_points(
+        self, points: np.ndarray, point_budget: int
+    ) -> np.ndarray:
+        if len(points) <= point_budget:
+            return points
+
+        indices = self.controller.pointcloud_srv.get_subsample_indices(
+            len(points), point_budget
         )
 
-    def update_socket_pointcloud(self, pointcloud: pv.PolyData):
-        if self.persistence != -1 and len(self.socket_pointclouds) == self.persistence:
-            self.socket_pointclouds.pop(0)
+        return points[indices]
 
-        self.socket_pointclouds.append(pointcloud)
-        self.update_viewer()
+    def update_socket_actor(self, stream: SocketStream):
+        # Each stream is drawn by a single actor, whose points are updated in place
+        if stream.id not in self.socket_streams:  # Stream closed since scheduled
+            return
 
-    def set_socket_persistence(self, persistence: int):
-        self.persistence = persistence
+        if stream.id in self.socket_histories:
+            display = self.socket_histories[stream.id]
+            has_points = display.n_displayed_points > 0
+
+        else:
+            display = self.socket_buffers[stream.id]
+            has_points = display.n_points > 0
+
+        actor = self.socket_actors.get(stream.id)
+
+        if actor is None and has_points:
+            actor = self.add_mesh_actor(display.polydata, color=stream.color)
+            self.socket_actors[stream.id] = actor
+
+        if actor is not None:
+            actor.SetVisibility(has_points and stream.is_visible)
+
+    def is_socket_streaming(self, stream: SocketStream) -> bool:
+        # Keyframes and delta frames already update the points of a scene, which
+        # is drawn as is whatever the persistence of the stream
+        return stream.persistence in (0, 1) or stream.id in self.socket_scenes
+
+    def update_socket_stream(self, stream: SocketStream):
+        if stream.id in self.socket_scenes:
+            self.update_socket_scene(stream)
+            return
+
+        frame = self.socket_frames.get(stream.id)
+
+        if frame is None:  # Stream closed since the update was scheduled
+            return
+
+        points = self.subsample_socket_points(
+            frame.points, self.socket_point_budgets.get(stream.id, self.point_budget)
+        )
+
+        self.socket_buffers[stream.id].update(self.filter_socket_points(points))
+        self.update_socket_actor(stream)
+
+    def update_socket_scene(self, stream: SocketStream):
+        # Only the changed points are written when the buffer mirrors the scene,
+        # subsampled or filtered scenes are written again entirely
+        scene = self.socket_scenes[stream.id]
+        buffer = self.socket_buffers[stream.id]
+        point_budget = self.socket_point_budgets.get(stream.id, self.point_budget)
+        is_mirrored = not self.filters_list and scene.n_points <= point_budget
+
+        if is_mirrored and scene.changed_range is not None:
+            buffer.update_range(scene.points, *scene.changed_range)
+
+        else:
+            points = self.subsample_socket_points(scene.points, point_budget)
+            buffer.update(self.filter_socket_points(points))
+
+        if is_mirrored:
+            scene.clear_changes()
+
+        else:
+            scene.invalidate()
+
+        self.update_socket_actor(stream)
+
+    def filter_socket_points(self, points: np.ndarray) -> np.ndarray:
+        if not self.filters_list:
+            return points
+
+        mask, _ = self.controller.filter_srv.get_inside_filters_mask(
+            points, self.filters_list
+        )
 
-    def remove_stock_pointcloud(self):
-        self.socket_pointclouds.clear()
-        self.update_viewer()
+        return points[mask]